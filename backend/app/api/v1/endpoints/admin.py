@@ -1,14 +1,23 @@
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from fastapi import APIRouter, Depends, HTTPException, Response, Query
 from sqlalchemy.orm import Session, joinedload
 from datetime import datetime, timedelta
 from pydantic import BaseModel
 from urllib.parse import quote
+import base64
+import json
 import datetime as dt
 
 from .... import crud, models, schemas
+from ....schemas.event_log import EventLogFilters
 from ....core.dependencies import get_db
 from ....services import license_service
+from ....services.blacklist_filter import blacklist_filter
+from ....services.event_buffer import event_log_buffer
+from ....services.event_archive import load_archived_events
+from ....services.event_log_counts import event_log_count_cache
+from ....services.heartbeats import heartbeat_buffer
+from ....services.license_cache import license_snapshot_cache, unknown_serial_cache
 from ....core import security
 
 router = APIRouter()
@@ -34,14 +43,15 @@ def create_license(
     license = crud.license.create(db=db, obj_in=license_in)
 
     if license.status == 'active' and license_in.machine_code:
-        active_activations = crud.activation.get_activations_by_license_id(db, license_id=license.id)
-        if len(active_activations) < license.max_activations:
+        # 佔用啟用名額與新增啟用記錄在同一個交易中提交
+        if crud.license.reserve_activation_slot(db, license_id=license.id):
             activation_in = schemas.ActivationCreate(
                 license_id=license.id,
                 machine_code=license_in.machine_code
             )
             crud.activation.create(db=db, obj_in=activation_in)
         else:
+            db.rollback()
             print(f"Warning: License {license.id} created as active, but activation limit was reached. No new activation created.")
 
     db.refresh(license, attribute_names=['customer', 'product', 'activations'])
@@ -174,9 +184,9 @@ def add_manual_activation(
     if not license:
         raise HTTPException(status_code=404, detail="License not found")
 
-    # Check activation limit
-    active_activations = crud.activation.get_activations_by_license_id(db, license_id=license.id)
-    if len(active_activations) >= license.max_activations:
+    # Check activation limit（與啟用名額一起在同一個交易中提交）
+    if not crud.license.reserve_activation_slot(db, license_id=license.id):
+        db.rollback()
         raise HTTPException(status_code=400, detail="Maximum activation limit reached.")
 
     activation = crud.activation.create(db, obj_in=schemas.ActivationCreate(
@@ -217,8 +227,13 @@ def delete_activation(
     if not activation:
         raise HTTPException(status_code=404, detail="Activation not found")
     
-    # 刪除啟用記錄
+    # 刪除啟用記錄（active 的記錄同時釋放名額）
+    if activation.status == 'active':
+        crud.license.release_activation_slot(db, license_id=activation.license_id)
+    was_blacklisted = activation.status == 'blacklisted'
     crud.activation.remove(db=db, id=activation_id)
+    if was_blacklisted:
+        blacklist_filter.remove(activation)
     
     return {"status": "success", "message": "Activation deleted successfully"}
 
@@ -235,22 +250,17 @@ def blacklist_activation(
     if not activation:
         raise HTTPException(status_code=404, detail="Activation not found")
     
-    # 檢查授權數量是否合理
-    # 計算扣除此啟用記錄後的 active 啟用數量
-    current_active_count = crud.activation.count_active_activations_by_license_id(
-        db=db, license_id=activation.license_id
-    )
+    # 取得授權的最大啟用數量與目前 active 啟用數量
+    license_obj = crud.license.get(db=db, id=activation.license_id)
+    if not license_obj:
+        raise HTTPException(status_code=404, detail="License not found")
     
+    # 檢查授權數量是否合理
     # 如果這個啟用記錄是 active 狀態，扣除後數量會減一
     if activation.status == 'active':
-        remaining_active_count = current_active_count - 1
+        remaining_active_count = license_obj.active_activation_count - 1
     else:
-        remaining_active_count = current_active_count
-    
-    # 取得授權的最大啟用數量
-    license_obj = crud.license.get(db=db, id=activation.license_id)
-    if not license_obj:
-        raise HTTPException(status_code=404, detail="License not found")
+        remaining_active_count = license_obj.active_activation_count
     
     # 檢查：如果扣除後，最大啟用數量仍然大於實際啟用數量，則不允許加入黑名單
     if license_obj.max_activations > remaining_active_count:
@@ -260,20 +270,51 @@ def blacklist_activation(
         )
     
     # 將啟用記錄加入黑名單
+    if activation.status == 'active':
+        crud.license.release_activation_slot(db, license_id=activation.license_id)
     activation.status = 'blacklisted'
     activation.blacklisted_at = datetime.utcnow()
     db.add(activation)
     db.commit()
+    blacklist_filter.add(activation)
     
     return {"status": "success", "message": "Activation blacklisted successfully"}
 
+@router.get("/runtime-stats", dependencies=[Depends(security.get_current_active_admin)])
+def get_runtime_stats():
+    """
+    Get in-process buffer statistics of this worker.
+    """
+    return {
+        "event_log_buffer": event_log_buffer.stats(),
+        "heartbeat_buffer": heartbeat_buffer.stats(),
+        "license_snapshot_cache": license_snapshot_cache.stats(),
+        "unknown_serial_cache": unknown_serial_cache.stats(),
+        "blacklist_filter": blacklist_filter.stats(),
+        "event_log_count_cache": event_log_count_cache.stats(),
+    }
+
 # 事件記錄相關 API
-@router.get("/event-logs", dependencies=[Depends(security.get_current_active_admin)])
+def _encode_event_cursor(event, descending: bool) -> str:
+    """不透明的 keyset 游標：最後一筆的 (created_at, id) 與排序方向"""
+    data = {"t": event.created_at.isoformat(), "i": event.id, "d": descending}
+    return base64.urlsafe_b64encode(json.dumps(data).encode("utf-8")).decode("ascii")
+
+def _decode_event_cursor(cursor: str) -> Tuple[datetime, int, bool]:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(data["t"]), int(data["i"]), bool(data["d"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@router.get("/event-logs", response_model=schemas.EventLogListResponse, dependencies=[Depends(security.get_current_active_admin)])
 def get_event_logs(
     *,
     db: Session = Depends(get_db),
-    page: int = Query(1, ge=1, description="頁碼"),
+    page: int = Query(1, ge=1, description="頁碼（未提供 cursor 時使用）"),
     limit: int = Query(20, ge=1, le=100, description="每頁筆數"),
+    cursor: str = Query(None, description="上一頁回傳的 next_cursor，提供時忽略 page"),
+    exact_total: bool = Query(False, description="重新計算精確總筆數"),
     serial_number: str = Query(None, description="序號搜尋"),
     customer_name: str = Query(None, description="客戶名稱搜尋"),
     tax_id: str = Query(None, description="客戶編號搜尋"),
@@ -284,86 +325,124 @@ def get_event_logs(
 ):
     """
     Get event logs with search and filter options.
+    依 created_at 排序時支援 cursor（keyset）分頁；total 預設取自背景更新的快取，
+    total_is_exact 為 False 時可能落後最多 EVENT_LOG_COUNT_REFRESH_SECONDS 秒。
+    快取沒有此條件時（第一次查詢）仍在請求中執行一次 COUNT(*)，前端分頁需要總頁數。
     """
-    query = db.query(models.EventLog)
-    
-    # 搜尋條件
-    if serial_number:
-        query = query.filter(models.EventLog.serial_number.ilike(f"%{serial_number}%"))
-    
-    if customer_name or tax_id:
-        # 需要通過 license 關聯到 customer
-        query = query.join(models.License, models.EventLog.license_id == models.License.id)
-        query = query.join(models.Customer, models.License.customer_id == models.Customer.id)
-        
-        if customer_name:
-            query = query.filter(models.Customer.name.ilike(f"%{customer_name}%"))
-        if tax_id:
-            query = query.filter(models.Customer.tax_id.ilike(f"%{tax_id}%"))
-    
-    # 篩選條件
-    if severity:
-        query = query.filter(models.EventLog.severity == severity)
-    
-    if event_type:
-        query = query.filter(models.EventLog.event_type == event_type)
-    
-    if is_confirmed is not None:
-        query = query.filter(models.EventLog.is_confirmed == is_confirmed)
-    
-    # 排序
-    if order_by == "created_at_desc":
-        query = query.order_by(models.EventLog.created_at.desc())
-    elif order_by == "created_at_asc":
-        query = query.order_by(models.EventLog.created_at.asc())
-    elif order_by == "severity_desc":
-        query = query.order_by(models.EventLog.severity.desc())
-    elif order_by == "severity_asc":
-        query = query.order_by(models.EventLog.severity.asc())
-    
-    # 分頁
-    total = query.count()
+    filters = EventLogFilters(
+        serial_number=serial_number,
+        customer_name=customer_name,
+        tax_id=tax_id,
+        severity=severity,
+        event_type=event_type,
+        is_confirmed=is_confirmed,
+    )
+    keyset = order_by in ("created_at_desc", "created_at_asc")
+    
+    if cursor:
+        if not keyset:
+            raise HTTPException(status_code=400, detail="cursor is only supported when ordering by created_at")
+        created_at, event_id, descending = _decode_event_cursor(cursor)
+        events = crud.event_log.get_page_after(
+            db, filters=filters, descending=descending, after=(created_at, event_id), limit=limit + 1,
+            with_customer_name=True
+        )
+        page = None
+    elif keyset:
+        descending = order_by == "created_at_desc"
+        # 相容舊的 page 參數：第一頁與 keyset 相同，之後以 OFFSET 跳過
+        query = crud.event_log.filtered_query(db, filters=filters, with_customer_name=True)
+        if descending:
+            query = query.order_by(models.EventLog.created_at.desc(), models.EventLog.id.desc())
+        else:
+            query = query.order_by(models.EventLog.created_at.asc(), models.EventLog.id.asc())
+        events = query.offset((page - 1) * limit).limit(limit + 1).all()
+    else:
+        query = crud.event_log.filtered_query(db, filters=filters, with_customer_name=True)
+        if order_by == "severity_desc":
+            query = query.order_by(models.EventLog.severity.desc(), models.EventLog.id.desc())
+        elif order_by == "severity_asc":
+            query = query.order_by(models.EventLog.severity.asc(), models.EventLog.id.asc())
+        events = query.offset((page - 1) * limit).limit(limit + 1).all()
+    
+    has_more = len(events) > limit
+    events = events[:limit]
+    next_cursor = _encode_event_cursor(events[-1], descending) if keyset and has_more else None
+    
+    # 總筆數：快取（背景更新）或精確計算
+    cached = None if exact_total else event_log_count_cache.get(filters)
+    if cached is None:
+        total = crud.event_log.count_filtered(db, filters=filters)
+        event_log_count_cache.set(filters, total)
+        total_is_exact = True
+    else:
+        total = cached[0]
+        total_is_exact = False
     total_pages = (total + limit - 1) // limit
-    offset = (page - 1) * limit
-    events = query.offset(offset).limit(limit).all()
-    
-    # 為每個事件添加客戶名稱
-    events_with_customer = []
-    for event in events:
-        event_dict = {
-            "id": event.id,
-            "license_id": event.license_id,
-            "activation_id": event.activation_id,
-            "event_type": event.event_type,
-            "event_subtype": event.event_subtype,
-            "serial_number": event.serial_number,
-            "machine_code": event.machine_code,
-            "ip_address": event.ip_address,
-            "user_agent": event.user_agent,
-            "details": event.details,
-            "severity": event.severity,
-            "is_confirmed": event.is_confirmed,
-            "confirmed_by": event.confirmed_by,
-            "confirmed_at": event.confirmed_at,
-            "created_at": event.created_at,
-            "customer_name": None
-        }
-        
-        # 獲取客戶名稱
-        if event.license_id:
-            license_obj = db.query(models.License).filter(models.License.id == event.license_id).first()
-            if license_obj and license_obj.customer:
-                event_dict["customer_name"] = license_obj.customer.name
-        
-        events_with_customer.append(event_dict)
     
-    return {
-        "items": events_with_customer,
-        "total": total,
-        "page": page,
-        "limit": limit,
-        "total_pages": total_pages
-    }
+    return schemas.EventLogListResponse(
+        items=[schemas.EventLogListItem.model_validate(event) for event in events],
+        total=total,
+        total_is_exact=total_is_exact,
+        page=page,
+        limit=limit,
+        total_pages=total_pages,
+        next_cursor=next_cursor
+    )
+
+@router.get("/event-logs/archive", response_model=schemas.EventLogArchiveResponse, dependencies=[Depends(security.get_current_active_admin)])
+def get_archived_event_logs(
+    *,
+    db: Session = Depends(get_db),
+    month: str = Query(None, description="封存月份 YYYY-MM"),
+    serial_number: str = Query(None, description="序號（完全相符）"),
+    license_id: int = Query(None, description="授權 ID"),
+    page: int = Query(1, ge=1, description="頁碼"),
+    limit: int = Query(50, ge=1, le=500, description="每頁筆數"),
+):
+    """
+    查詢已移出 event_logs 的封存事件（EVENT_LOG_ARCHIVE_AFTER_DAYS 之前、未確認的 suspicious/critical 以外的事件）。
+    需指定 serial_number 或 license_id，month 可再縮小範圍。
+    分頁依封存批次的 event_count 計算，只解壓縮涵蓋該頁的批次。
+    """
+    if not (serial_number or license_id):
+        raise HTTPException(status_code=400, detail="Specify serial_number or license_id")
+    
+    month_start = None
+    if month:
+        try:
+            month_start = datetime.strptime(month, "%Y-%m").date()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid month")
+    
+    if license_id and not serial_number:
+        # 以序號走 (serial_number, month) 索引；授權已刪除時才只依 license_id 查
+        license = crud.license.get(db, id=license_id)
+        if license:
+            serial_number = license.serial_number
+    
+    archives = crud.event_log_archive.find(
+        db, month=month_start, serial_number=serial_number, license_id=license_id
+    )
+    start = (page - 1) * limit
+    page_archives = []
+    skipped = 0  # 該頁第一個批次之前的事件數
+    offset = 0
+    for archive in archives:
+        if offset + archive.event_count > start and offset < start + limit:
+            if not page_archives:
+                skipped = offset
+            page_archives.append(archive)
+        offset += archive.event_count
+    
+    events = load_archived_events(
+        crud.event_log_archive.get_payloads(db, ids=[archive.id for archive in page_archives])
+    )
+    return schemas.EventLogArchiveResponse(
+        items=events[start - skipped:start - skipped + limit],
+        total=offset,
+        archives=len(page_archives)
+    )
 
 @router.get("/licenses/{license_id}/download/{machine_code}", response_class=Response, dependencies=[Depends(security.get_current_active_admin)])
 def download_license_file(
@@ -421,6 +500,21 @@ def get_license_events(
     )
     return events
 
+@router.get("/licenses/{license_id}/heartbeats", dependencies=[Depends(security.get_current_active_admin)])
+def get_license_heartbeats(
+    *,
+    db: Session = Depends(get_db),
+    license_id: int,
+    days: int = Query(30, ge=1, le=366, description="查詢最近幾天"),
+):
+    """獲取指定授權各啟用記錄的每日正常驗證彙總（取代 normal_validation 事件）"""
+    license = crud.license.get(db=db, id=license_id)
+    if not license:
+        raise HTTPException(status_code=404, detail="License not found")
+    
+    since = (datetime.utcnow() - timedelta(days=days - 1)).date()
+    return crud.activation_heartbeat.get_by_license(db, license_id=license_id, since=since)
+
 @router.get("/licenses/{license_id}/events/unconfirmed", dependencies=[Depends(security.get_current_active_admin)])
 def get_unconfirmed_events(
     *,
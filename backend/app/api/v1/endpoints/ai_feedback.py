@@ -1,6 +1,6 @@
 from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 import os
 import csv
@@ -11,8 +11,9 @@ from zoneinfo import ZoneInfo
 
 logger = logging.getLogger(__name__)
 
-from .... import models, schemas
-from ....core.dependencies import get_db
+from .... import crud, schemas
+from ....services.license_cache import unknown_serial_cache
+from ....core.dependencies import get_async_db
 
 # Public router（只有上傳端點，給客戶端 opt-in 蒐集用）
 public_router = APIRouter()
@@ -62,7 +63,7 @@ async def upload_ai_feedback(
     app_version: str = Form(""),
     client_timestamp: str = Form(""),
     image: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     接收客戶端 opt-in 上傳的 AI 訓練回饋影像。
@@ -71,11 +72,12 @@ async def upload_ai_feedback(
     - append 一列到 labels.csv 記錄標籤
     """
     # 驗證序號是否存在
-    license_obj = db.query(models.License).options(
-        joinedload(models.License.customer)
-    ).filter(models.License.serial_number == serial_number).first()
+    # 格式不符或最近查無此序號時不查詢資料庫
+    license_snapshot = None
+    if not unknown_serial_cache.is_rejected(serial_number):
+        license_snapshot = await crud.license.get_snapshot_async(db, serial_number=serial_number)
 
-    if not license_obj:
+    if not license_snapshot:
         raise HTTPException(
             status_code=403,
             detail=f"序號 '{serial_number}' 不存在於資料庫中，拒絕上傳。"
@@ -1,6 +1,7 @@
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query
 from fastapi.responses import FileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
 from datetime import datetime
 import os
@@ -11,8 +12,9 @@ from zoneinfo import ZoneInfo
 
 logger = logging.getLogger(__name__)
 
-from .... import models, schemas
-from ....core.dependencies import get_db
+from .... import crud, models, schemas
+from ....services.license_cache import unknown_serial_cache
+from ....core.dependencies import get_db, get_async_db
 from ....core import security
 
 # Public router (只有上傳端點)
@@ -55,7 +57,7 @@ async def upload_logs(
     serial_number: str = Form(...),
     files: List[UploadFile] = File(...),
     problem_description: Optional[str] = Form(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     上傳 log 檔案
@@ -65,11 +67,12 @@ async def upload_logs(
     - 同一時間上傳的檔案使用相同的批次 ID
     """
     # 驗證序號是否存在
-    license_obj = db.query(models.License).options(
-        joinedload(models.License.customer)
-    ).filter(models.License.serial_number == serial_number).first()
+    # 格式不符或最近查無此序號時不查詢資料庫
+    license_snapshot = None
+    if not unknown_serial_cache.is_rejected(serial_number):
+        license_snapshot = await crud.license.get_snapshot_async(db, serial_number=serial_number)
     
-    if not license_obj:
+    if not license_snapshot:
         raise HTTPException(
             status_code=403,
             detail=f"序號 '{serial_number}' 不存在於資料庫中，拒絕上傳。"
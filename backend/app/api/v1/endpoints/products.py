@@ -6,9 +6,17 @@ from sqlalchemy.orm import joinedload
 from .... import crud, models, schemas
 from ....core.dependencies import get_db
 from ....core import security
+from ....services.signing_keys import signing_keys
 
 router = APIRouter()
 
+def _check_signing_key(product_in) -> None:
+    if product_in.signing_key_id and signing_keys.get(product_in.signing_key_id) is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Signing key '{product_in.signing_key_id}' is not loaded. Available keys: {', '.join(signing_keys.key_ids())}"
+        )
+
 @router.post("/", response_model=schemas.Product, dependencies=[Depends(security.get_current_active_admin)])
 def create_product(
     *,
@@ -18,6 +26,7 @@ def create_product(
     """
     Create new product.
     """
+    _check_signing_key(product_in)
     product = crud.product.create(db=db, obj_in=product_in)
     return product
 
@@ -59,6 +68,7 @@ def update_product(
     product = crud.product.get(db=db, id=product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
+    _check_signing_key(product_in)
     product = crud.product.update(db=db, db_obj=product, obj_in=product_in)
     return product
 
@@ -1,13 +1,25 @@
+import asyncio
+from dataclasses import dataclass
 from fastapi import APIRouter, Depends, HTTPException, status, Request, Body
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional, Tuple
 from app import crud, models, schemas
-from app.core.dependencies import get_db
+from app.core.config import settings
+from app.core.dependencies import get_async_db
 from app.core.utils import get_real_ip
-from app.services import license_service
-from app.core.rate_limiter import limiter
+from app.models.activation import get_machine_code_prefix
+from app.services import license_service, activation_resolver
+from app.services.blacklist_filter import blacklist_filter
+from app.services.hardware_ids import activation_hardware_values
+from app.services.idempotency import run_idempotent
+from app.services.signing_executor import SigningUnavailableError
+from app.services.event_buffer import event_log_buffer
+from app.services.heartbeats import Heartbeat, heartbeat_buffer, make_heartbeat
+from app.services.license_cache import invalidate_license, unknown_serial_cache
+from app.core.rate_limiter import limiter, public_ip_limit, get_ip_serial_key, get_serial_number_key
 
 router = APIRouter()
 
@@ -27,6 +39,14 @@ def health_check(request: Request):
         "uptime_check": True
     }
 
+def _ensure_activatable(license_obj) -> None:
+    """license_obj 可以是 License 或 LicenseSnapshot"""
+    if license_obj.status not in ['active', 'pending']:
+        raise HTTPException(status_code=400, detail=f"License status is {license_obj.status} and cannot be activated.")
+
+    if license_obj.expires_at and license_obj.expires_at < datetime.utcnow():
+        raise HTTPException(status_code=400, detail="License has expired.")
+
 class ActivationRequest(BaseModel):
     serial_number: str
     machine_code: str
@@ -34,83 +54,78 @@ class ActivationRequest(BaseModel):
     motherboard_id: Optional[str] = None
     disk_id: Optional[str] = None
     app_version: Optional[str] = None
+    license_digest: Optional[str] = None  # 用戶端現有授權檔的 digest，相同時 /validate 不重新簽發
 
 @router.post("/activate")
-@limiter.limit("10/minute")
+@limiter.limit("10/minute", key_func=get_ip_serial_key)
+@public_ip_limit
 async def activate_license(
     request: Request,
     activation_in: ActivationRequest = Body(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Activate a license with a serial number and machine code.
     """
-    print(await request.body())
-    license_obj = db.query(models.License).options(joinedload(models.License.customer)).filter(models.License.serial_number == activation_in.serial_number).first()
-    if not license_obj:
+    if unknown_serial_cache.is_rejected(activation_in.serial_number):
         raise HTTPException(status_code=404, detail="Serial number not found.")
+    print(await request.body())
+    # 帶 Idempotency-Key 的重送直接回放第一次的回應
+    return await run_idempotent(
+        db, request,
+        endpoint="activate",
+        serial_number=activation_in.serial_number,
+        payload=activation_in.model_dump(),
+        handler=lambda: _activate_license(request, activation_in, db),
+    )
 
-    if license_obj.status not in ['active', 'pending']:
-        raise HTTPException(status_code=400, detail=f"License status is {license_obj.status} and cannot be activated.")
+async def _activate_license(request: Request, activation_in: ActivationRequest, db: AsyncSession) -> dict:
+    # 先以快照擋下不存在或無法啟用的授權，不需查詢資料庫
+    snapshot = await crud.license.get_snapshot_async(db, serial_number=activation_in.serial_number)
+    if not snapshot:
+        raise HTTPException(status_code=404, detail="Serial number not found.")
+    _ensure_activatable(snapshot)
 
-    if license_obj.expires_at and license_obj.expires_at < datetime.utcnow():
-        raise HTTPException(status_code=400, detail="License has expired.")
+    license_obj = await crud.license.get_by_serial_number_async(db, serial_number=activation_in.serial_number)
+    if not license_obj:
+        raise HTTPException(status_code=404, detail="Serial number not found.")
+    # 快照可能是其他 worker 修改前的內容，以資料庫為準再檢查一次
+    _ensure_activatable(license_obj)
 
-    active_activations = crud.activation.get_activations_by_license_id(db, license_id=license_obj.id)
-    machine_code_prefix = activation_in.machine_code[:16] if len(activation_in.machine_code) >= 16 else activation_in.machine_code
-    is_already_activated = any(act.machine_code.startswith(machine_code_prefix) for act in active_activations)
+    # 黑名單上的電腦不可重新啟用；與 /validate 相同，只有索引判斷可能相符時才查詢黑名單記錄
+    if blacklist_filter.might_be_blacklisted(license_obj.id, activation_in):
+        blacklisted_activations = await crud.activation.get_blacklisted_by_license_async(db, license_id=license_obj.id)
+        if activation_resolver.find_blacklisted_activation(blacklisted_activations, activation_in):
+            raise HTTPException(status_code=403, detail="此電腦已被列入取消清單，無法啟用授權。")
 
-    if len(active_activations) >= license_obj.max_activations and not is_already_activated:
-        raise HTTPException(
-            status_code=403, 
-            detail="Maximum activation limit reached for this serial number."
+    machine_code_prefix = get_machine_code_prefix(activation_in.machine_code)
+    # 名額已滿時只有已啟用過的機器可以重新啟用
+    if license_obj.active_activation_count >= license_obj.max_activations:
+        is_already_activated = await crud.activation.has_active_machine_code_prefix_async(
+            db, license_id=license_obj.id, machine_code_prefix=machine_code_prefix
         )
+        if not is_already_activated:
+            raise HTTPException(
+                status_code=403, 
+                detail="Maximum activation limit reached for this serial number."
+            )
 
     existing_activation = None
 
     # 1. 先檢查是否有相同的 machine_code (前16碼)
-    machine_code_prefix = activation_in.machine_code[:16] if len(activation_in.machine_code) >= 16 else activation_in.machine_code
-    existing_activation = db.query(models.Activation).filter(
+    existing_activation = await db.scalar(select(models.Activation).where(
         models.Activation.license_id == license_obj.id,
-        models.Activation.machine_code.like(f"{machine_code_prefix}%")
-    ).first()
+        models.Activation.machine_code_prefix == machine_code_prefix
+    ).order_by(models.Activation.id).limit(1))
 
     # 2. 如果沒有找到相同的 machine_code，檢查硬體ID匹配
     if not existing_activation and (activation_in.keypro_id or activation_in.motherboard_id or activation_in.disk_id):
-        # 不可用的 disk_id 名單 - 可以自行增加
-        blacklisted_disk_ids = ['DAHA']  # 其他不可用的 ID 可以加在這裡
-        
-        def is_valid_disk_id(disk_id: str) -> bool:
-            """檢查 disk_id 是否有效
-            - 以 'Volume' 開頭的 ID 視為無意義
-            - 在黑名單中的 ID 也視為無意義
-            """
-            if not disk_id:
-                return False
-            # 檢查是否以 Volume 開頭
-            if disk_id.startswith('Volume'):
-                return False
-            # 檢查是否在黑名單中
-            if disk_id in blacklisted_disk_ids:
-                return False
-            return True
-        
-        query = db.query(models.Activation).filter(
-            models.Activation.license_id == license_obj.id,
-            models.Activation.status == 'active'
-        )
-        
-        conditions = []
-        if activation_in.keypro_id:
-            conditions.append(models.Activation.keypro_id == activation_in.keypro_id)
-        if activation_in.motherboard_id:
-            conditions.append(models.Activation.motherboard_id == activation_in.motherboard_id)
-        if activation_in.disk_id and is_valid_disk_id(activation_in.disk_id):
-            conditions.append(models.Activation.disk_id == activation_in.disk_id)
-        
-        if conditions:
-            from sqlalchemy import or_
-            existing_activation = query.filter(or_(*conditions)).first()
+        # 以 activation_hardware_ids 索引比對（排除規則見 services.hardware_ids）
+        hardware_values = activation_hardware_values(activation_in)
+        if hardware_values:
+            existing_activation = await crud.activation.find_by_hardware_ids_async(
+                db, license_id=license_obj.id, hardware_values=hardware_values
+            )
             
             # 如果找到匹配的硬體ID，更新機器碼和IP地址
             if existing_activation:
@@ -119,6 +134,14 @@ async def activate_license(
                 print(f"Updated machine code and IP for license {license_obj.serial_number} due to hardware match")
 
     if not existing_activation:
+        # 以條件式 UPDATE 佔用名額，同時進行的啟用不會超過 max_activations
+        if not await crud.license.reserve_activation_slot_async(db, license_id=license_obj.id):
+            await db.rollback()
+            raise HTTPException(
+                status_code=403, 
+                detail="Maximum activation limit reached for this serial number."
+            )
+
         # 建立新的啟用記錄，包含硬體ID資訊
         activation_create_data = {
             "license_id": license_obj.id,
@@ -132,7 +155,7 @@ async def activate_license(
         activation_create_data["disk_id"] = activation_in.disk_id
         activation_create_data["app_version"] = activation_in.app_version
             
-        new_activation = crud.activation.create(db, obj_in=schemas.ActivationCreate(**activation_create_data))
+        new_activation = await crud.activation.create_async(db, obj_in=schemas.ActivationCreate(**activation_create_data), commit=False)
         
         # 記錄新啟用事件
         event_data = {
@@ -154,7 +177,7 @@ async def activate_license(
             },
             "severity": "info"
         }
-        crud.event_log.create(db, obj_in=schemas.EventLogCreate(**event_data))
+        await event_log_buffer.record(db, schemas.EventLogCreate(**event_data), commit=False)
     else:
         # 檢查 keypro_id 限制：如果序號已經有 keypro_id，且新的 keypro_id 不同，則禁止
         if activation_in.keypro_id and existing_activation.keypro_id and existing_activation.keypro_id != activation_in.keypro_id:
@@ -178,7 +201,7 @@ async def activate_license(
             "disk_id": activation_in.disk_id,
             "ip_address": get_real_ip(request)
         }
-        crud.activation.update(db, db_obj=existing_activation, obj_in=update_data)
+        await crud.activation.update_async(db, db_obj=existing_activation, obj_in=update_data, commit=False)
         
         # 記錄重複啟用事件
         event_type = "re_activation"
@@ -253,14 +276,15 @@ async def activate_license(
             "details": details,
             "severity": severity
         }
-        crud.event_log.create(db, obj_in=schemas.EventLogCreate(**event_data))
+        await event_log_buffer.record(db, schemas.EventLogCreate(**event_data), commit=False)
     
-    if license_obj.status == 'pending':
+    status_changed = license_obj.status == 'pending'
+    if status_changed:
         license_obj.status = 'active'
         db.add(license_obj)
-        db.commit()
-        db.refresh(license_obj)
+    await db.flush()
 
+    # 先產生授權檔再 commit：簽章失敗時整個啟用流程一起 rollback
     try:
         # 準備硬體ID資訊
         hardware_ids = {}
@@ -271,210 +295,166 @@ async def activate_license(
         if activation_in.disk_id:
             hardware_ids["disk"] = activation_in.disk_id
             
-        lic_content_bytes = license_service.generate_license_file_content(
+        issued = await license_service.issue_license_file_async(
             license_obj=license_obj,
             machine_code=activation_in.machine_code,
             hardware_ids=hardware_ids if hardware_ids else None,
-            app_version=activation_in.app_version
+            app_version=activation_in.app_version,
+            activation_id=existing_activation.id if existing_activation else new_activation.id
         )
+    except SigningUnavailableError:
+        await db.rollback()
+        raise HTTPException(status_code=503, detail="License signing is busy, please retry later.")
     except Exception as e:
+        await db.rollback()
         import traceback
         error_detail = f"Failed to generate license file: {str(e)}"
         print(f"License generation error: {error_detail}")
         print(f"Traceback: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=error_detail)
 
+    # 整個啟用流程只 commit 一次
+    await db.commit()
+    if status_changed:
+        invalidate_license(license_obj.serial_number)
+
     return {
         "status": "success", 
         "message": "License activated successfully.",
-        "license_file_content": lic_content_bytes.decode('utf-8')
+        "license_file_content": issued.content.decode('utf-8'),
+        "license_digest": issued.digest,
+        "next_check_after": license_service.next_check_after(issued.lease)
     }
 
 @router.post("/deactivate")
-@limiter.limit("1/minute")
+@limiter.limit("1/minute", key_func=get_ip_serial_key)
+@public_ip_limit
 async def deactivate_license(
     request: Request,
     activation_in: ActivationRequest = Body(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Deactivate a license for a specific machine.
     """
+    if unknown_serial_cache.is_rejected(activation_in.serial_number):
+        raise HTTPException(status_code=404, detail="Serial number not found.")
     print(await request.body())
-    license_obj = db.query(models.License).options(joinedload(models.License.customer)).filter(models.License.serial_number == activation_in.serial_number).first()
-    if not license_obj:
+    return await run_idempotent(
+        db, request,
+        endpoint="deactivate",
+        serial_number=activation_in.serial_number,
+        payload=activation_in.model_dump(),
+        handler=lambda: _deactivate_license(activation_in, db),
+    )
+
+async def _deactivate_license(activation_in: ActivationRequest, db: AsyncSession) -> dict:
+    snapshot = await crud.license.get_snapshot_async(db, serial_number=activation_in.serial_number)
+    if not snapshot:
         raise HTTPException(status_code=404, detail="Serial number not found.")
 
-    activation_obj = db.query(models.Activation).filter(
-        models.Activation.license_id == license_obj.id,
+    activation_obj = await db.scalar(select(models.Activation).where(
+        models.Activation.license_id == snapshot.id,
         models.Activation.machine_code == activation_in.machine_code,
         models.Activation.status == 'active'
-    ).first()
+    ).limit(1))
 
     if not activation_obj:
         raise HTTPException(status_code=404, detail="No active license found for this machine.")
 
-    db.delete(activation_obj)
-    db.commit()
+    await db.delete(activation_obj)
+    await crud.license.release_activation_slot_async(db, license_id=snapshot.id)
+    # 已無任何啟用時改回 pending
+    status_changed = await crud.license.mark_pending_if_unused_async(db, license_id=snapshot.id)
+    await db.commit()
 
-    remaining_activations = db.query(models.Activation).filter(
-        models.Activation.license_id == license_obj.id,
-        models.Activation.status == 'active'
-    ).count()
-
-    if remaining_activations == 0:
-        license_obj.status = 'pending'
-        db.add(license_obj)
-        db.commit()
-        db.refresh(license_obj)
+    if status_changed:
+        invalidate_license(snapshot.serial_number)
 
     return {"status": "success", "message": "License deactivated and freed up successfully."}
 
-@router.post("/validate")
-@limiter.limit("30/minute", methods=["POST"])
-async def validate_license(
+@dataclass
+class _PreparedValidation:
+    activation: models.Activation
+    # 因硬體ID匹配而停用的原始啟用記錄，用於判斷硬體變化
+    original_activation: Optional[dict] = None
+
+
+async def _prepare_validation(
     request: Request,
-    activation_in: ActivationRequest = Body(...),
-    db: Session = Depends(get_db),
-):
+    db: AsyncSession,
+    license_obj: models.License,
+    activation_in: ActivationRequest,
+    commit: bool = True,
+) -> _PreparedValidation:
     """
-    Validate an existing activation and get the latest license file.
+    比對單一機器的啟用記錄；驗證時間與 IP 由 heartbeat_buffer 批次寫入。
+    commit=False 時只 flush，由呼叫端（批次驗證）統一 commit。
     """
-    print(await request.body())
-    license_obj = db.query(models.License).options(joinedload(models.License.customer)).filter(models.License.serial_number == activation_in.serial_number).first()
-    if not license_obj:
-        raise HTTPException(status_code=404, detail="Serial number not found.")
+    # 黑名單記錄未隨授權載入，只有索引判斷可能相符時才查詢
+    blacklisted_activations = []
+    if blacklist_filter.might_be_blacklisted(license_obj.id, activation_in):
+        blacklisted_activations = await crud.activation.get_blacklisted_by_license_async(db, license_id=license_obj.id)
 
-    # 1. 首先檢查是否有黑名單的啟用記錄
-    # 檢查機器碼匹配的黑名單記錄
-    blacklisted_activation = db.query(models.Activation).filter(
-        models.Activation.license_id == license_obj.id,
-        models.Activation.machine_code == activation_in.machine_code,
-        models.Activation.motherboard_id == activation_in.motherboard_id,
-        models.Activation.disk_id == activation_in.disk_id,
-        models.Activation.status == 'blacklisted'
-    ).first()
-    
-    # 如果沒有機器碼匹配的黑名單記錄，檢查硬體ID匹配
-    if not blacklisted_activation and (activation_in.keypro_id or activation_in.motherboard_id or activation_in.disk_id):
-        query = db.query(models.Activation).filter(
-            models.Activation.license_id == license_obj.id,
-            models.Activation.status == 'blacklisted'
-        )
-        
-        conditions = []
-        ambiguous_disk_id = ['Volume', 'DAHA']
-        if activation_in.keypro_id:
-            conditions.append(models.Activation.keypro_id == activation_in.keypro_id)
-        if activation_in.motherboard_id:
-            conditions.append(models.Activation.motherboard_id == activation_in.motherboard_id)
-        if activation_in.disk_id and any(id_part in activation_in.disk_id for id_part in ambiguous_disk_id):
-            conditions.append(models.Activation.disk_id == activation_in.disk_id)
-        
-        if conditions:
-            from sqlalchemy import or_
-            blacklisted_activation = query.filter(or_(*conditions)).first()
-    
-    if blacklisted_activation:
-        raise HTTPException(status_code=403, detail="此電腦已被列入取消清單，無法驗證授權。")
+    # 在記憶體中依序比對：黑名單 → 機器碼 → KeyPro 限制 → 硬體ID
+    resolution = activation_resolver.resolve_validation(license_obj, activation_in, blacklisted_activations)
 
-    # 2. 尋找現有的啟用記錄
-    activation_obj = db.query(models.Activation).filter(
-        models.Activation.license_id == license_obj.id,
-        models.Activation.machine_code == activation_in.machine_code,
-        models.Activation.status == 'active'
-    ).first()
+    if resolution.outcome == 'blacklisted':
+        raise HTTPException(status_code=403, detail="此電腦已被列入取消清單，無法驗證授權。")
 
-    # 3. 如果找不到對應的 machine_code，檢查是否有硬體ID匹配
-    if not activation_obj and (activation_in.keypro_id or activation_in.motherboard_id or activation_in.disk_id):
-        # 首先檢查 keypro_id 限制：如果序號已經有 keypro_id，且新的 keypro_id 不同，則禁止
-        if activation_in.keypro_id:
-            existing_keypro = db.query(models.Activation).filter(
-                models.Activation.license_id == license_obj.id,
-                models.Activation.status == 'active',
-                models.Activation.keypro_id.isnot(None),
-                models.Activation.keypro_id != activation_in.keypro_id
-            ).first()
-            
-            if existing_keypro:
-                raise HTTPException(
-                    status_code=403, 
-                    detail=f"此序號已綁定其他 KeyPro，無法更換，如需要更換，請聯繫客服。"
-                )
-        
-        # 尋找有任何硬體ID匹配的啟用記錄
-        query = db.query(models.Activation).filter(
-            models.Activation.license_id == license_obj.id,
-            models.Activation.status == 'active'
+    if resolution.outcome == 'keypro_conflict':
+        raise HTTPException(
+            status_code=403, 
+            detail=f"此序號已綁定其他 KeyPro，無法更換，如需要更換，請聯繫客服。"
         )
+
+    activation_obj = resolution.activation
+    original_activation = None
+
+    if resolution.outcome == 'hardware_match':
+        # 找到匹配的硬體ID，創建新的啟用記錄而不是更新現有的
+        # 保存原始資訊用於後續比較
+        original_activation = {
+            "machine_code": activation_obj.machine_code,
+            "keypro_id": activation_obj.keypro_id,
+            "motherboard_id": activation_obj.motherboard_id,
+            "disk_id": activation_obj.disk_id,
+            "app_version": activation_obj.app_version,
+        }
         
-        conditions = []
-        # 不可用的 disk_id 名單 - 可以自行增加
-        blacklisted_disk_ids = ['DAHA']  # 其他不可用的 ID 可以加在這裡
+        # 停用舊的啟用記錄
+        activation_obj.status = 'deactivated'
+        activation_obj.deactivated_at = datetime.utcnow()
+        db.add(activation_obj)
         
-        def is_valid_disk_id(disk_id: str) -> bool:
-            """檢查 disk_id 是否有效
-            - 以 'Volume' 開頭的 ID 視為無意義
-            - 在黑名單中的 ID 也視為無意義
-            """
-            if not disk_id:
-                return False
-            # 檢查是否以 Volume 開頭
-            if disk_id.startswith('Volume'):
-                return False
-            # 檢查是否在黑名單中
-            if disk_id in blacklisted_disk_ids:
-                return False
-            return True
+        # 創建新的啟用記錄
+        # 如果原本的啟用記錄有 keypro_id，但新的請求中沒有 keypro_id，
+        # 則保持原本的 keypro_id，不設為 null
+        preserved_keypro_id = activation_in.keypro_id
+        if not activation_in.keypro_id and original_activation["keypro_id"]:
+            preserved_keypro_id = original_activation["keypro_id"]
         
-        if activation_in.keypro_id:
-            conditions.append(models.Activation.keypro_id == activation_in.keypro_id)
-        if activation_in.motherboard_id:
-            conditions.append(models.Activation.motherboard_id == activation_in.motherboard_id)
-        if activation_in.disk_id and is_valid_disk_id(activation_in.disk_id):
-            conditions.append(models.Activation.disk_id == activation_in.disk_id)
+        new_activation = models.Activation(
+            license_id=license_obj.id,
+            machine_code=activation_in.machine_code,
+            keypro_id=preserved_keypro_id,
+            motherboard_id=activation_in.motherboard_id,
+            disk_id=activation_in.disk_id,
+            app_version=activation_in.app_version,
+            ip_address=get_real_ip(request),
+            status='active',
+            activated_at=datetime.utcnow()
+        )
+        # 加入已載入的 activations，同一批次後續的比對才看得到新記錄
+        license_obj.activations.append(new_activation)
+        db.add(new_activation)
+        if commit:
+            await db.commit()
+        else:
+            await db.flush()
         
-        if conditions:
-            from sqlalchemy import or_
-            activation_obj = query.filter(or_(*conditions)).first()
-            
-            # 如果找到匹配的硬體ID，創建新的啟用記錄而不是更新現有的
-            if activation_obj:
-                # 保存原始資訊用於後續比較
-                original_machine_code = activation_obj.machine_code
-                original_keypro_id = activation_obj.keypro_id
-                original_motherboard_id = activation_obj.motherboard_id
-                original_disk_id = activation_obj.disk_id
-                original_app_version = activation_obj.app_version
-                
-                # 停用舊的啟用記錄
-                activation_obj.status = 'deactivated'
-                activation_obj.deactivated_at = datetime.utcnow()
-                db.add(activation_obj)
-                
-                # 創建新的啟用記錄
-                # 如果原本的啟用記錄有 keypro_id，但新的請求中沒有 keypro_id，
-                # 則保持原本的 keypro_id，不設為 null
-                preserved_keypro_id = activation_in.keypro_id
-                if not activation_in.keypro_id and original_keypro_id:
-                    preserved_keypro_id = original_keypro_id
-                
-                new_activation = models.Activation(
-                    license_id=license_obj.id,
-                    machine_code=activation_in.machine_code,
-                    keypro_id=preserved_keypro_id,
-                    motherboard_id=activation_in.motherboard_id,
-                    disk_id=activation_in.disk_id,
-                    app_version=activation_in.app_version,
-                    ip_address=get_real_ip(request),
-                    status='active',
-                    activated_at=datetime.utcnow()
-                )
-                db.add(new_activation)
-                db.commit()
-                
-                activation_obj = new_activation
-                print(f"Created new activation for license {license_obj.serial_number} due to hardware change")
+        activation_obj = new_activation
+        print(f"Created new activation for license {license_obj.serial_number} due to hardware change")
 
     if not activation_obj:
         raise HTTPException(status_code=403, detail="序號與電腦配對失敗。")
@@ -482,11 +462,21 @@ async def validate_license(
     if license_obj.status != 'active':
         raise HTTPException(status_code=403, detail="授權已不再有效。")
 
-    activation_obj.last_validated_at = datetime.utcnow()
-    activation_obj.ip_address = get_real_ip(request)
-    db.add(activation_obj)
-    db.commit()
+    # 不在這裡寫入 last_validated_at/ip_address：每次驗證都對最熱門的啟用記錄開寫入交易，
+    # 改由 _issue_validation_response 產生的 heartbeat 合併後批次更新
+    return _PreparedValidation(activation=activation_obj, original_activation=original_activation)
 
+
+async def _issue_validation_response(
+    request: Request,
+    license_obj: models.License,
+    activation_in: ActivationRequest,
+    prepared: _PreparedValidation,
+) -> Tuple[dict, List[schemas.EventLogCreate], Heartbeat]:
+    """
+    簽發授權檔並組出回應內容，回傳 (response_data, 待記錄的事件, 本次驗證的 heartbeat)。
+    """
+    activation_obj = prepared.activation
     try:
         # 準備硬體ID資訊
         hardware_ids = {}
@@ -514,65 +504,62 @@ async def validate_license(
                 # 允許降級，生成授權時加入 degraded_at
                 hardware_ids["degraded_at"] = datetime.utcnow().isoformat() + "Z"
             
-        lic_content_bytes = license_service.generate_license_file_content(
+        # 用戶端持有的授權檔與目前內容相同時，不會重新加密（issued.content 為 None）
+        issued = await license_service.issue_license_file_async(
             license_obj=license_obj,
             machine_code=activation_obj.machine_code,  # 使用可能已更新的 machine_code
             hardware_ids=hardware_ids if hardware_ids else None,
-            app_version=activation_in.app_version  # 傳遞應用程式版本
+            app_version=activation_in.app_version,  # 傳遞應用程式版本
+            activation_id=activation_obj.id,
+            client_digest=activation_in.license_digest
         )
         
+    except SigningUnavailableError:
+        raise HTTPException(status_code=503, detail="授權簽章忙碌中，請稍後再試。")
     except Exception as e:
         raise HTTPException(status_code=500, detail="授權檔案生成失敗。")
 
     # 檢查是否有硬體變化需要更新
     # 如果是在硬體ID匹配情況下創建的新啟用記錄，使用原始資訊進行比較
-    if 'original_machine_code' in locals():
-        machine_code_updated = original_machine_code != activation_in.machine_code
-        hardware_updated = (
-            (activation_in.keypro_id and activation_in.keypro_id != original_keypro_id) or
-            (activation_in.motherboard_id and activation_in.motherboard_id != original_motherboard_id) or
-            (activation_in.disk_id and activation_in.disk_id != original_disk_id)
-        )
-    else:
-        # 正常情況下的比較
-        machine_code_updated = activation_obj.machine_code != activation_in.machine_code
-        hardware_updated = (
-            (activation_in.keypro_id and activation_in.keypro_id != activation_obj.keypro_id) or
-            (activation_in.motherboard_id and activation_in.motherboard_id != activation_obj.motherboard_id) or
-            (activation_in.disk_id and activation_in.disk_id != activation_obj.disk_id)
-        )
-
-    response_data = {
-        "status": "success",
-        "message": "授權驗證成功。",
-        "license_file_content": lic_content_bytes.decode('utf-8')
+    original = prepared.original_activation or {
+        "machine_code": activation_obj.machine_code,
+        "keypro_id": activation_obj.keypro_id,
+        "motherboard_id": activation_obj.motherboard_id,
+        "disk_id": activation_obj.disk_id,
+        "app_version": activation_obj.app_version,
     }
+    machine_code_updated = original["machine_code"] != activation_in.machine_code
+    hardware_updated = (
+        (activation_in.keypro_id and activation_in.keypro_id != original["keypro_id"]) or
+        (activation_in.motherboard_id and activation_in.motherboard_id != original["motherboard_id"]) or
+        (activation_in.disk_id and activation_in.disk_id != original["disk_id"])
+    )
+
+    if issued.content is None:
+        response_data = {
+            "status": "success",
+            "message": "授權驗證成功。授權檔案未變更。",
+            "license_unchanged": True,
+            "license_digest": issued.digest,
+            "next_check_after": license_service.next_check_after(issued.lease)
+        }
+    else:
+        response_data = {
+            "status": "success",
+            "message": "授權驗證成功。",
+            "license_file_content": issued.content.decode('utf-8'),
+            "license_digest": issued.digest,
+            "next_check_after": license_service.next_check_after(issued.lease)
+        }
     
-    # 記錄正常驗證事件（預設已確認）
-    validation_event_data = {
-        "license_id": license_obj.id,
-        "activation_id": activation_obj.id,
-        "event_type": "validation",
-        "event_subtype": "normal_validation",
-        "serial_number": license_obj.serial_number,
-        "machine_code": activation_in.machine_code,
-        "ip_address": get_real_ip(request),
-        "user_agent": request.headers.get("user-agent"),
-        "details": {
-            "validation_successful": True,
-            "hardware_ids": {
-                "keypro_id": activation_in.keypro_id,
-                "motherboard_id": activation_in.motherboard_id,
-                "disk_id": activation_in.disk_id
-            },
-            "app_version": activation_in.app_version
-        },
-        "severity": "info",
-        "is_confirmed": True,  # 正常驗證預設已確認
-        "confirmed_by": "system",
-        "confirmed_at": datetime.utcnow()
-    }
-    crud.event_log.create(db, obj_in=schemas.EventLogCreate(**validation_event_data))
+    # 正常驗證只累計到每日 heartbeat，不寫入 event_logs
+    heartbeat = make_heartbeat(
+        activation_id=activation_obj.id,
+        license_id=license_obj.id,
+        ip_address=get_real_ip(request),
+        app_version=activation_in.app_version,
+    )
+    events: List[schemas.EventLogCreate] = []
     
     # 如果有硬體變化，添加更新標記並記錄事件
     if machine_code_updated or hardware_updated:
@@ -593,14 +580,137 @@ async def validate_license(
                 "machine_code_updated": machine_code_updated,
                 "hardware_updated": hardware_updated,
                 "hardware_changes": {
-                    "keypro_id": {"old": original_keypro_id if 'original_keypro_id' in locals() else activation_obj.keypro_id, "new": activation_in.keypro_id},
-                    "motherboard_id": {"old": original_motherboard_id if 'original_motherboard_id' in locals() else activation_obj.motherboard_id, "new": activation_in.motherboard_id},
-                    "disk_id": {"old": original_disk_id if 'original_disk_id' in locals() else activation_obj.disk_id, "new": activation_in.disk_id}
+                    "keypro_id": {"old": original["keypro_id"], "new": activation_in.keypro_id},
+                    "motherboard_id": {"old": original["motherboard_id"], "new": activation_in.motherboard_id},
+                    "disk_id": {"old": original["disk_id"], "new": activation_in.disk_id}
                 },
-                "app_version": {"old": original_app_version if 'original_app_version' in locals() else activation_obj.app_version, "new": activation_in.app_version}
+                "app_version": {"old": original["app_version"], "new": activation_in.app_version}
             },
             "severity": "suspicious"
         }
-        crud.event_log.create(db, obj_in=schemas.EventLogCreate(**event_data))
+        events.append(schemas.EventLogCreate(**event_data))
+    
+    return response_data, events, heartbeat
+
+
+@router.post("/validate")
+@limiter.limit("30/minute", key_func=get_ip_serial_key, methods=["POST"])
+@public_ip_limit
+async def validate_license(
+    request: Request,
+    activation_in: ActivationRequest = Body(...),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Validate an existing activation and get the latest license file.
+    """
+    if unknown_serial_cache.is_rejected(activation_in.serial_number):
+        raise HTTPException(status_code=404, detail="Serial number not found.")
+    print(await request.body())
+    license_obj = await crud.license.get_by_serial_number_with_activations_async(
+        db, serial_number=activation_in.serial_number, include_blacklisted=False
+    )
+    if not license_obj:
+        raise HTTPException(status_code=404, detail="Serial number not found.")
+
+    prepared = await _prepare_validation(request, db, license_obj, activation_in)
+    response_data, events, heartbeat = await _issue_validation_response(request, license_obj, activation_in, prepared)
+
+    await heartbeat_buffer.record(db, [heartbeat])
+    for event_in in events:
+        await event_log_buffer.record(db, event_in)
     
-    return response_data
\ No newline at end of file
+    return response_data
+
+
+class BatchValidationRequest(BaseModel):
+    serial_number: str
+    activations: List[ActivationRequest]
+
+
+def _batch_error(activation_in: ActivationRequest, exc: HTTPException) -> dict:
+    return {
+        "machine_code": activation_in.machine_code,
+        "status": "error",
+        "status_code": exc.status_code,
+        "detail": exc.detail,
+    }
+
+
+@router.post("/validate/batch")
+@limiter.limit("30/minute", key_func=get_serial_number_key, methods=["POST"])
+@public_ip_limit
+async def validate_license_batch(
+    request: Request,
+    batch_in: BatchValidationRequest = Body(...),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Validate several machines that share one serial number in a single request.
+    授權與啟用記錄只載入一次，每台機器依 /validate 相同的規則比對，
+    結果依請求順序回傳；單一機器失敗不影響其他機器。限流以序號計算而非來源 IP。
+    """
+    if not batch_in.activations:
+        raise HTTPException(status_code=400, detail="No activations to validate.")
+    if len(batch_in.activations) > settings.VALIDATE_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.VALIDATE_BATCH_MAX_SIZE} activations can be validated per request."
+        )
+
+    if unknown_serial_cache.is_rejected(batch_in.serial_number):
+        raise HTTPException(status_code=404, detail="Serial number not found.")
+    license_obj = await crud.license.get_by_serial_number_with_activations_async(
+        db, serial_number=batch_in.serial_number, include_blacklisted=False
+    )
+    if not license_obj:
+        raise HTTPException(status_code=404, detail="Serial number not found.")
+
+    results: List[Optional[dict]] = [None] * len(batch_in.activations)
+    prepared_items = []
+    for index, activation_in in enumerate(batch_in.activations):
+        if activation_in.serial_number != license_obj.serial_number:
+            results[index] = _batch_error(
+                activation_in, HTTPException(status_code=400, detail="序號與批次序號不一致。")
+            )
+            continue
+        try:
+            prepared = await _prepare_validation(request, db, license_obj, activation_in, commit=False)
+        except HTTPException as e:
+            results[index] = _batch_error(activation_in, e)
+            continue
+        prepared_items.append((index, activation_in, prepared))
+
+    # 硬體變化產生的啟用記錄異動一次 commit
+    await db.commit()
+
+    issued_items = await asyncio.gather(
+        *(
+            _issue_validation_response(request, license_obj, activation_in, prepared)
+            for _, activation_in, prepared in prepared_items
+        ),
+        return_exceptions=True,
+    )
+
+    events: List[schemas.EventLogCreate] = []
+    heartbeats: List[Heartbeat] = []
+    for (index, activation_in, _), issued in zip(prepared_items, issued_items):
+        if isinstance(issued, HTTPException):
+            results[index] = _batch_error(activation_in, issued)
+            continue
+        if isinstance(issued, BaseException):
+            raise issued
+        response_data, item_events, heartbeat = issued
+        results[index] = {"machine_code": activation_in.machine_code, "status_code": 200, **response_data}
+        events.extend(item_events)
+        heartbeats.append(heartbeat)
+
+    await heartbeat_buffer.record(db, heartbeats)
+    # 整批事件以單一 bulk insert 寫入
+    await crud.event_log.create_multi_async(db, objs_in=[event_in.model_dump() for event_in in events])
+
+    return {
+        "status": "success",
+        "serial_number": license_obj.serial_number,
+        "results": results,
+    }
@@ -1,5 +1,6 @@
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Body
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
 from datetime import datetime
 import os
@@ -13,8 +14,9 @@ import pandas as pd
 
 logger = logging.getLogger(__name__)
 
-from .... import models, schemas
-from ....core.dependencies import get_db
+from .... import crud, models, schemas
+from ....services.license_cache import unknown_serial_cache
+from ....core.dependencies import get_db, get_async_db
 from ....core import security
 
 # Public router (只有上傳端點)
@@ -83,7 +85,7 @@ async def upload_training_data(
     month: int = Form(...),
     invoices_data: str = Form(...),  # JSON 字串
     images: List[UploadFile] = File(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     上傳訓練資料
@@ -93,11 +95,12 @@ async def upload_training_data(
     - 處理 CSV 合併邏輯（同年度月份新增，重複發票覆蓋）
     """
     # 驗證序號是否存在
-    license_obj = db.query(models.License).options(
-        joinedload(models.License.customer)
-    ).filter(models.License.serial_number == serial_number).first()
+    # 格式不符或最近查無此序號時不查詢資料庫
+    license_snapshot = None
+    if not unknown_serial_cache.is_rejected(serial_number):
+        license_snapshot = await crud.license.get_snapshot_async(db, serial_number=serial_number)
     
-    if not license_obj:
+    if not license_snapshot:
         raise HTTPException(
             status_code=403,
             detail=f"序號 '{serial_number}' 不存在於資料庫中，拒絕上傳。"
@@ -20,6 +20,44 @@ class Settings(BaseSettings):
     # License generation settings
     LICENSE_AES_KEY: str = os.getenv("LICENSE_AES_KEY", "0123456789abcdef0123456789abcdef") # 32 bytes key
     LICENSE_PRIVATE_KEY: str = os.getenv("LICENSE_PRIVATE_KEY", "")
+    LICENSE_FILE_CACHE_SIZE: int = int(os.getenv("LICENSE_FILE_CACHE_SIZE", "10000")) # 0 = disabled
+    LICENSE_SIGNING_WORKERS: int = int(os.getenv("LICENSE_SIGNING_WORKERS", "-1")) # -1 = CPU count, 0 = sign in a thread
+    LICENSE_SIGNING_MAX_PENDING: int = int(os.getenv("LICENSE_SIGNING_MAX_PENDING", "0")) # 0 = 4 x workers
+    LICENSE_SIGNING_TIMEOUT: float = float(os.getenv("LICENSE_SIGNING_TIMEOUT", "5")) # seconds
+    LICENSE_V2_MIN_APP_VERSION: str = os.getenv("LICENSE_V2_MIN_APP_VERSION", "") # clients at or above this app_version get AES-GCM v2 license files; empty = v1 only
+    LICENSE_LEASE_HOURS: int = int(os.getenv("LICENSE_LEASE_HOURS", "72")) # default validation lease length
+    LICENSE_SNAPSHOT_CACHE_SIZE: int = int(os.getenv("LICENSE_SNAPSHOT_CACHE_SIZE", "10000")) # 0 = disabled
+    LICENSE_SNAPSHOT_CACHE_TTL: float = float(os.getenv("LICENSE_SNAPSHOT_CACHE_TTL", "60")) # seconds
+    UNKNOWN_SERIAL_CACHE_SIZE: int = int(os.getenv("UNKNOWN_SERIAL_CACHE_SIZE", "50000")) # 0 = disabled
+    UNKNOWN_SERIAL_CACHE_TTL: float = float(os.getenv("UNKNOWN_SERIAL_CACHE_TTL", "30")) # seconds, at most 60; per worker, so other workers may reject a newly created serial for this long
+    LICENSE_SERIAL_FORMAT_CHECK: bool = os.getenv("LICENSE_SERIAL_FORMAT_CHECK", "false").lower() == "true" # reject serials not shaped like DUCKY-XXXXXXXX-XXXXXXXX without a DB lookup; enable only if no legacy/imported serial breaks that pattern
+    # 不參與硬體比對的硬體ID，格式為 kind:value，結尾 * 表示前綴比對（不分大小寫）
+    HARDWARE_ID_EXCLUSIONS: str = os.getenv("HARDWARE_ID_EXCLUSIONS", "disk:Volume*,disk:DAHA")
+    BLACKLIST_FILTER_REBUILD_SECONDS: int = int(os.getenv("BLACKLIST_FILTER_REBUILD_SECONDS", "300")) # how soon other workers see a new blacklist entry
+    VALIDATE_BATCH_MAX_SIZE: int = int(os.getenv("VALIDATE_BATCH_MAX_SIZE", "100")) # machines per /validate/batch request
+    IDEMPOTENCY_KEY_TTL_SECONDS: int = int(os.getenv("IDEMPOTENCY_KEY_TTL_SECONDS", "86400")) # how long /activate and /deactivate responses are replayed
+
+    # Event log write-behind buffer
+    EVENT_LOG_FLUSH_INTERVAL_MS: int = int(os.getenv("EVENT_LOG_FLUSH_INTERVAL_MS", "500"))
+    EVENT_LOG_FLUSH_MAX_ROWS: int = int(os.getenv("EVENT_LOG_FLUSH_MAX_ROWS", "200"))
+    EVENT_LOG_BUFFER_MAX: int = int(os.getenv("EVENT_LOG_BUFFER_MAX", "10000"))
+    EVENT_LOG_COUNT_REFRESH_SECONDS: int = int(os.getenv("EVENT_LOG_COUNT_REFRESH_SECONDS", "60")) # how often cached /admin/event-logs totals are recounted
+    EVENT_LOG_ARCHIVE_AFTER_DAYS: int = int(os.getenv("EVENT_LOG_ARCHIVE_AFTER_DAYS", "180")) # events older than this move to event_log_archives (unconfirmed suspicious/critical ones stay); 0 = keep forever
+    EVENT_LOG_ARCHIVE_BATCH_SIZE: int = int(os.getenv("EVENT_LOG_ARCHIVE_BATCH_SIZE", "5000")) # events moved per transaction
+
+    # Validation heartbeats (per activation per day, replaces normal_validation events)
+    HEARTBEAT_FLUSH_INTERVAL_SECONDS: float = float(os.getenv("HEARTBEAT_FLUSH_INTERVAL_SECONDS", "5")) # also the max staleness of activations.last_validated_at / ip_address
+    HEARTBEAT_BUFFER_MAX_KEYS: int = int(os.getenv("HEARTBEAT_BUFFER_MAX_KEYS", "10000")) # flush early once this many activation/day pairs are pending
+    HEARTBEAT_BUFFER_MAX_PENDING: int = int(os.getenv("HEARTBEAT_BUFFER_MAX_PENDING", "100000")) # hard cap while flushes keep failing; new activation/day pairs beyond it are dropped
+
+    # Rate limiting
+    # memory:// 僅限單一行程（測試用）；sqlite:///./rate_limits.db 供同一主機的多個 worker 共用；
+    # redis://host:6379/0 供多台主機共用（需安裝 redis 套件）
+    RATE_LIMIT_STORAGE_URI: str = os.getenv("RATE_LIMIT_STORAGE_URI", "memory://")
+    # 同一來源 IP 在 /activate、/deactivate、/validate、/validate/batch 的合計上限（不論序號），防止列舉序號
+    PUBLIC_IP_RATE_LIMIT: str = os.getenv("PUBLIC_IP_RATE_LIMIT", "120/minute")
+    # 只信任這些位址（反向代理）送來的 X-Forwarded-For / X-Real-IP；預設為本機與私有網段（docker-compose 的 nginx）
+    TRUSTED_PROXIES: str = os.getenv("TRUSTED_PROXIES", "127.0.0.1,::1,10.0.0.0/8,172.16.0.0/12,192.168.0.0/16")
 
     class Config:
         case_sensitive = True
@@ -1,5 +1,61 @@
 # app/core/rate_limiter.py
+import json
+
+from fastapi import Request
 from slowapi import Limiter
-from slowapi.util import get_remote_address
 
-limiter = Limiter(key_func=get_remote_address)
+from .config import settings
+from .utils import get_real_ip
+from . import rate_limit_storage  # noqa: F401  註冊 sqlite:// 儲存
+
+
+def _body_serial_number(request: Request):
+    """
+    取得請求 body 的 serial_number。
+    路由限流在 FastAPI 解析 body 之後才檢查，body 已快取在 request._body。
+    """
+    try:
+        return json.loads(getattr(request, "_body", None) or b"{}").get("serial_number")
+    except (ValueError, AttributeError):
+        return None
+
+
+def get_client_ip_key(request: Request) -> str:
+    """以真實來源 IP（受信任代理的 X-Forwarded-For / X-Real-IP）作為限流 key，而不是反向代理的位址"""
+    return get_real_ip(request)
+
+
+def get_serial_number_key(request: Request) -> str:
+    """
+    以請求 body 的 serial_number 作為限流 key，同一序號不論來源 IP 共用額度；
+    取不到序號時退回來源 IP。
+    """
+    serial_number = _body_serial_number(request)
+    if serial_number:
+        return f"serial:{serial_number}"
+    return get_client_ip_key(request)
+
+
+def get_ip_serial_key(request: Request) -> str:
+    """
+    以「來源 IP + 序號」作為限流 key：同一 NAT 後面的不同序號各自計算額度，
+    同一來源對同一序號的重複請求仍受限制；取不到序號時退回來源 IP。
+    """
+    serial_number = _body_serial_number(request)
+    if serial_number:
+        return f"{get_client_ip_key(request)}|serial:{serial_number}"
+    return get_client_ip_key(request)
+
+
+# 共用儲存無法連線時暫時改用各行程的記憶體計數，不讓限流錯誤中斷授權 API
+limiter = Limiter(
+    key_func=get_client_ip_key,
+    storage_uri=settings.RATE_LIMIT_STORAGE_URI,
+    in_memory_fallback_enabled=True,
+)
+
+# 公開授權 API 共用的每個來源 IP 上限：get_ip_serial_key 只限制單一序號，
+# 這個上限讓同一來源換序號也無法無限制嘗試
+public_ip_limit = limiter.shared_limit(
+    settings.PUBLIC_IP_RATE_LIMIT, scope="public_ip", key_func=get_client_ip_key
+)
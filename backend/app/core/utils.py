@@ -1,7 +1,13 @@
 import hashlib
+import ipaddress
+from typing import List, Union
 from passlib.context import CryptContext
 from fastapi import Request
 
+from .config import settings
+
+IPNetwork = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def get_password_hash(password: str) -> str:
@@ -9,21 +15,44 @@ def get_password_hash(password: str) -> str:
     password_hash = hashlib.sha256(password.encode('utf-8')).hexdigest()
     return pwd_context.hash(password_hash)
 
+def _parse_trusted_proxies(spec: str) -> List[IPNetwork]:
+    return [ipaddress.ip_network(item.strip(), strict=False) for item in spec.split(",") if item.strip()]
+
+TRUSTED_PROXIES = _parse_trusted_proxies(settings.TRUSTED_PROXIES)
+
+def _is_trusted_proxy(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in TRUSTED_PROXIES)
+
 def get_real_ip(request: Request) -> str:
     """
     獲取真實的客戶端 IP 地址
-    優先順序：X-Forwarded-For > X-Real-IP > request.client.host
+    只有直接連線的位址屬於 TRUSTED_PROXIES（反向代理）時才採用 X-Forwarded-For / X-Real-IP，
+    否則用戶端可以任意偽造來源 IP 來繞過依 IP 的限流。
+    X-Forwarded-For 由右往左略過受信任的代理，取第一個不受信任的位址。
     """
-    # 檢查 X-Forwarded-For 標頭（可能包含多個 IP，取第一個）
+    client_host = request.client.host if request.client and request.client.host else None
+    if client_host is None:
+        return "unknown"
+    if not _is_trusted_proxy(client_host):
+        return client_host
+    
+    # 檢查 X-Forwarded-For 標頭（可能包含多個 IP，用逗號分隔，最右邊是最接近本服務的代理加上的）
     forwarded_for = request.headers.get("X-Forwarded-For")
     if forwarded_for:
-        # X-Forwarded-For 可能包含多個 IP，用逗號分隔，取第一個
-        return forwarded_for.split(",")[0].strip()
+        hops = [hop.strip() for hop in forwarded_for.split(",") if hop.strip()]
+        for hop in reversed(hops):
+            if not _is_trusted_proxy(hop):
+                return hop
+        if hops:
+            return hops[0]
     
     # 檢查 X-Real-IP 標頭
     real_ip = request.headers.get("X-Real-IP")
     if real_ip:
         return real_ip.strip()
     
-    # 最後回退到 request.client.host
-    return request.client.host if request.client.host else "unknown"
\ No newline at end of file
+    return client_host
@@ -4,4 +4,10 @@ from .crud_license import license
 from .crud_activation import activation
 from .crud_admin import admin
 from .crud_feature import feature
-from .crud_event_log import event_log
\ No newline at end of file
+from .crud_event_log import event_log
+from .crud_idempotency_key import idempotency_key
+from .crud_activation_heartbeat import activation_heartbeat
+from .crud_event_log_archive import event_log_archive
+
+# 註冊 activation_hardware_ids 的 before_flush 同步
+from ..services import hardware_ids as _hardware_ids  # noqa: F401
\ No newline at end of file
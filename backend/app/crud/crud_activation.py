@@ -1,8 +1,12 @@
+from sqlalchemy import bindparam, or_, select, func, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 
 from .base import CRUDBase
 from ..models.activation import Activation
+from ..models.activation_hardware_id import ActivationHardwareId
 from ..schemas import ActivationCreate
 
 class CRUDActivation(CRUDBase[Activation, ActivationCreate, ActivationCreate]):
@@ -16,4 +20,87 @@ class CRUDActivation(CRUDBase[Activation, ActivationCreate, ActivationCreate]):
             self.model.status == 'active'
         ).count()
 
+    async def get_activations_by_license_id_async(self, db: AsyncSession, *, license_id: int) -> List[Activation]:
+        result = await db.execute(
+            select(self.model).where(self.model.license_id == license_id, self.model.status == 'active')
+        )
+        return list(result.scalars().all())
+
+    async def has_active_machine_code_prefix_async(self, db: AsyncSession, *, license_id: int, machine_code_prefix: str) -> bool:
+        """是否已有機器碼前綴相同的 active 啟用記錄（使用 license_id, machine_code_prefix, status 複合索引）"""
+        activation_id = await db.scalar(
+            select(self.model.id).where(
+                self.model.license_id == license_id,
+                self.model.status == 'active',
+                self.model.machine_code_prefix == machine_code_prefix
+            ).limit(1)
+        )
+        return activation_id is not None
+
+    async def get_blacklisted_by_license_async(self, db: AsyncSession, *, license_id: int) -> List[Activation]:
+        """取得授權的黑名單啟用記錄（使用 license_id, status 複合索引）"""
+        result = await db.execute(
+            select(self.model).where(
+                self.model.license_id == license_id,
+                self.model.status == 'blacklisted'
+            ).order_by(self.model.id)
+        )
+        return list(result.scalars().all())
+
+    async def find_by_hardware_ids_async(
+        self, db: AsyncSession, *, license_id: int, hardware_values: Dict[str, str], status: str = 'active'
+    ) -> Optional[Activation]:
+        """
+        以 activation_hardware_ids 索引找出任一硬體ID相符的啟用記錄（id 最小者）。
+        hardware_values 為 services.hardware_ids.hardware_id_values() 的結果。
+        """
+        if not hardware_values:
+            return None
+        activation_id = await db.scalar(
+            select(func.min(ActivationHardwareId.activation_id)).where(
+                ActivationHardwareId.license_id == license_id,
+                ActivationHardwareId.status == status,
+                tuple_(ActivationHardwareId.kind, ActivationHardwareId.normalized_value).in_(
+                    list(hardware_values.items())
+                )
+            )
+        )
+        if activation_id is None:
+            return None
+        return await db.get(self.model, activation_id)
+
+    async def count_active_activations_by_license_id_async(self, db: AsyncSession, *, license_id: int) -> int:
+        """計算指定授權的 active 啟用記錄數量"""
+        return await db.scalar(
+            select(func.count()).select_from(self.model).where(
+                self.model.license_id == license_id,
+                self.model.status == 'active'
+            )
+        )
+
+    async def touch_validated_many_async(
+        self, db: AsyncSession, *, touches: Dict[int, Tuple[datetime, Optional[str]]], commit: bool = True
+    ) -> None:
+        """
+        以單一 executemany UPDATE 寫入多筆 {activation_id: (last_validated_at, ip_address)}。
+        其他 worker 已寫入較新的時間時不覆蓋。
+        """
+        if not touches:
+            return
+        table = self.model.__table__
+        stmt = (
+            update(table)
+            .where(
+                table.c.id == bindparam("b_id"),
+                or_(table.c.last_validated_at == None, table.c.last_validated_at < bindparam("b_validated_at")),
+            )
+            .values(last_validated_at=bindparam("b_validated_at"), ip_address=bindparam("b_ip_address"))
+        )
+        await db.execute(stmt, [
+            {"b_id": activation_id, "b_validated_at": validated_at, "b_ip_address": ip_address}
+            for activation_id, (validated_at, ip_address) in touches.items()
+        ])
+        if commit:
+            await db.commit()
+
 activation = CRUDActivation(Activation)
\ No newline at end of file
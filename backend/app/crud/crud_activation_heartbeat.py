@@ -0,0 +1,80 @@
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+from sqlalchemy import case, select
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .base import CRUDBase
+from ..models.activation import Activation
+from ..models.activation_heartbeat import ActivationHeartbeat
+
+
+class CRUDActivationHeartbeat(CRUDBase[ActivationHeartbeat, BaseModel, BaseModel]):
+    def upsert_statement(self, dialect_name: str, rows: List[Dict[str, Any]]):
+        """
+        INSERT ... ON CONFLICT (activation_id, day) 累加 count、更新 last_*。
+        多個 worker 可能以不同順序寫入，last_* 只在新的 last_seen_at 較晚時覆蓋。
+        """
+        table = self.model.__table__
+        if dialect_name == "sqlite":
+            stmt = sqlite.insert(table).values(rows)
+            incoming = stmt.excluded
+        elif dialect_name in ("mysql", "mariadb"):
+            stmt = mysql.insert(table).values(rows)
+            incoming = stmt.inserted
+        else:
+            raise ValueError(f"Heartbeat upsert is not supported on '{dialect_name}'.")
+
+        newer = incoming.last_seen_at > table.c.last_seen_at
+        values = {
+            "count": table.c.count + incoming.count,
+            "first_seen_at": case((incoming.first_seen_at < table.c.first_seen_at, incoming.first_seen_at),
+                                  else_=table.c.first_seen_at),
+            "last_ip": case((newer, incoming.last_ip), else_=table.c.last_ip),
+            "last_app_version": case((newer, incoming.last_app_version), else_=table.c.last_app_version),
+            # last_seen_at 必須最後更新，前面的 newer 才會和舊值比較
+            "last_seen_at": case((newer, incoming.last_seen_at), else_=table.c.last_seen_at),
+        }
+        if dialect_name == "sqlite":
+            return stmt.on_conflict_do_update(index_elements=["activation_id", "day"], set_=values)
+        # MySQL 依序套用，以 list 保持順序
+        return stmt.on_duplicate_key_update(list(values.items()))
+
+    async def upsert_many_async(self, db: AsyncSession, *, rows: List[Dict[str, Any]]) -> int:
+        """
+        以單一 upsert 寫入多筆 (activation_id, day) 彙總並 commit，回傳寫入筆數。
+        啟用記錄已被刪除的彙總直接略過（否則外鍵錯誤會讓整批失敗）；
+        存在的啟用記錄以共享鎖鎖到 commit，避免檢查後才被刪除。
+        """
+        if not rows:
+            return 0
+        activation_ids = {row["activation_id"] for row in rows}
+        existing = set(
+            (
+                await db.scalars(
+                    select(Activation.id)
+                    .where(Activation.id.in_(activation_ids))
+                    .with_for_update(read=True)
+                )
+            ).all()
+        )
+        rows = [row for row in rows if row["activation_id"] in existing]
+        if rows:
+            await db.execute(self.upsert_statement(db.bind.dialect.name, rows))
+        await db.commit()
+        return len(rows)
+
+    def get_by_license(
+        self, db: Session, *, license_id: int, since: Optional[date] = None
+    ) -> List[ActivationHeartbeat]:
+        """授權各啟用記錄的每日驗證彙總，新的在前"""
+        stmt = select(self.model).where(self.model.license_id == license_id)
+        if since is not None:
+            stmt = stmt.where(self.model.day >= since)
+        return list(db.scalars(stmt.order_by(self.model.day.desc(), self.model.activation_id)))
+
+
+activation_heartbeat = CRUDActivationHeartbeat(ActivationHeartbeat)
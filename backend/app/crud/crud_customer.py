@@ -1,6 +1,7 @@
 from .base import CRUDBase
 from ..models.customer import Customer
 from ..schemas import CustomerCreate, CustomerUpdate, CustomerSearchParams, CustomerSearchResponse
+from ..services.license_cache import license_snapshot_cache
 from sqlalchemy.orm import Session
 from sqlalchemy import or_, and_, func
 from typing import List, Tuple, Union, Dict, Any
@@ -46,6 +47,8 @@ class CRUDCustomer(CRUDBase[Customer, CustomerCreate, CustomerUpdate]):
         db.add(db_obj)
         db.commit()
         db.refresh(db_obj)
+        # 授權快照包含客戶名稱與 email
+        license_snapshot_cache.invalidate_customer(db_obj.id)
         return db_obj
     
     def search_customers(
@@ -1,14 +1,102 @@
-from typing import List, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, Query
+from sqlalchemy import and_, or_, insert, func
 from datetime import datetime, timedelta
 
 from app.crud.base import CRUDBase
+from app.models.customer import Customer
 from app.models.event_log import EventLog
-from app.schemas.event_log import EventLogCreate, EventLogUpdate
+from app.models.license import License
+from app.schemas.event_log import EventLogCreate, EventLogFilters, EventLogUpdate
 
 
 class CRUDEventLog(CRUDBase[EventLog, EventLogCreate, EventLogUpdate]):
+    async def create_multi_async(self, db: AsyncSession, *, objs_in: List[Dict[str, Any]]) -> None:
+        """以單一 bulk insert 寫入多筆事件"""
+        if not objs_in:
+            return
+        await db.execute(insert(EventLog), objs_in)
+        await db.commit()
+
+    def filtered_query(self, db: Session, *, filters: EventLogFilters, with_customer_name: bool = False) -> Query:
+        """
+        依 /admin/event-logs 的搜尋條件建立查詢（未排序）。
+        with_customer_name=True 時改為查詢 event_logs 各欄位加上 customer_name，
+        客戶名稱由同一個 JOIN 取得，每列是可直接轉成 EventLogListItem 的 Row。
+        """
+        if with_customer_name:
+            query = db.query(*EventLog.__table__.columns, Customer.name.label("customer_name")).select_from(EventLog)
+        else:
+            query = db.query(EventLog)
+        
+        # 搜尋條件
+        if filters.serial_number:
+            query = query.filter(EventLog.serial_number.ilike(f"%{filters.serial_number}%"))
+        
+        if filters.customer_name or filters.tax_id:
+            # 需要通過 license 關聯到 customer
+            query = query.join(License, EventLog.license_id == License.id)
+            query = query.join(Customer, License.customer_id == Customer.id)
+            
+            if filters.customer_name:
+                query = query.filter(Customer.name.ilike(f"%{filters.customer_name}%"))
+            if filters.tax_id:
+                query = query.filter(Customer.tax_id.ilike(f"%{filters.tax_id}%"))
+        elif with_customer_name:
+            # 沒有客戶條件時以 LEFT JOIN 取名稱，不影響結果筆數
+            query = query.outerjoin(License, EventLog.license_id == License.id)
+            query = query.outerjoin(Customer, License.customer_id == Customer.id)
+        
+        # 篩選條件
+        if filters.severity:
+            query = query.filter(EventLog.severity == filters.severity)
+        
+        if filters.event_type:
+            query = query.filter(EventLog.event_type == filters.event_type)
+        
+        if filters.is_confirmed is not None:
+            query = query.filter(EventLog.is_confirmed == filters.is_confirmed)
+        
+        return query
+
+    def count_filtered(self, db: Session, *, filters: EventLogFilters) -> int:
+        """符合搜尋條件的精確筆數（event_logs 很大時成本高，一般請使用 event_log_count_cache）"""
+        return self.filtered_query(db, filters=filters).with_entities(func.count(EventLog.id)).scalar()
+
+    def get_page_after(
+        self,
+        db: Session,
+        *,
+        filters: EventLogFilters,
+        descending: bool = True,
+        after: Optional[Tuple[datetime, int]] = None,
+        limit: int = 20,
+        with_customer_name: bool = False,
+    ) -> List[Any]:
+        """
+        以 (created_at, id) 做 keyset 分頁：取得排在 after 之後的 limit 筆。
+        不使用 OFFSET，深層頁面與第一頁成本相同（使用 created_at, id 索引）。
+        """
+        query = self.filtered_query(db, filters=filters, with_customer_name=with_customer_name)
+        if after is not None:
+            created_at, event_id = after
+            if descending:
+                query = query.filter(or_(
+                    EventLog.created_at < created_at,
+                    and_(EventLog.created_at == created_at, EventLog.id < event_id)
+                ))
+            else:
+                query = query.filter(or_(
+                    EventLog.created_at > created_at,
+                    and_(EventLog.created_at == created_at, EventLog.id > event_id)
+                ))
+        if descending:
+            query = query.order_by(EventLog.created_at.desc(), EventLog.id.desc())
+        else:
+            query = query.order_by(EventLog.created_at.asc(), EventLog.id.asc())
+        return query.limit(limit).all()
+
     def get_unconfirmed_events_by_license_id(self, db: Session, *, license_id: int) -> List[EventLog]:
         """獲取指定授權的未確認事件"""
         return db.query(EventLog).filter(
@@ -0,0 +1,38 @@
+from datetime import date
+from typing import List, Optional, Sequence
+
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.orm import Session, defer
+
+from .base import CRUDBase
+from ..models.event_log_archive import EventLogArchive
+
+
+class CRUDEventLogArchive(CRUDBase[EventLogArchive, BaseModel, BaseModel]):
+    def find(
+        self,
+        db: Session,
+        *,
+        month: Optional[date] = None,
+        serial_number: Optional[str] = None,
+        license_id: Optional[int] = None,
+    ) -> List[EventLogArchive]:
+        """依月份、序號或授權找出封存批次（不載入 payload），新的月份在前"""
+        stmt = select(self.model).options(defer(self.model.payload))
+        if month is not None:
+            stmt = stmt.where(self.model.month == month)
+        if serial_number is not None:
+            stmt = stmt.where(self.model.serial_number == serial_number)
+        if license_id is not None:
+            stmt = stmt.where(self.model.license_id == license_id)
+        return list(db.scalars(stmt.order_by(self.model.month.desc(), self.model.id.desc())))
+
+    def get_payloads(self, db: Session, *, ids: Sequence[int]) -> List[bytes]:
+        """一次讀出多個封存批次的壓縮 payload"""
+        if not ids:
+            return []
+        return list(db.scalars(select(self.model.payload).where(self.model.id.in_(ids))))
+
+
+event_log_archive = CRUDEventLogArchive(EventLogArchive)
@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+from typing import Optional
+
+from pydantic import BaseModel
+from sqlalchemy import delete, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .base import CRUDBase
+from ..models.idempotency_key import IdempotencyKey
+
+# 處理中的記錄超過這個秒數仍未完成（例如 worker 中途結束），視為已放棄，可重新執行
+PENDING_TIMEOUT_SECONDS = 60
+
+
+class CRUDIdempotencyKey(CRUDBase[IdempotencyKey, BaseModel, BaseModel]):
+    def _scope(self, endpoint: str, serial_number: str, key: str):
+        return (
+            self.model.endpoint == endpoint,
+            self.model.serial_number == serial_number,
+            self.model.idempotency_key == key,
+        )
+
+    async def get_active_async(
+        self, db: AsyncSession, *, endpoint: str, serial_number: str, key: str
+    ) -> Optional[IdempotencyKey]:
+        """取得尚未過期的記錄（使用 endpoint, serial_number, idempotency_key 唯一索引）"""
+        return await db.scalar(select(self.model).where(
+            *self._scope(endpoint, serial_number, key),
+            self.model.expires_at > datetime.utcnow()
+        ))
+
+    async def reserve_async(
+        self, db: AsyncSession, *, endpoint: str, serial_number: str, key: str, request_hash: str, ttl_seconds: int
+    ) -> Optional[IdempotencyKey]:
+        """
+        新增處理中的記錄並 commit；同時有相同 key 的請求已新增時回傳 None。
+        過期或已放棄的舊記錄會先刪除。
+        """
+        now = datetime.utcnow()
+        await db.execute(delete(self.model).where(
+            *self._scope(endpoint, serial_number, key),
+            or_(
+                self.model.expires_at <= now,
+                (self.model.status_code == None) &
+                (self.model.created_at < now - timedelta(seconds=PENDING_TIMEOUT_SECONDS))
+            )
+        ))
+        db_obj = self.model(
+            endpoint=endpoint,
+            serial_number=serial_number,
+            idempotency_key=key,
+            request_hash=request_hash,
+            created_at=now,
+            expires_at=now + timedelta(seconds=ttl_seconds),
+        )
+        db.add(db_obj)
+        try:
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            return None
+        return db_obj
+
+    async def complete_async(
+        self, db: AsyncSession, *, record_id: int, status_code: int, response_body: str
+    ) -> None:
+        await db.execute(update(self.model).where(self.model.id == record_id).values(
+            status_code=status_code, response_body=response_body
+        ))
+        await db.commit()
+
+    async def release_async(self, db: AsyncSession, *, record_id: int) -> None:
+        """請求失敗時刪除處理中的記錄，讓用戶端可以用相同 key 重試"""
+        await db.execute(delete(self.model).where(self.model.id == record_id))
+        await db.commit()
+
+    def purge_expired(self, db: Session) -> int:
+        result = db.execute(delete(self.model).where(self.model.expires_at <= datetime.utcnow()))
+        db.commit()
+        return result.rowcount
+
+
+idempotency_key = CRUDIdempotencyKey(IdempotencyKey)
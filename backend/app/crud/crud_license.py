@@ -1,12 +1,15 @@
 import uuid
-from typing import Optional, List
+from typing import Any, Dict, Optional, List, Union
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import or_
+from sqlalchemy import func, or_, select, update
 
 from .base import CRUDBase
 from ..models.license import License
 from ..models.customer import Customer
+from ..models.activation import Activation
 from ..schemas import LicenseCreate, LicenseUpdate, LicenseSearchParams, LicenseSearchResponse
+from ..services.license_cache import LicenseSnapshot, invalidate_license, license_snapshot_cache, unknown_serial_cache
 
 class CRUDLicense(CRUDBase[License, LicenseCreate, LicenseUpdate]):
     def create(self, db: Session, *, obj_in: LicenseCreate) -> License:
@@ -22,8 +25,148 @@ class CRUDLicense(CRUDBase[License, LicenseCreate, LicenseUpdate]):
         db.add(db_obj)
         db.commit()
         db.refresh(db_obj)
+        unknown_serial_cache.discard(serial_number)
         return db_obj
 
+    def update(
+        self,
+        db: Session,
+        *,
+        db_obj: License,
+        obj_in: Union[LicenseUpdate, Dict[str, Any]],
+        commit: bool = True
+    ) -> License:
+        """
+        更新授權，並清除該序號的快取
+        """
+        db_obj = super().update(db, db_obj=db_obj, obj_in=obj_in, commit=commit)
+        invalidate_license(db_obj.serial_number)
+        return db_obj
+
+    def remove(self, db: Session, *, id: int) -> License:
+        obj = super().remove(db, id=id)
+        invalidate_license(obj.serial_number)
+        return obj
+
+    def get_by_serial_number_with_activations(self, db: Session, *, serial_number: str) -> Optional[License]:
+        """以單一查詢取得授權、客戶以及所有啟用記錄"""
+        return db.query(self.model).options(
+            joinedload(self.model.customer),
+            joinedload(self.model.activations)
+        ).filter(self.model.serial_number == serial_number).first()
+
+    async def get_by_serial_number_async(self, db: AsyncSession, *, serial_number: str) -> Optional[License]:
+        """依序號取得授權（含客戶）"""
+        result = await db.execute(
+            select(self.model).options(
+                joinedload(self.model.customer),
+                joinedload(self.model.product)
+            ).where(self.model.serial_number == serial_number)
+        )
+        return result.scalars().first()
+
+    async def get_snapshot_async(self, db: AsyncSession, *, serial_number: str) -> Optional[LicenseSnapshot]:
+        """取得授權快照，快取未命中時才查詢資料庫；查無此序號時記入 negative cache"""
+        snapshot = license_snapshot_cache.get(serial_number)
+        if snapshot is not None:
+            return snapshot
+        license_obj = await self.get_by_serial_number_async(db, serial_number=serial_number)
+        if not license_obj:
+            unknown_serial_cache.add(serial_number)
+            return None
+        snapshot = LicenseSnapshot.from_license(license_obj)
+        license_snapshot_cache.set(snapshot)
+        return snapshot
+
+    async def get_by_serial_number_with_activations_async(
+        self, db: AsyncSession, *, serial_number: str, include_blacklisted: bool = True
+    ) -> Optional[License]:
+        """
+        以單一查詢取得授權、客戶以及啟用記錄；查無此序號時記入 negative cache。
+        include_blacklisted=False 時 license.activations 不含黑名單記錄（需要時另以
+        crud.activation.get_blacklisted_by_license_async 取得）。
+        """
+        activations = self.model.activations
+        if not include_blacklisted:
+            activations = activations.and_(Activation.status != 'blacklisted')
+        result = await db.execute(
+            select(self.model).options(
+                joinedload(self.model.customer),
+                joinedload(self.model.product),
+                joinedload(activations)
+            ).where(self.model.serial_number == serial_number)
+        )
+        license_obj = result.unique().scalars().first()
+        if not license_obj:
+            unknown_serial_cache.add(serial_number)
+        return license_obj
+
+    # --- active_activation_count：以條件式 UPDATE 維護的啟用數量 ---
+    # 不更新 updated_at，避免啟用數量變動讓已簽章的授權檔快取失效
+
+    def _reserve_slot_statement(self, license_id: int):
+        return update(self.model).where(
+            self.model.id == license_id,
+            self.model.active_activation_count < self.model.max_activations
+        ).values(
+            active_activation_count=self.model.active_activation_count + 1,
+            updated_at=self.model.updated_at
+        ).execution_options(synchronize_session=False)
+
+    def _release_slot_statement(self, license_id: int):
+        return update(self.model).where(
+            self.model.id == license_id,
+            self.model.active_activation_count > 0
+        ).values(
+            active_activation_count=self.model.active_activation_count - 1,
+            updated_at=self.model.updated_at
+        ).execution_options(synchronize_session=False)
+
+    def reserve_activation_slot(self, db: Session, *, license_id: int) -> bool:
+        """佔用一個啟用名額；已達 max_activations 時回傳 False。不 commit，由呼叫端的交易一起提交"""
+        return db.execute(self._reserve_slot_statement(license_id)).rowcount == 1
+
+    async def reserve_activation_slot_async(self, db: AsyncSession, *, license_id: int) -> bool:
+        """佔用一個啟用名額；已達 max_activations 時回傳 False。不 commit，由呼叫端的交易一起提交"""
+        result = await db.execute(self._reserve_slot_statement(license_id))
+        return result.rowcount == 1
+
+    def release_activation_slot(self, db: Session, *, license_id: int) -> None:
+        """釋放一個啟用名額（active 啟用記錄被刪除、停用或加入黑名單時）"""
+        db.execute(self._release_slot_statement(license_id))
+
+    async def release_activation_slot_async(self, db: AsyncSession, *, license_id: int) -> None:
+        """釋放一個啟用名額（active 啟用記錄被刪除、停用或加入黑名單時）"""
+        await db.execute(self._release_slot_statement(license_id))
+
+    async def mark_pending_if_unused_async(self, db: AsyncSession, *, license_id: int) -> bool:
+        """已無任何啟用時將授權改回 pending，有更新時回傳 True"""
+        result = await db.execute(
+            update(self.model).where(
+                self.model.id == license_id,
+                self.model.active_activation_count == 0,
+                self.model.status != 'pending'
+            ).values(status='pending').execution_options(synchronize_session=False)
+        )
+        return result.rowcount == 1
+
+    def reconcile_active_activation_counts(self, db: Session) -> int:
+        """依 activations 表重新計算與實際不符的 active_activation_count，回傳修正筆數"""
+        actual_count = select(func.count(Activation.id)).where(
+            Activation.license_id == self.model.id,
+            Activation.status == 'active'
+        ).scalar_subquery()
+        result = db.execute(
+            update(self.model).where(
+                self.model.active_activation_count != actual_count
+            ).values(
+                active_activation_count=actual_count,
+                updated_at=self.model.updated_at
+            ).execution_options(synchronize_session=False)
+        )
+        db.commit()
+        return result.rowcount
+
     def get_multi(
         self, db: Session, *, skip: int = 0, limit: int = 100, search: Optional[str] = None, status: Optional[str] = None, order_by: str = "created_at_desc"
     ) -> List[License]:
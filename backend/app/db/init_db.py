@@ -2,6 +2,7 @@ import logging
 from sqlalchemy.orm import Session
 from .session import engine
 from .base import Base
+from .migrations import upgrade
 from ..models import * # Import all models to ensure they are registered with Base
 
 logging.basicConfig(level=logging.INFO)
@@ -13,6 +14,8 @@ def init_db() -> None:
         # The magic happens here. SQLAlchemy creates all tables defined in the models
         # that inherit from Base.
         Base.metadata.create_all(bind=engine)
+        # 新資料庫已包含所有欄位與索引，這裡只會記錄遷移版本
+        upgrade(engine)
         logger.info("Database tables created successfully.")
     except Exception as e:
         logger.error(f"Error creating database tables: {e}")
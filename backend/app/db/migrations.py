@@ -0,0 +1,369 @@
+"""
+資料庫 schema 遷移。
+
+取代 scripts/ 下各自獨立的 add_*_column 腳本：每個遷移只執行一次，
+已套用的版本記錄在 schema_migrations 表。每個步驟都會先檢查欄位/索引是否已存在，
+因此由 create_all 建立的新資料庫也可以直接執行（只會記錄版本）。
+支援 SQLite 與 MariaDB/MySQL。
+
+用法（於 backend 目錄）：
+    python -m app.db.migrations upgrade       # 套用尚未執行的遷移
+    python -m app.db.migrations status        # 列出遷移狀態
+    python -m app.db.migrations check-plans   # 以 EXPLAIN 確認熱門查詢有使用索引，失敗時 exit code 為 1
+"""
+import argparse
+import logging
+import sys
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Callable, List, Sequence, Tuple
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, func, inspect, select, text, tuple_
+from sqlalchemy.engine import Connection, Engine
+
+from .session import engine as default_engine
+from ..crud.crud_activation_heartbeat import activation_heartbeat
+from ..models.activation import Activation, MACHINE_CODE_PREFIX_LENGTH
+from ..models.activation_hardware_id import ActivationHardwareId
+from ..models.activation_heartbeat import ActivationHeartbeat
+from ..models.event_log import EventLog
+from ..models.event_log_archive import EventLogArchive
+from ..models.feature import Feature
+from ..models.idempotency_key import IdempotencyKey
+from ..models.license import License
+from ..services.event_archive import archivable_events
+from ..services.hardware_ids import hardware_id_values
+
+logger = logging.getLogger(__name__)
+
+_metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    _metadata,
+    Column("version", String(100), primary_key=True),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+# --- 遷移步驟用的輔助函式（皆可重複執行） ---
+
+def _has_column(conn: Connection, table: str, column: str) -> bool:
+    return column in [col["name"] for col in inspect(conn).get_columns(table)]
+
+def _has_index(conn: Connection, table: str, index_name: str) -> bool:
+    return index_name in [index["name"] for index in inspect(conn).get_indexes(table)]
+
+def _add_column(conn: Connection, table: str, column: str, ddl: str) -> None:
+    if _has_column(conn, table, column):
+        return
+    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+    logger.info(f"Added column {table}.{column}")
+
+def _create_index(conn: Connection, table: str, index_name: str, columns: Sequence[str]) -> None:
+    if _has_index(conn, table, index_name):
+        return
+    conn.execute(text(f"CREATE INDEX {index_name} ON {table} ({', '.join(columns)})"))
+    logger.info(f"Created index {index_name} on {table} ({', '.join(columns)})")
+
+
+# --- 遷移步驟 ---
+
+def _activation_app_version(conn: Connection) -> None:
+    _add_column(conn, "activations", "app_version", "VARCHAR(50) NULL")
+
+def _features_table(conn: Connection) -> None:
+    Feature.__table__.create(conn, checkfirst=True)
+
+def _lease_hours(conn: Connection) -> None:
+    _add_column(conn, "licenses", "lease_hours", "INTEGER NULL")
+    _add_column(conn, "products", "lease_hours", "INTEGER NULL")
+
+def _active_activation_count(conn: Connection) -> None:
+    _add_column(conn, "licenses", "active_activation_count", "INTEGER NOT NULL DEFAULT 0")
+    conn.execute(text(
+        "UPDATE licenses SET active_activation_count = ("
+        "SELECT COUNT(*) FROM activations "
+        "WHERE activations.license_id = licenses.id AND activations.status = 'active')"
+    ))
+
+def _machine_code_prefix(conn: Connection) -> None:
+    _add_column(conn, "activations", "machine_code_prefix", f"VARCHAR({MACHINE_CODE_PREFIX_LENGTH}) NULL")
+    conn.execute(text(
+        f"UPDATE activations SET machine_code_prefix = SUBSTR(machine_code, 1, {MACHINE_CODE_PREFIX_LENGTH}) "
+        "WHERE machine_code_prefix IS NULL"
+    ))
+    _create_index(conn, "activations", "ix_activations_license_prefix_status",
+                  ["license_id", "machine_code_prefix", "status"])
+
+def _hot_query_indexes(conn: Connection) -> None:
+    # 啟用名額與停用查詢：license_id + status
+    _create_index(conn, "activations", "ix_activations_license_status", ["license_id", "status"])
+    # 管理端未確認事件：license_id + is_confirmed，依 created_at 排序
+    _create_index(conn, "event_logs", "ix_event_logs_license_confirmed",
+                  ["license_id", "is_confirmed", "created_at"])
+    # 可疑事件：severity + created_at
+    _create_index(conn, "event_logs", "ix_event_logs_severity_created", ["severity", "created_at"])
+    # 依序號查事件，依 created_at 排序
+    _create_index(conn, "event_logs", "ix_event_logs_serial_created", ["serial_number", "created_at"])
+
+def _activation_hardware_ids(conn: Connection) -> None:
+    table = ActivationHardwareId.__table__
+    table.create(conn, checkfirst=True)
+    # 回填：尚無 activation_hardware_ids 的啟用記錄
+    synced = select(table.c.activation_id)
+    rows = conn.execute(select(
+        Activation.id, Activation.license_id, Activation.status,
+        Activation.keypro_id, Activation.motherboard_id, Activation.disk_id,
+    ).where(Activation.id.not_in(synced))).all()
+    values = [
+        {
+            "license_id": row.license_id,
+            "activation_id": row.id,
+            "kind": kind,
+            "normalized_value": normalized_value,
+            "status": row.status,
+        }
+        for row in rows
+        for kind, normalized_value in hardware_id_values(row.keypro_id, row.motherboard_id, row.disk_id).items()
+    ]
+    if values:
+        conn.execute(table.insert(), values)
+    logger.info(f"Backfilled {len(values)} hardware ID(s) for {len(rows)} activation(s)")
+
+def _idempotency_keys_table(conn: Connection) -> None:
+    IdempotencyKey.__table__.create(conn, checkfirst=True)
+
+def _product_signing_key(conn: Connection) -> None:
+    _add_column(conn, "products", "signing_key_id", "VARCHAR(50) NULL")
+
+def _event_log_keyset_index(conn: Connection) -> None:
+    # /admin/event-logs 的 keyset 分頁：依 (created_at, id) 排序
+    _create_index(conn, "event_logs", "ix_event_logs_created_id", ["created_at", "id"])
+
+def _activation_heartbeats(conn: Connection) -> None:
+    table = ActivationHeartbeat.__table__
+    table.create(conn, checkfirst=True)
+    # 將既有的 normal_validation 事件彙總成每日 heartbeat（與已存在的列合併）後刪除；
+    # 沒有 activation_id 的舊事件無法歸屬，保留在 event_logs
+    if conn.dialect.name == "sqlite":
+        app_version = "json_extract(last.details, '$.app_version')"
+    else:
+        app_version = "JSON_UNQUOTE(JSON_EXTRACT(last.details, '$.app_version'))"
+    normal_validation = (
+        "event_subtype = 'normal_validation' AND activation_id IS NOT NULL AND license_id IS NOT NULL"
+    )
+    rows = conn.execute(text(
+        "SELECT g.activation_id, g.license_id, g.day, g.first_seen_at, g.last_seen_at, g.count, "
+        f"last.ip_address AS last_ip, {app_version} AS last_app_version "
+        "FROM ("
+        "SELECT activation_id, MAX(license_id) AS license_id, DATE(created_at) AS day, "
+        "MIN(created_at) AS first_seen_at, MAX(created_at) AS last_seen_at, COUNT(*) AS count, MAX(id) AS last_id "
+        f"FROM event_logs WHERE {normal_validation} "
+        "GROUP BY activation_id, DATE(created_at)"
+        ") g JOIN event_logs last ON last.id = g.last_id"
+    )).mappings().all()
+    # SQLite 的 DATE()/MIN() 回傳字串
+    values = [
+        {
+            **row,
+            "day": date.fromisoformat(str(row["day"])),
+            "first_seen_at": datetime.fromisoformat(str(row["first_seen_at"])),
+            "last_seen_at": datetime.fromisoformat(str(row["last_seen_at"])),
+        }
+        for row in rows
+    ]
+    for start in range(0, len(values), 1000):
+        conn.execute(activation_heartbeat.upsert_statement(conn.dialect.name, values[start:start + 1000]))
+    deleted = conn.execute(text(f"DELETE FROM event_logs WHERE {normal_validation}")).rowcount
+    logger.info(f"Rolled up {deleted} normal_validation event(s) into {len(values)} activation heartbeat(s)")
+
+def _event_log_archives(conn: Connection) -> None:
+    EventLogArchive.__table__.create(conn, checkfirst=True)
+
+def _event_log_created_at_not_null(conn: Connection) -> None:
+    # 舊資料的 created_at 可能為 NULL，keyset 游標與封存都需要時間；
+    # 以確認時間回填，沒有時以最舊的事件時間回填（排在最前面）
+    oldest = conn.execute(select(func.min(EventLog.created_at))).scalar() or datetime.utcnow()
+    filled = conn.execute(
+        EventLog.__table__.update()
+        .where(EventLog.created_at.is_(None))
+        .values(created_at=func.coalesce(EventLog.confirmed_at, oldest))
+    ).rowcount
+    logger.info(f"Backfilled created_at of {filled} event log(s)")
+    if conn.dialect.name != "sqlite":
+        # SQLite 無法修改欄位定義，只回填；新資料由模型的 default 保證有值
+        conn.execute(text("ALTER TABLE event_logs MODIFY created_at DATETIME NOT NULL"))
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: str
+    description: str
+    apply: Callable[[Connection], None]
+
+
+# 依版本順序排列；新增遷移時加在最後，已發佈的版本不要修改
+MIGRATIONS: List[Migration] = [
+    Migration("0001_activation_app_version", "activations.app_version", _activation_app_version),
+    Migration("0002_features_table", "features table", _features_table),
+    Migration("0003_lease_hours", "licenses/products.lease_hours", _lease_hours),
+    Migration("0004_active_activation_count", "licenses.active_activation_count + backfill", _active_activation_count),
+    Migration("0005_machine_code_prefix", "activations.machine_code_prefix + index + backfill", _machine_code_prefix),
+    Migration("0006_hot_query_indexes", "composite indexes for activation/event queries", _hot_query_indexes),
+    Migration("0007_activation_hardware_ids", "activation_hardware_ids table + backfill", _activation_hardware_ids),
+    Migration("0008_idempotency_keys", "idempotency_keys table", _idempotency_keys_table),
+    Migration("0009_product_signing_key", "products.signing_key_id", _product_signing_key),
+    Migration("0010_event_log_keyset_index", "event_logs (created_at, id) index", _event_log_keyset_index),
+    Migration("0011_activation_heartbeats", "activation_heartbeats table + normal_validation rollup", _activation_heartbeats),
+    Migration("0012_event_log_archives", "event_log_archives table", _event_log_archives),
+    Migration("0013_event_log_created_at_not_null", "event_logs.created_at backfill + NOT NULL", _event_log_created_at_not_null),
+]
+
+
+def applied_versions(engine: Engine = default_engine) -> set:
+    schema_migrations.create(engine, checkfirst=True)
+    with engine.connect() as conn:
+        return set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+def upgrade(engine: Engine = default_engine) -> List[str]:
+    """依序套用尚未執行的遷移，回傳這次套用的版本"""
+    done = applied_versions(engine)
+    applied = []
+    for migration in MIGRATIONS:
+        if migration.version in done:
+            continue
+        logger.info(f"Applying migration {migration.version}: {migration.description}")
+        with engine.begin() as conn:
+            migration.apply(conn)
+            conn.execute(schema_migrations.insert().values(
+                version=migration.version, applied_at=datetime.utcnow()
+            ))
+        applied.append(migration.version)
+    return applied
+
+
+# --- 熱門查詢的執行計畫檢查 ---
+
+def hot_queries() -> List[Tuple[str, object]]:
+    """public.py、crud_activation.py、crud_event_log.py 中的熱門查詢（參數值僅供 EXPLAIN 使用）"""
+    cutoff = datetime.utcnow() - timedelta(days=7)
+    return [
+        ("license by serial_number",
+         select(License.id).where(License.serial_number == "DUCKY-00000000-00000000")),
+        ("active activations of license",
+         select(Activation.id).where(Activation.license_id == 1, Activation.status == 'active')),
+        ("activation by machine_code_prefix",
+         select(Activation.id).where(Activation.license_id == 1, Activation.machine_code_prefix == "0" * 16)),
+        ("active activation by machine_code_prefix",
+         select(Activation.id).where(
+             Activation.license_id == 1,
+             Activation.status == 'active',
+             Activation.machine_code_prefix == "0" * 16
+         )),
+        ("active activation by machine_code (deactivate)",
+         select(Activation.id).where(
+             Activation.license_id == 1,
+             Activation.machine_code == "0" * 16,
+             Activation.status == 'active'
+         )),
+        ("activation by hardware IDs",
+         select(func.min(ActivationHardwareId.activation_id)).where(
+             ActivationHardwareId.license_id == 1,
+             ActivationHardwareId.status == 'active',
+             tuple_(ActivationHardwareId.kind, ActivationHardwareId.normalized_value).in_(
+                 [("keypro", "KP"), ("disk", "DISK")]
+             )
+         )),
+        ("idempotency key lookup",
+         select(IdempotencyKey.id).where(
+             IdempotencyKey.endpoint == "activate",
+             IdempotencyKey.serial_number == "DUCKY-00000000-00000000",
+             IdempotencyKey.idempotency_key == "0" * 32,
+             IdempotencyKey.expires_at > cutoff
+         )),
+        ("heartbeats of license",
+         select(ActivationHeartbeat.id).where(
+             ActivationHeartbeat.license_id == 1,
+             ActivationHeartbeat.day >= cutoff.date()
+         )),
+        ("unconfirmed events of license",
+         select(EventLog.id).where(EventLog.license_id == 1, EventLog.is_confirmed == False)
+         .order_by(EventLog.created_at.desc())),
+        ("suspicious events",
+         select(EventLog.id).where(
+             EventLog.severity.in_(['suspicious', 'critical']),
+             EventLog.created_at >= cutoff
+         ).order_by(EventLog.created_at.desc()).limit(100)),
+        ("event log keyset page",
+         select(EventLog.id).where(
+             (EventLog.created_at < cutoff) | ((EventLog.created_at == cutoff) & (EventLog.id < 1000))
+         ).order_by(EventLog.created_at.desc(), EventLog.id.desc()).limit(20)),
+        ("events by serial_number",
+         select(EventLog.id).where(EventLog.serial_number == "DUCKY-00000000-00000000")
+         .order_by(EventLog.created_at.desc()).limit(50)),
+        ("events to archive",
+         select(EventLog.id).where(*archivable_events(cutoff))
+         .order_by(EventLog.created_at, EventLog.id).limit(5000)),
+        ("archived events by serial_number",
+         select(EventLogArchive.id).where(EventLogArchive.serial_number == "DUCKY-00000000-00000000")
+         .order_by(EventLogArchive.month.desc(), EventLogArchive.id.desc())),
+    ]
+
+def _explain(conn: Connection, statement) -> Tuple[bool, str]:
+    """回傳 (是否使用索引, 執行計畫文字)"""
+    sql = str(statement.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    if conn.dialect.name == "sqlite":
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+        details = [row[-1] for row in rows]
+        # 沒有索引時 SQLite 會顯示 "SCAN <table>"（不含 USING ... INDEX）；
+        # "SCAN n CONSTANT ROWS" 是 IN (...) 的常數列表，不是資料表
+        uses_index = not any(
+            detail.startswith("SCAN") and "INDEX" not in detail and "CONSTANT ROW" not in detail
+            for detail in details
+        )
+        return uses_index, "; ".join(details)
+    rows = conn.exec_driver_sql(f"EXPLAIN {sql}").mappings().fetchall()
+    uses_index = all(row["type"] != "ALL" and row["key"] is not None for row in rows)
+    return uses_index, "; ".join(f"{row['table']}: type={row['type']} key={row['key']}" for row in rows)
+
+def check_query_plans(engine: Engine = default_engine) -> List[Tuple[str, bool, str]]:
+    results = []
+    with engine.connect() as conn:
+        for name, statement in hot_queries():
+            try:
+                results.append((name, *_explain(conn, statement)))
+            except Exception as e:
+                # 通常是尚未執行 upgrade，欄位還不存在
+                conn.rollback()
+                results.append((name, False, f"EXPLAIN failed: {e.__class__.__name__}: {e}".splitlines()[0]))
+    return results
+
+
+def main(argv=None) -> int:
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="License server schema migrations")
+    parser.add_argument("command", choices=["upgrade", "status", "check-plans"])
+    args = parser.parse_args(argv)
+
+    if args.command == "upgrade":
+        applied = upgrade()
+        print(f"Applied {len(applied)} migration(s): {', '.join(applied) or '-'}")
+        return 0
+
+    if args.command == "status":
+        done = applied_versions()
+        for migration in MIGRATIONS:
+            mark = "x" if migration.version in done else " "
+            print(f"[{mark}] {migration.version}  {migration.description}")
+        return 0
+
+    failed = 0
+    for name, uses_index, plan in check_query_plans():
+        print(f"{'OK  ' if uses_index else 'FAIL'} {name}: {plan}")
+        failed += not uses_index
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
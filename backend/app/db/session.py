@@ -1,4 +1,7 @@
+import importlib.util
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
 from ..core.config import settings
 
@@ -8,4 +11,27 @@ engine = create_engine(
     pool_recycle=3600
 )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
\ No newline at end of file
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def get_async_database_url(database_url: str) -> str:
+    """
+    將 DATABASE_URL 轉換為對應的 async driver：
+    sqlite → aiosqlite，mysql/mariadb → asyncmy（未安裝時改用 aiomysql）
+    """
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    if backend in ("mysql", "mariadb"):
+        driver = "asyncmy" if importlib.util.find_spec("asyncmy") else "aiomysql"
+        return url.set(drivername=f"{backend}+{driver}").render_as_string(hide_password=False)
+    raise ValueError(f"No async driver configured for database backend '{backend}'.")
+
+async_engine = create_async_engine(
+    get_async_database_url(settings.DATABASE_URL),
+    pool_pre_ping=True,
+    pool_recycle=3600
+)
+
+# expire_on_commit=False: async session 不能在 commit 後延遲載入屬性
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
\ No newline at end of file
@@ -2,8 +2,12 @@ from fastapi import FastAPI
 from fastapi.responses import RedirectResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 from .core.config import settings
-from .scheduler import scheduler
+from .scheduler import scheduler, rebuild_blacklist_filter
+from .services.signing_executor import signing_executor
+from .services.event_buffer import event_log_buffer
+from .services.heartbeats import heartbeat_buffer
 
 # ⬇️ import 子 App
 from .api.v1.public_app import public_app
@@ -11,9 +15,21 @@ from .api.v1.internal_app import internal_app
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # Build the blacklist filter before serving /validate
+    await asyncio.to_thread(rebuild_blacklist_filter)
     # Start the scheduler
     scheduler.start()
+    # Start the license signing process pool
+    signing_executor.start()
+    # Start the event log write-behind buffer
+    await event_log_buffer.start()
+    # Start the validation heartbeat buffer
+    await heartbeat_buffer.start()
     yield
+    # Flush pending event logs and heartbeats before shutting down
+    await event_log_buffer.stop()
+    await heartbeat_buffer.stop()
+    signing_executor.shutdown()
     # Shut down the scheduler
     scheduler.shutdown()
 
@@ -4,5 +4,9 @@ from .customer import Customer
 from .product import Product
 from .license import License
 from .activation import Activation
+from .activation_hardware_id import ActivationHardwareId
 from .feature import Feature
-from .event_log import EventLog
\ No newline at end of file
+from .event_log import EventLog
+from .idempotency_key import IdempotencyKey
+from .activation_heartbeat import ActivationHeartbeat
+from .event_log_archive import EventLogArchive
\ No newline at end of file
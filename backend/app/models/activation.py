@@ -1,15 +1,26 @@
-from sqlalchemy import Column, Integer, String, DateTime, Enum, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, Enum, ForeignKey, Index
+from sqlalchemy.orm import relationship, validates
 from sqlalchemy.sql import func
 from datetime import datetime
 from ..db.base import Base
 
+# 啟用比對使用的機器碼前綴長度
+MACHINE_CODE_PREFIX_LENGTH = 16
+
+def get_machine_code_prefix(machine_code: str) -> str:
+    return machine_code[:MACHINE_CODE_PREFIX_LENGTH]
+
 class Activation(Base):
     __tablename__ = "activations"
+    __table_args__ = (
+        Index("ix_activations_license_prefix_status", "license_id", "machine_code_prefix", "status"),
+        Index("ix_activations_license_status", "license_id", "status"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     license_id = Column(Integer, ForeignKey("licenses.id"), nullable=False)
     machine_code = Column(String(255), nullable=False, index=True)
+    machine_code_prefix = Column(String(MACHINE_CODE_PREFIX_LENGTH), nullable=True)  # 由 machine_code 自動設定
     ip_address = Column(String(45), nullable=True)
     status = Column(Enum('active', 'deactivated', 'blacklisted', name='activation_status_enum'), default='active', nullable=False)
     activated_at = Column(DateTime, default=datetime.utcnow)
@@ -25,4 +36,10 @@ class Activation(Base):
     # 應用程式版本資訊
     app_version = Column(String(50), nullable=True)
 
-    license = relationship("License", back_populates="activations")
\ No newline at end of file
+    license = relationship("License", back_populates="activations")
+    hardware_ids = relationship("ActivationHardwareId", back_populates="activation", cascade="all, delete-orphan")
+
+    @validates("machine_code")
+    def _sync_machine_code_prefix(self, key, machine_code):
+        self.machine_code_prefix = get_machine_code_prefix(machine_code) if machine_code else None
+        return machine_code
\ No newline at end of file
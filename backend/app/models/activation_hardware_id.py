@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
+from sqlalchemy.orm import relationship
+from ..db.base import Base
+
+class ActivationHardwareId(Base):
+    """
+    啟用記錄的硬體ID（每種硬體一列），由 services.hardware_ids 在每次寫入啟用記錄時同步。
+    硬體比對只需查詢 (license_id, kind, normalized_value, status) 索引。
+    """
+    __tablename__ = "activation_hardware_ids"
+    __table_args__ = (
+        Index("ix_activation_hardware_ids_lookup", "license_id", "kind", "normalized_value", "status"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    license_id = Column(Integer, ForeignKey("licenses.id", ondelete="CASCADE"), nullable=False)
+    activation_id = Column(Integer, ForeignKey("activations.id", ondelete="CASCADE"), nullable=False, index=True)
+    kind = Column(String(20), nullable=False)  # keypro / motherboard / disk
+    normalized_value = Column(String(255), nullable=False)
+    status = Column(String(20), nullable=False)  # 與啟用記錄的 status 相同
+
+    activation = relationship("Activation", back_populates="hardware_ids")
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, UniqueConstraint
+from ..db.base import Base
+
+class ActivationHeartbeat(Base):
+    """
+    正常驗證（/validate 成功且無硬體變化）的每日彙總，每個啟用記錄每天一列。
+    取代逐次寫入的 normal_validation 事件；event_logs 只保留狀態變化與可疑事件。
+    """
+    __tablename__ = "activation_heartbeats"
+    __table_args__ = (
+        UniqueConstraint("activation_id", "day", name="uq_activation_heartbeats_day"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    activation_id = Column(Integer, ForeignKey("activations.id", ondelete="CASCADE"), nullable=False)
+    license_id = Column(Integer, ForeignKey("licenses.id", ondelete="CASCADE"), nullable=False, index=True)
+    day = Column(Date, nullable=False)  # UTC 日期
+    first_seen_at = Column(DateTime, nullable=False)
+    last_seen_at = Column(DateTime, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+    last_ip = Column(String(45), nullable=True)
+    last_app_version = Column(String(50), nullable=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, Enum, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, Enum, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from datetime import datetime
@@ -6,6 +6,12 @@ from ..db.base import Base
 
 class EventLog(Base):
     __tablename__ = "event_logs"
+    __table_args__ = (
+        Index("ix_event_logs_license_confirmed", "license_id", "is_confirmed", "created_at"),
+        Index("ix_event_logs_severity_created", "severity", "created_at"),
+        Index("ix_event_logs_serial_created", "serial_number", "created_at"),
+        Index("ix_event_logs_created_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     license_id = Column(Integer, ForeignKey("licenses.id"), nullable=True)
@@ -21,7 +27,7 @@ class EventLog(Base):
     is_confirmed = Column(Boolean, default=False, nullable=False)  # 是否已確認
     confirmed_by = Column(String(255), nullable=True)  # 確認者
     confirmed_at = Column(DateTime, nullable=True)  # 確認時間
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     license = relationship("License")
     activation = relationship("Activation")
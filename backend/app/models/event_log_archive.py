@@ -0,0 +1,24 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Date, DateTime, LargeBinary, Index
+from ..db.base import Base
+
+class EventLogArchive(Base):
+    """
+    超過保留期限、已移出 event_logs 的事件。
+    每列是一個序號在一個月份內的一批事件，payload 為 zlib 壓縮的 JSON 陣列；
+    同一序號同一月份可能因分次封存而有多列。
+    """
+    __tablename__ = "event_log_archives"
+    __table_args__ = (
+        Index("ix_event_log_archives_serial_month", "serial_number", "month"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    month = Column(Date, nullable=False, index=True)  # 該月 1 日（依事件 created_at）
+    serial_number = Column(String(255), nullable=False)
+    license_id = Column(Integer, nullable=True)  # 不設外鍵：授權刪除後封存仍保留
+    event_count = Column(Integer, nullable=False)
+    first_created_at = Column(DateTime, nullable=False)
+    last_created_at = Column(DateTime, nullable=False)
+    payload = Column(LargeBinary(length=2**24 - 1), nullable=False)  # MariaDB 為 MEDIUMBLOB
+    archived_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,23 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Text, DateTime, UniqueConstraint
+from ..db.base import Base
+
+class IdempotencyKey(Base):
+    """
+    /activate、/deactivate 的 Idempotency-Key 記錄。
+    status_code 為 NULL 表示請求仍在處理中；完成後保存回應，在 expires_at 前重送相同 key 時直接回放。
+    """
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        UniqueConstraint("endpoint", "serial_number", "idempotency_key", name="uq_idempotency_keys_scope"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    endpoint = Column(String(50), nullable=False)
+    serial_number = Column(String(255), nullable=False)
+    idempotency_key = Column(String(128), nullable=False)
+    request_hash = Column(String(64), nullable=False)  # 請求內容的 SHA-256，相同 key 不同內容時拒絕
+    status_code = Column(Integer, nullable=True)
+    response_body = Column(Text, nullable=True)  # JSON
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
@@ -14,8 +14,10 @@ class License(Base):
     features = Column(JSON, nullable=True)
     expires_at = Column(DateTime, nullable=True)
     max_activations = Column(Integer, default=1)
+    active_activation_count = Column(Integer, default=0, nullable=False)  # 由條件式 UPDATE 維護，scheduler 定期校正
     status = Column(Enum('pending', 'active', 'expired', 'disabled', name='license_status_enum'), default='pending', nullable=False)
     connection_type = Column(Enum('network', 'standalone', name='license_connection_type_enum'), default='network', nullable=False)
+    lease_hours = Column(Integer, nullable=True)  # 驗證租約時數，未設定時沿用產品設定
     notes = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
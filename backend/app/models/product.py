@@ -11,6 +11,8 @@ class Product(Base):
     name = Column(String(100), unique=True, nullable=False)
     description = Column(Text, nullable=True)
     version = Column(String(20), nullable=True)
+    lease_hours = Column(Integer, nullable=True)  # 驗證租約時數，未設定時使用 LICENSE_LEASE_HOURS
+    signing_key_id = Column(String(50), nullable=True)  # 授權檔簽章金鑰（keys/<id>.pem），未設定時使用預設 RSA 金鑰
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -1,11 +1,17 @@
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 
 from .db.session import SessionLocal
-from . import models
+from . import crud, models
+from .core.config import settings
+from .services.blacklist_filter import blacklist_filter
+from .services.event_archive import archive_events_before
+from .services.event_log_counts import event_log_count_cache
+from .services.license_cache import invalidate_license
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -33,6 +39,8 @@ def update_expired_licenses():
             db.add(license)
         
         db.commit()
+        for license in expired_licenses:
+            invalidate_license(license.serial_number)
         logger.info("Successfully updated status for expired licenses.")
 
     except Exception as e:
@@ -41,6 +49,78 @@ def update_expired_licenses():
     finally:
         db.close()
 
+def reconcile_active_activation_counts():
+    """
+    Job to correct licenses.active_activation_count drifted from the activations table.
+    """
+    db: Session = SessionLocal()
+    try:
+        fixed = crud.license.reconcile_active_activation_counts(db)
+        if fixed:
+            logger.warning(f"Reconciled active_activation_count for {fixed} licenses.")
+    except Exception as e:
+        logger.error(f"Error in 'reconcile_active_activation_counts' job: {e}", exc_info=True)
+        db.rollback()
+    finally:
+        db.close()
+
+def purge_expired_idempotency_keys():
+    """
+    Job to delete Idempotency-Key records whose replay window has passed.
+    """
+    db: Session = SessionLocal()
+    try:
+        purged = crud.idempotency_key.purge_expired(db)
+        logger.info(f"Purged {purged} expired idempotency keys.")
+    except Exception as e:
+        logger.error(f"Error in 'purge_expired_idempotency_keys' job: {e}", exc_info=True)
+        db.rollback()
+    finally:
+        db.close()
+
+def rebuild_blacklist_filter():
+    """
+    Job to reload the in-memory blacklist index so blacklist changes made by other workers are picked up.
+    """
+    db: Session = SessionLocal()
+    try:
+        count = blacklist_filter.rebuild(db)
+        logger.debug(f"Blacklist filter rebuilt with {count} blacklisted activations.")
+    except Exception as e:
+        logger.error(f"Error in 'rebuild_blacklist_filter' job: {e}", exc_info=True)
+    finally:
+        db.close()
+
+def refresh_event_log_counts():
+    """
+    Job to recount the cached /admin/event-logs totals so only the first load of a filter runs COUNT(*).
+    """
+    db: Session = SessionLocal()
+    try:
+        refreshed = event_log_count_cache.refresh(db)
+        logger.debug(f"Refreshed {refreshed} cached event log counts.")
+    except Exception as e:
+        logger.error(f"Error in 'refresh_event_log_counts' job: {e}", exc_info=True)
+    finally:
+        db.close()
+
+def archive_old_event_logs():
+    """
+    Job to move event logs (except unconfirmed suspicious/critical ones) older than EVENT_LOG_ARCHIVE_AFTER_DAYS into compressed monthly archives.
+    """
+    if settings.EVENT_LOG_ARCHIVE_AFTER_DAYS <= 0:
+        return
+    db: Session = SessionLocal()
+    try:
+        cutoff = datetime.utcnow() - timedelta(days=settings.EVENT_LOG_ARCHIVE_AFTER_DAYS)
+        archived = archive_events_before(db, cutoff=cutoff, batch_size=settings.EVENT_LOG_ARCHIVE_BATCH_SIZE)
+        logger.info(f"Archived {archived} event logs older than {cutoff}.")
+    except Exception as e:
+        logger.error(f"Error in 'archive_old_event_logs' job: {e}", exc_info=True)
+        db.rollback()
+    finally:
+        db.close()
+
 # Initialize scheduler
 scheduler = BackgroundScheduler(daemon=True)
 
@@ -51,4 +131,49 @@ scheduler.add_job(
     id="update_expired_licenses_job",
     name="Update expired licenses status daily",
     replace_existing=True,
+)
+
+# Recalculate the denormalized activation counters every hour
+scheduler.add_job(
+    reconcile_active_activation_counts,
+    trigger=CronTrigger(minute=30),
+    id="reconcile_active_activation_counts_job",
+    name="Reconcile active activation counts hourly",
+    replace_existing=True,
+)
+
+# Delete expired idempotency keys every hour
+scheduler.add_job(
+    purge_expired_idempotency_keys,
+    trigger=CronTrigger(minute=45),
+    id="purge_expired_idempotency_keys_job",
+    name="Purge expired idempotency keys hourly",
+    replace_existing=True,
+)
+
+# Rebuild the blacklist filter so all workers converge
+scheduler.add_job(
+    rebuild_blacklist_filter,
+    trigger=IntervalTrigger(seconds=settings.BLACKLIST_FILTER_REBUILD_SECONDS),
+    id="rebuild_blacklist_filter_job",
+    name="Rebuild blacklist filter periodically",
+    replace_existing=True,
+)
+
+# Recount the cached event log totals shown on the admin event log page
+scheduler.add_job(
+    refresh_event_log_counts,
+    trigger=IntervalTrigger(seconds=settings.EVENT_LOG_COUNT_REFRESH_SECONDS),
+    id="refresh_event_log_counts_job",
+    name="Refresh cached event log counts periodically",
+    replace_existing=True,
+)
+
+# Move old event logs into the archive every night
+scheduler.add_job(
+    archive_old_event_logs,
+    trigger=CronTrigger(hour=3, minute=0),
+    id="archive_old_event_logs_job",
+    name="Archive old event logs daily",
+    replace_existing=True,
 )
\ No newline at end of file
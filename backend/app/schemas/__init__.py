@@ -10,6 +10,10 @@ from .schemas import (
     LicenseSearchParams, LicenseSearchResponse,
     LogFileInfo, LogUploadResponse, LogListResponse,
     InvoiceData, TrainingDataUploadRequest, TrainingDataUploadResponse,
+    AiFeedbackUploadResponse,
     TrainingDataRecord, TrainingDataListResponse
 )
-from .event_log import EventLog, EventLogCreate, EventLogUpdate, EventConfirmationRequest
\ No newline at end of file
+from .event_log import (
+    EventLog, EventLogCreate, EventLogUpdate, EventConfirmationRequest,
+    EventLogListItem, EventLogListResponse, EventLogArchiveResponse
+)
\ No newline at end of file
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 from pydantic import BaseModel
 
@@ -38,6 +38,40 @@ class EventLog(EventLogBase):
         from_attributes = True
 
 
+class EventLogListItem(EventLog):
+    """/admin/event-logs 的一筆事件，customer_name 由查詢時 JOIN 取得"""
+    customer_name: Optional[str] = None
+
+
+class EventLogListResponse(BaseModel):
+    items: List[EventLogListItem]
+    total: int
+    total_is_exact: bool  # False 表示 total 取自背景更新的快取
+    page: Optional[int] = None  # 使用 cursor 分頁時為 None
+    limit: int
+    total_pages: int
+    next_cursor: Optional[str] = None
+
+
+class EventLogArchiveResponse(BaseModel):
+    items: List[EventLog]
+    total: int
+    archives: int  # 解壓縮的封存批次數
+
+
+class EventLogFilters(BaseModel):
+    """/admin/event-logs 的搜尋條件；frozen 以便作為計數快取的 key"""
+    serial_number: Optional[str] = None
+    customer_name: Optional[str] = None
+    tax_id: Optional[str] = None
+    severity: Optional[str] = None
+    event_type: Optional[str] = None
+    is_confirmed: Optional[bool] = None
+
+    class Config:
+        frozen = True
+
+
 class EventConfirmationRequest(BaseModel):
     event_id: int
     confirmed_by: str
@@ -20,6 +20,8 @@ class ProductBase(BaseModel):
     name: str
     description: Optional[str] = None
     version: Optional[str] = None
+    lease_hours: Optional[int] = None
+    signing_key_id: Optional[str] = None
 
 class LicenseBase(BaseModel):
     customer_id: int
@@ -29,6 +31,7 @@ class LicenseBase(BaseModel):
     max_activations: int = 1
     status: str = 'pending'
     connection_type: str = 'network'
+    lease_hours: Optional[int] = None
     notes: Optional[str] = None
 
 class ActivationBase(BaseModel):
@@ -76,6 +79,7 @@ class LicenseUpdate(BaseModel):
     max_activations: Optional[int] = None
     status: Optional[str] = None
     connection_type: Optional[str] = None
+    lease_hours: Optional[int] = None
     notes: Optional[str] = None
 
 # --- Schemas for returning data from DB (with relationships) ---
@@ -133,6 +137,7 @@ class Product(ProductBase):
 class License(LicenseBase):
     id: int
     serial_number: str
+    active_activation_count: int = 0
     customer: CustomerInLicense
     product: ProductInLicense
     activations: List[Activation] = []
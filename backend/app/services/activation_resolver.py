@@ -0,0 +1,114 @@
+from dataclasses import dataclass
+from typing import List, Optional
+
+from ..models.activation import Activation
+from ..models.license import License
+from .hardware_ids import activation_hardware_values
+
+
+@dataclass
+class ValidationResolution:
+    """
+    /validate 的比對結果。
+    outcome: 'blacklisted' | 'keypro_conflict' | 'matched' | 'hardware_match' | 'not_found'
+    """
+    outcome: str
+    activation: Optional[Activation] = None
+
+
+def _has_hardware_ids(activation_in) -> bool:
+    return bool(activation_in.keypro_id or activation_in.motherboard_id or activation_in.disk_id)
+
+
+def _shares_hardware_id(act: Activation, request_values: dict) -> bool:
+    """任一可比對的 (kind, value) 相同即視為同一台機器（排除規則見 services.hardware_ids）"""
+    return any(request_values.get(kind) == value for kind, value in activation_hardware_values(act).items())
+
+
+def _sorted_by_status(activations: List[Activation], status: str) -> List[Activation]:
+    # 依 id 排序，與資料庫 .first() 的預設順序一致
+    return sorted((act for act in activations if act.status == status), key=lambda act: act.id)
+
+
+def find_blacklisted_activation(activations: List[Activation], activation_in) -> Optional[Activation]:
+    """尋找與請求相符的黑名單啟用記錄"""
+    blacklisted = _sorted_by_status(activations, 'blacklisted')
+
+    # 檢查機器碼匹配的黑名單記錄
+    for act in blacklisted:
+        if (act.machine_code == activation_in.machine_code and
+                act.motherboard_id == activation_in.motherboard_id and
+                act.disk_id == activation_in.disk_id):
+            return act
+
+    # 如果沒有機器碼匹配的黑名單記錄，檢查硬體ID匹配
+    if not _has_hardware_ids(activation_in):
+        return None
+
+    request_values = activation_hardware_values(activation_in)
+    for act in blacklisted:
+        if _shares_hardware_id(act, request_values):
+            return act
+    return None
+
+
+def find_active_by_machine_code(activations: List[Activation], machine_code: str) -> Optional[Activation]:
+    """尋找機器碼完全相符的 active 啟用記錄"""
+    for act in _sorted_by_status(activations, 'active'):
+        if act.machine_code == machine_code:
+            return act
+    return None
+
+
+def has_keypro_conflict(activations: List[Activation], keypro_id: Optional[str]) -> bool:
+    """序號已綁定其他 KeyPro 時回傳 True"""
+    if not keypro_id:
+        return False
+    return any(
+        act.keypro_id is not None and act.keypro_id != keypro_id
+        for act in _sorted_by_status(activations, 'active')
+    )
+
+
+def find_active_by_hardware_ids(activations: List[Activation], activation_in) -> Optional[Activation]:
+    """尋找有任何硬體ID相符的 active 啟用記錄"""
+    request_values = activation_hardware_values(activation_in)
+    if not request_values:
+        return None
+    for act in _sorted_by_status(activations, 'active'):
+        if _shares_hardware_id(act, request_values):
+            return act
+    return None
+
+
+def resolve_validation(
+    license_obj: License,
+    activation_in,
+    blacklisted_activations: Optional[List[Activation]] = None,
+) -> ValidationResolution:
+    """
+    以已載入的啟用記錄在記憶體中完成 /validate 的比對：
+    黑名單 → 機器碼 → KeyPro 限制 → 硬體ID。
+    license_obj.activations 未載入黑名單記錄時，以 blacklisted_activations 傳入需要比對的黑名單記錄。
+    """
+    activations = list(license_obj.activations)
+
+    blacklisted = find_blacklisted_activation(activations + list(blacklisted_activations or []), activation_in)
+    if blacklisted:
+        return ValidationResolution(outcome='blacklisted', activation=blacklisted)
+
+    activation_obj = find_active_by_machine_code(activations, activation_in.machine_code)
+    if activation_obj:
+        return ValidationResolution(outcome='matched', activation=activation_obj)
+
+    if not _has_hardware_ids(activation_in):
+        return ValidationResolution(outcome='not_found')
+
+    if has_keypro_conflict(activations, activation_in.keypro_id):
+        return ValidationResolution(outcome='keypro_conflict')
+
+    activation_obj = find_active_by_hardware_ids(activations, activation_in)
+    if activation_obj:
+        return ValidationResolution(outcome='hardware_match', activation=activation_obj)
+
+    return ValidationResolution(outcome='not_found')
@@ -0,0 +1,82 @@
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..models.activation import Activation
+from .hardware_ids import activation_hardware_values
+
+# 機器碼在 key 中使用的 kind（硬體ID則使用 services.hardware_ids 的 kind）
+MACHINE_CODE_KIND = "machine_code"
+
+
+def _activation_keys(license_id: int, activation) -> List[Tuple[int, str, str]]:
+    """黑名單比對會用到的 (license_id, kind, value)：機器碼與可比對的硬體ID"""
+    keys = [(license_id, kind, value) for kind, value in activation_hardware_values(activation).items()]
+    if activation.machine_code:
+        keys.append((license_id, MACHINE_CODE_KIND, activation.machine_code))
+    return keys
+
+
+class BlacklistFilter:
+    """
+    黑名單啟用記錄的記憶體索引，讓 /validate 在「一定不在黑名單」時不必載入黑名單記錄。
+    - might_be_blacklisted() 為 False 時保證沒有相符的黑名單記錄；為 True 時仍需以資料庫記錄確認
+    - 本行程的加入/刪除黑名單會立即更新；其他 worker 的變更在下一次 rebuild() 後才生效
+    - 尚未 rebuild() 前一律回傳 True（退回每次都查詢）
+    """
+
+    def __init__(self):
+        self._keys: Counter = Counter()
+        self._lock = threading.Lock()
+        self.ready = False
+        self.skipped = 0
+        self.checked = 0
+
+    def rebuild(self, db: Session) -> int:
+        """從資料庫重建索引，回傳黑名單記錄數量"""
+        rows = db.execute(select(
+            Activation.license_id, Activation.machine_code,
+            Activation.keypro_id, Activation.motherboard_id, Activation.disk_id,
+        ).where(Activation.status == 'blacklisted')).all()
+        keys: Counter = Counter()
+        for row in rows:
+            keys.update(_activation_keys(row.license_id, row))
+        with self._lock:
+            self._keys = keys
+            self.ready = True
+        return len(rows)
+
+    def add(self, activation: Activation) -> None:
+        with self._lock:
+            self._keys.update(_activation_keys(activation.license_id, activation))
+
+    def remove(self, activation: Activation) -> None:
+        with self._lock:
+            self._keys.subtract(_activation_keys(activation.license_id, activation))
+            self._keys += Counter()  # 去掉計數為 0 的 key
+
+    def might_be_blacklisted(self, license_id: int, activation_in) -> bool:
+        if not self.ready:
+            return True
+        keys = _activation_keys(license_id, activation_in)
+        with self._lock:
+            hit = any(key in self._keys for key in keys)
+        if hit:
+            self.checked += 1
+        else:
+            self.skipped += 1
+        return hit
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "keys": len(self._keys),
+            "checked": self.checked,
+            "skipped": self.skipped,
+        }
+
+
+blacklist_filter = BlacklistFilter()
@@ -0,0 +1,97 @@
+import json
+import logging
+import zlib
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Tuple
+
+from sqlalchemy import delete, or_, select
+from sqlalchemy.orm import Session
+
+from ..models.event_log import EventLog
+from ..models.event_log_archive import EventLogArchive
+
+logger = logging.getLogger(__name__)
+
+# 單一封存列最多的事件數，避免 payload 過大
+MAX_EVENTS_PER_ARCHIVE = 1000
+
+# 未確認時不封存的嚴重度，留在 event_logs 等管理者處理
+RETAINED_UNCONFIRMED_SEVERITIES = ("suspicious", "critical")
+
+_EVENT_COLUMNS = [column.name for column in EventLog.__table__.columns]
+_DATETIME_COLUMNS = ("created_at", "confirmed_at")
+
+
+def _event_to_dict(event: EventLog) -> Dict[str, Any]:
+    data = {name: getattr(event, name) for name in _EVENT_COLUMNS}
+    for name in _DATETIME_COLUMNS:
+        if data[name] is not None:
+            data[name] = data[name].isoformat()
+    return data
+
+
+def pack_events(events: List[Dict[str, Any]]) -> bytes:
+    return zlib.compress(json.dumps(events, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), 9)
+
+
+def unpack_events(payload: bytes) -> List[Dict[str, Any]]:
+    return json.loads(zlib.decompress(payload).decode("utf-8"))
+
+
+def month_of(value: datetime) -> date:
+    return value.date().replace(day=1)
+
+
+def archivable_events(cutoff: datetime):
+    """可封存事件的條件：早於 cutoff，且不是未確認的 suspicious/critical 事件"""
+    return (
+        EventLog.created_at < cutoff,
+        or_(EventLog.is_confirmed == True, EventLog.severity.notin_(RETAINED_UNCONFIRMED_SEVERITIES)),
+    )
+
+
+def archive_events_before(db: Session, *, cutoff: datetime, batch_size: int) -> int:
+    """
+    將 created_at 早於 cutoff 的事件移入 event_log_archives，回傳封存筆數。
+    每批 batch_size 筆（依 created_at, id 索引順序）各自 commit，中途失敗不會重複或遺失事件。
+    未確認的 suspicious/critical 事件仍待管理者處理，保留在 event_logs。
+    """
+    archived = 0
+    while True:
+        events = db.scalars(
+            select(EventLog)
+            .where(*archivable_events(cutoff))
+            .order_by(EventLog.created_at, EventLog.id)
+            .limit(batch_size)
+        ).all()
+        if not events:
+            return archived
+
+        groups: Dict[Tuple[date, str], List[EventLog]] = defaultdict(list)
+        for event in events:
+            groups[(month_of(event.created_at), event.serial_number)].append(event)
+        for (month, serial_number), group in groups.items():
+            for start in range(0, len(group), MAX_EVENTS_PER_ARCHIVE):
+                chunk = group[start:start + MAX_EVENTS_PER_ARCHIVE]
+                db.add(EventLogArchive(
+                    month=month,
+                    serial_number=serial_number,
+                    license_id=next((event.license_id for event in chunk if event.license_id), None),
+                    event_count=len(chunk),
+                    first_created_at=chunk[0].created_at,
+                    last_created_at=chunk[-1].created_at,
+                    payload=pack_events([_event_to_dict(event) for event in chunk]),
+                ))
+        db.execute(delete(EventLog).where(EventLog.id.in_([event.id for event in events])))
+        db.commit()
+        db.expunge_all()
+        archived += len(events)
+        logger.info(f"Archived {len(events)} event logs into {len(groups)} month/serial group(s).")
+
+
+def load_archived_events(payloads: Iterable[bytes]) -> List[Dict[str, Any]]:
+    """解壓縮封存批次的 payload，依 created_at 新到舊排序"""
+    events = [event for payload in payloads for event in unpack_events(payload)]
+    events.sort(key=lambda event: (event["created_at"], event["id"]), reverse=True)
+    return events
@@ -0,0 +1,148 @@
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .. import crud
+from ..core.config import settings
+from ..db.session import AsyncSessionLocal
+from ..schemas.event_log import EventLogCreate
+
+logger = logging.getLogger(__name__)
+
+# 這些嚴重程度的事件不經過緩衝，直接同步寫入
+SYNC_SEVERITIES = {'suspicious', 'critical'}
+
+# session.info 中等待交易 commit 後才放入佇列的事件
+PENDING_EVENTS_KEY = "pending_event_logs"
+
+
+class EventLogBuffer:
+    """
+    事件記錄的 write-behind 緩衝區。
+    事件先放入記憶體佇列，每 flush_interval_ms 或累積 flush_max_rows 筆時以單一 bulk insert 寫入。
+    寫入失敗的批次放回佇列重試；佇列已滿時丟棄新事件並累計 dropped。
+    """
+
+    def __init__(self, flush_interval_ms: int, flush_max_rows: int, max_queue: int):
+        self.flush_interval = flush_interval_ms / 1000
+        self.flush_max_rows = flush_max_rows
+        self.max_queue = max_queue
+        self._queue: Deque[Dict[str, Any]] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._stopping = False
+        self.dropped = 0
+        self.flushed = 0
+        self.failed = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queue_depth": len(self._queue),
+            "dropped": self.dropped,
+            "flushed": self.flushed,
+            "failed": self.failed,
+        }
+
+    def enqueue(self, event_in: EventLogCreate) -> bool:
+        """放入佇列；佇列已滿時回傳 False"""
+        if len(self._queue) >= self.max_queue:
+            self.dropped += 1
+            return False
+        event_data = event_in.model_dump()
+        # 以事件發生的時間為準，而不是寫入的時間
+        event_data["created_at"] = datetime.utcnow()
+        self._queue.append(event_data)
+        if len(self._queue) >= self.flush_max_rows and self._wakeup is not None:
+            self._wakeup.set()
+        return True
+
+    async def record(self, db: AsyncSession, event_in: EventLogCreate, commit: bool = True) -> None:
+        """
+        記錄事件。可疑/嚴重事件，或緩衝區未啟動時，直接以 db 同步寫入。
+        commit=False 時同步寫入會加入呼叫端的交易，
+        而緩衝事件會等到該交易 commit 後才放入佇列（rollback 則捨棄）。
+        """
+        if event_in.severity in SYNC_SEVERITIES or not self.running:
+            await crud.event_log.create_async(db, obj_in=event_in, commit=commit)
+            return
+        if commit:
+            self.enqueue(event_in)
+        else:
+            db.info.setdefault(PENDING_EVENTS_KEY, []).append(event_in)
+
+    async def flush(self) -> int:
+        """將目前佇列中的事件全部寫入資料庫，回傳寫入筆數"""
+        async with self._flush_lock:
+            written = 0
+            while self._queue:
+                batch = [self._queue.popleft() for _ in range(min(len(self._queue), self.flush_max_rows))]
+                try:
+                    async with AsyncSessionLocal() as db:
+                        await crud.event_log.create_multi_async(db, objs_in=batch)
+                    self.flushed += len(batch)
+                    written += len(batch)
+                except Exception as e:
+                    self.failed += len(batch)
+                    logger.error(f"Failed to flush {len(batch)} event logs: {e}", exc_info=True)
+                    # 放回佇列前端，下次 flush 重試；佇列已滿時超出的部分捨棄並記入 dropped
+                    kept = batch[:max(self.max_queue - len(self._queue), 0)]
+                    self._queue.extendleft(reversed(kept))
+                    self.dropped += len(batch) - len(kept)
+                    break
+            return written
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止背景寫入並把剩餘事件寫入資料庫"""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+        await self.flush()
+
+
+event_log_buffer = EventLogBuffer(
+    flush_interval_ms=settings.EVENT_LOG_FLUSH_INTERVAL_MS,
+    flush_max_rows=settings.EVENT_LOG_FLUSH_MAX_ROWS,
+    max_queue=settings.EVENT_LOG_BUFFER_MAX,
+)
+
+
+@event.listens_for(Session, "after_commit")
+def _enqueue_pending_events(session: Session) -> None:
+    for event_in in session.info.pop(PENDING_EVENTS_KEY, []):
+        event_log_buffer.enqueue(event_in)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_events(session: Session) -> None:
+    session.info.pop(PENDING_EVENTS_KEY, None)
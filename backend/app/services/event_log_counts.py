@@ -0,0 +1,79 @@
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from .. import crud
+from ..core.config import settings
+from ..schemas.event_log import EventLogFilters
+
+
+class EventLogCountCache:
+    """
+    /admin/event-logs 各搜尋條件的總筆數快取。
+    快取沒有某條件時（第一次查詢、或已因閒置被移除）由該次請求計算一次精確筆數，
+    之後由背景工作 refresh() 定期重新計算，同條件的後續請求不再執行 COUNT(*)；
+    超過 idle_seconds 沒有被查詢的條件不再更新並移除。
+    """
+
+    def __init__(self, max_keys: int, idle_seconds: float):
+        self.max_keys = max_keys
+        self.idle_seconds = idle_seconds
+        # filters -> (count, 計算時間, 最後查詢時間)
+        self._entries: Dict[EventLogFilters, Tuple[int, float, float]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, filters: EventLogFilters) -> Optional[Tuple[int, float]]:
+        """回傳 (count, 計算時間)；沒有快取時回傳 None"""
+        with self._lock:
+            entry = self._entries.get(filters)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries[filters] = (entry[0], entry[1], time.monotonic())
+            return entry[0], entry[1]
+
+    def set(self, filters: EventLogFilters, count: int) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._entries[filters] = (count, now, now)
+            if len(self._entries) > self.max_keys:
+                # 移除最久沒有被查詢的條件
+                oldest = min(self._entries, key=lambda key: self._entries[key][2])
+                del self._entries[oldest]
+
+    def refresh(self, db: Session) -> int:
+        """重新計算最近被查詢過的條件，回傳更新的條件數"""
+        now = time.monotonic()
+        with self._lock:
+            for filters in [key for key, entry in self._entries.items() if now - entry[2] > self.idle_seconds]:
+                del self._entries[filters]
+            keys = list(self._entries)
+        for filters in keys:
+            count = crud.event_log.count_filtered(db, filters=filters)
+            with self._lock:
+                entry = self._entries.get(filters)
+                if entry is not None:
+                    self._entries[filters] = (count, time.monotonic(), entry[2])
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "keys": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+event_log_count_cache = EventLogCountCache(
+    max_keys=100,
+    idle_seconds=max(settings.EVENT_LOG_COUNT_REFRESH_SECONDS * 10, 600),
+)
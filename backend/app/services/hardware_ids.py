@@ -0,0 +1,122 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..models.activation import Activation
+from ..models.activation_hardware_id import ActivationHardwareId
+
+# 參與比對的硬體種類，對應 Activation 的 <kind>_id 欄位
+HARDWARE_KINDS = ("keypro", "motherboard", "disk")
+
+# 影響 activation_hardware_ids 內容的 Activation 欄位
+_SYNCED_ATTRIBUTES = ("license_id", "status", "keypro_id", "motherboard_id", "disk_id")
+
+
+@dataclass(frozen=True)
+class ExclusionRule:
+    kind: str
+    value: str  # 已正規化
+    prefix: bool = False
+
+    def matches(self, kind: str, normalized_value: str) -> bool:
+        if kind != self.kind:
+            return False
+        if self.prefix:
+            return normalized_value.startswith(self.value)
+        return normalized_value == self.value
+
+
+def normalize_hardware_id(value: Optional[str]) -> Optional[str]:
+    """去除前後空白並轉成大寫（與 MariaDB 預設不分大小寫的比對一致）"""
+    if value is None:
+        return None
+    return value.strip().upper() or None
+
+
+def parse_exclusion_rules(spec: str) -> List[ExclusionRule]:
+    """解析 "disk:Volume*,disk:DAHA" 格式的排除規則"""
+    rules = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        kind, _, value = item.partition(":")
+        if kind not in HARDWARE_KINDS or not value:
+            raise ValueError(f"Invalid hardware ID exclusion rule '{item}'.")
+        prefix = value.endswith("*")
+        rules.append(ExclusionRule(kind=kind, value=normalize_hardware_id(value.rstrip("*")), prefix=prefix))
+    return rules
+
+
+EXCLUSION_RULES = parse_exclusion_rules(settings.HARDWARE_ID_EXCLUSIONS)
+
+
+def is_excluded(kind: str, normalized_value: str) -> bool:
+    """無法識別機器的硬體ID（例如 Volume*、DAHA）不參與比對"""
+    return any(rule.matches(kind, normalized_value) for rule in EXCLUSION_RULES)
+
+
+def hardware_id_values(
+    keypro_id: Optional[str] = None,
+    motherboard_id: Optional[str] = None,
+    disk_id: Optional[str] = None,
+) -> Dict[str, str]:
+    """回傳可用於比對的 {kind: normalized_value}，空值與排除的ID不列入"""
+    values = {}
+    for kind, value in zip(HARDWARE_KINDS, (keypro_id, motherboard_id, disk_id)):
+        normalized_value = normalize_hardware_id(value)
+        if normalized_value and not is_excluded(kind, normalized_value):
+            values[kind] = normalized_value
+    return values
+
+
+def activation_hardware_values(activation) -> Dict[str, str]:
+    """Activation 或 ActivationRequest 的可比對硬體ID"""
+    return hardware_id_values(activation.keypro_id, activation.motherboard_id, activation.disk_id)
+
+
+def sync_hardware_ids(activation: Activation) -> None:
+    """讓 activation.hardware_ids 與啟用記錄目前的硬體ID、狀態一致"""
+    license_id = activation.license_id
+    if license_id is None and activation.license is not None:
+        license_id = activation.license.id
+    # 尚未 flush 的新記錄 status 仍是 None（欄位預設值 'active' 在 INSERT 時才套用）
+    status = activation.status or 'active'
+    desired = activation_hardware_values(activation)
+    current = {row.kind: row for row in activation.hardware_ids}
+
+    for kind, row in current.items():
+        if desired.get(kind) != row.normalized_value:
+            activation.hardware_ids.remove(row)
+
+    for kind, normalized_value in desired.items():
+        row = current.get(kind)
+        if row is not None and row.normalized_value == normalized_value:
+            row.status = status
+            row.license_id = license_id
+        else:
+            activation.hardware_ids.append(ActivationHardwareId(
+                license_id=license_id,
+                kind=kind,
+                normalized_value=normalized_value,
+                status=status,
+            ))
+
+
+def _needs_sync(activation: Activation) -> bool:
+    state = inspect(activation)
+    return any(state.attrs[name].history.has_changes() for name in _SYNCED_ATTRIBUTES)
+
+
+@event.listens_for(Session, "before_flush")
+def _sync_activation_hardware_ids(session: Session, flush_context, instances) -> None:
+    """所有 ORM 寫入路徑（公開 API、管理端、腳本）都在 flush 前同步 activation_hardware_ids"""
+    with session.no_autoflush:
+        for obj in list(session.new) + list(session.dirty):
+            if not isinstance(obj, Activation) or obj in session.deleted:
+                continue
+            if obj in session.new or _needs_sync(obj):
+                sync_hardware_ids(obj)
@@ -0,0 +1,200 @@
+import asyncio
+import logging
+from dataclasses import asdict, dataclass
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import crud
+from ..core.config import settings
+from ..db.session import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Heartbeat:
+    """一個啟用記錄一天內的正常驗證彙總"""
+    activation_id: int
+    license_id: int
+    day: date
+    first_seen_at: datetime
+    last_seen_at: datetime
+    count: int = 1
+    last_ip: Optional[str] = None
+    last_app_version: Optional[str] = None
+
+    def merge(self, other: "Heartbeat") -> None:
+        self.count += other.count
+        self.first_seen_at = min(self.first_seen_at, other.first_seen_at)
+        if other.last_seen_at >= self.last_seen_at:
+            self.last_seen_at = other.last_seen_at
+            self.last_ip = other.last_ip
+            self.last_app_version = other.last_app_version
+
+
+def make_heartbeat(
+    activation_id: int, license_id: int, ip_address: Optional[str], app_version: Optional[str]
+) -> Heartbeat:
+    now = datetime.utcnow()
+    return Heartbeat(
+        activation_id=activation_id,
+        license_id=license_id,
+        day=now.date(),
+        first_seen_at=now,
+        last_seen_at=now,
+        last_ip=ip_address,
+        last_app_version=app_version,
+    )
+
+
+def _activation_touches(heartbeats: Iterable[Heartbeat]) -> Dict[int, Tuple[datetime, Optional[str]]]:
+    """每個啟用記錄最後一次驗證的 (last_validated_at, ip_address)"""
+    touches: Dict[int, Tuple[datetime, Optional[str]]] = {}
+    for heartbeat in heartbeats:
+        current = touches.get(heartbeat.activation_id)
+        if current is None or heartbeat.last_seen_at >= current[0]:
+            touches[heartbeat.activation_id] = (heartbeat.last_seen_at, heartbeat.last_ip)
+    return touches
+
+
+async def _write(db: AsyncSession, heartbeats: List[Heartbeat]) -> int:
+    """
+    先以獨立交易更新 activations.last_validated_at/ip_address，再 upsert activation_heartbeats，
+    彙總寫入失敗不影響驗證時間；回傳寫入的彙總筆數（已刪除的啟用記錄不寫入）
+    """
+    await crud.activation.touch_validated_many_async(db, touches=_activation_touches(heartbeats), commit=True)
+    return await crud.activation_heartbeat.upsert_many_async(db, rows=[asdict(heartbeat) for heartbeat in heartbeats])
+
+
+class HeartbeatBuffer:
+    """
+    正常驗證的記憶體彙總：同一啟用記錄同一天的驗證合併成一筆，
+    每 flush_interval_seconds 或累積 max_keys 筆時以單一 upsert 寫入 activation_heartbeats，
+    並以單一 UPDATE 寫入各啟用記錄的 last_validated_at 與 ip_address
+    （因此這兩個欄位最多落後 flush_interval_seconds）。
+    寫入持續失敗時最多保留 max_pending 筆，超過的新 (activation_id, day) 記入 dropped。
+    未啟動時（例如腳本）直接寫入。
+    """
+
+    def __init__(self, flush_interval_seconds: float, max_keys: int, max_pending: int):
+        self.flush_interval = flush_interval_seconds
+        self.max_keys = max_keys
+        self.max_pending = max(max_pending, max_keys)
+        self._pending: Dict[Tuple[int, date], Heartbeat] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._stopping = False
+        self.recorded = 0
+        self.flushed_rows = 0
+        self.failed = 0
+        self.orphaned = 0
+        self.dropped = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending_keys": len(self._pending),
+            "recorded": self.recorded,
+            "flushed_rows": self.flushed_rows,
+            "failed": self.failed,
+            "orphaned": self.orphaned,
+            "dropped": self.dropped,
+        }
+
+    def add(self, heartbeat: Heartbeat) -> None:
+        self.recorded += heartbeat.count
+        key = (heartbeat.activation_id, heartbeat.day)
+        pending = self._pending.get(key)
+        if pending is None:
+            if len(self._pending) >= self.max_pending:
+                self.dropped += heartbeat.count
+                return
+            self._pending[key] = heartbeat
+        else:
+            pending.merge(heartbeat)
+        if len(self._pending) >= self.max_keys and self._wakeup is not None:
+            self._wakeup.set()
+
+    async def record(self, db: AsyncSession, heartbeats: List[Heartbeat]) -> None:
+        """記錄正常驗證；緩衝區未啟動時合併後以 db 直接寫入"""
+        if self.running:
+            for heartbeat in heartbeats:
+                self.add(heartbeat)
+            return
+        merged: Dict[Tuple[int, date], Heartbeat] = {}
+        for heartbeat in heartbeats:
+            key = (heartbeat.activation_id, heartbeat.day)
+            if key in merged:
+                merged[key].merge(heartbeat)
+            else:
+                merged[key] = heartbeat
+        written = await _write(db, list(merged.values()))
+        self.orphaned += len(merged) - written
+
+    async def flush(self) -> int:
+        """寫入目前累積的彙總，回傳寫入的 (activation_id, day) 筆數"""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            pending, self._pending = self._pending, {}
+            heartbeats = list(pending.values())
+            try:
+                async with AsyncSessionLocal() as db:
+                    written = await _write(db, heartbeats)
+            except Exception as e:
+                self.failed += len(heartbeats)
+                logger.error(f"Failed to flush {len(heartbeats)} activation heartbeats: {e}", exc_info=True)
+                # 放回下次重試，期間新增的彙總合併進去；超過 max_pending 的捨棄
+                for key, heartbeat in pending.items():
+                    current = self._pending.get(key)
+                    if current is not None:
+                        heartbeat.merge(current)
+                    elif len(self._pending) >= self.max_pending:
+                        self.dropped += heartbeat.count
+                        continue
+                    self._pending[key] = heartbeat
+                return 0
+            # 啟用記錄在寫入前已被刪除的彙總直接捨棄，不再重試
+            self.orphaned += len(heartbeats) - written
+            self.flushed_rows += written
+            return written
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止背景寫入並把剩餘彙總寫入資料庫"""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+        await self.flush()
+
+
+heartbeat_buffer = HeartbeatBuffer(
+    flush_interval_seconds=settings.HEARTBEAT_FLUSH_INTERVAL_SECONDS,
+    max_keys=settings.HEARTBEAT_BUFFER_MAX_KEYS,
+    max_pending=settings.HEARTBEAT_BUFFER_MAX_PENDING,
+)
@@ -0,0 +1,79 @@
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict
+
+from fastapi import HTTPException, Request
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import crud
+from ..core.config import settings
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 128
+
+
+def request_hash(payload: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _replay(record, payload_hash: str) -> JSONResponse:
+    if record is None or record.status_code is None:
+        raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress.")
+    if record.request_hash != payload_hash:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request.")
+    return JSONResponse(
+        content=json.loads(record.response_body),
+        status_code=record.status_code,
+        headers={REPLAYED_HEADER: "true"},
+    )
+
+
+async def run_idempotent(
+    db: AsyncSession,
+    request: Request,
+    *,
+    endpoint: str,
+    serial_number: str,
+    payload: Dict[str, Any],
+    handler: Callable[[], Awaitable[Dict[str, Any]]],
+):
+    """
+    依 Idempotency-Key 標頭執行 handler：
+    - 沒有標頭時直接執行
+    - 相同 (endpoint, 序號, key) 已成功時回放保存的回應，不再執行 handler（不寫事件、不簽章）
+    - 相同 key 仍在處理中回應 409，內容不同回應 422
+    只保存成功的回應；handler 拋出例外時刪除記錄，用戶端可用相同 key 重試。
+    """
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if not key:
+        return await handler()
+    if len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters.")
+
+    payload_hash = request_hash(payload)
+    scope = dict(endpoint=endpoint, serial_number=serial_number, key=key)
+    record = await crud.idempotency_key.get_active_async(db, **scope)
+    if record is None:
+        record = await crud.idempotency_key.reserve_async(
+            db, **scope, request_hash=payload_hash, ttl_seconds=settings.IDEMPOTENCY_KEY_TTL_SECONDS
+        )
+        if record is not None:
+            return await _execute(db, record.id, handler)
+        # 其他請求剛以相同 key 新增記錄
+        record = await crud.idempotency_key.get_active_async(db, **scope)
+    return _replay(record, payload_hash)
+
+
+async def _execute(db: AsyncSession, record_id: int, handler: Callable[[], Awaitable[Dict[str, Any]]]):
+    try:
+        response = await handler()
+    except Exception:
+        await db.rollback()
+        await crud.idempotency_key.release_async(db, record_id=record_id)
+        raise
+    await crud.idempotency_key.complete_async(
+        db, record_id=record_id, status_code=200, response_body=json.dumps(response, default=str)
+    )
+    return response
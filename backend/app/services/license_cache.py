@@ -0,0 +1,254 @@
+import copy
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from types import MappingProxyType
+from typing import Any, Dict, Hashable, Mapping, Optional, Tuple
+
+from ..core.config import settings
+
+
+class SignedLicenseCache:
+    """
+    已簽章（尚未加密）授權內容的 LRU 快取。
+    Key 包含序號、機器碼、硬體ID、應用程式版本及授權的 updated_at，
+    因此授權被修改後舊的內容自然不會再被命中；invalidate() 用於立即釋放。
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(
+        serial_number: str,
+        machine_code: str,
+        hardware_ids: Optional[dict],
+        app_version: Optional[str],
+        updated_at: Any,
+        *extra: Hashable,
+    ) -> Tuple:
+        hardware_key = tuple(sorted(hardware_ids.items())) if hardware_ids else None
+        return (serial_number, machine_code, hardware_key, app_version, updated_at, *extra)
+
+    def get(self, key: Tuple) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: Tuple, value: Dict[str, Any]) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, serial_number: str) -> None:
+        """移除指定序號的所有快取內容"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == serial_number]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+signed_license_cache = SignedLicenseCache(max_size=settings.LICENSE_FILE_CACHE_SIZE)
+
+
+@dataclass(frozen=True)
+class LicenseSnapshot:
+    """公開 API 授權判斷用的授權唯讀快照（不含啟用記錄）"""
+    id: int
+    serial_number: str
+    status: str
+    expires_at: Optional[datetime]
+    max_activations: int
+    features: Optional[Mapping[str, Any]]
+    connection_type: str
+    customer_id: int
+    customer_name: Optional[str]
+    customer_email: Optional[str]
+
+    @classmethod
+    def from_license(cls, license_obj) -> "LicenseSnapshot":
+        features = license_obj.features
+        if isinstance(features, dict):
+            features = MappingProxyType(copy.deepcopy(features))
+        elif isinstance(features, list):
+            features = tuple(features)
+        customer = license_obj.customer
+        return cls(
+            id=license_obj.id,
+            serial_number=license_obj.serial_number,
+            status=license_obj.status,
+            expires_at=license_obj.expires_at,
+            max_activations=license_obj.max_activations,
+            features=features,
+            connection_type=license_obj.connection_type,
+            customer_id=license_obj.customer_id,
+            customer_name=customer.name if customer else None,
+            customer_email=customer.email if customer else None,
+        )
+
+    @property
+    def is_expired(self) -> bool:
+        return self.expires_at is not None and self.expires_at < datetime.utcnow()
+
+
+class LicenseSnapshotCache:
+    """
+    以序號為 key 的 LicenseSnapshot TTL + LRU 快取。
+    授權、客戶被修改時由寫入端呼叫 invalidate()；快取只存在於單一 worker 行程，
+    其他 worker 的舊內容最多保留 ttl 秒。
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, LicenseSnapshot]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, serial_number: str) -> Optional[LicenseSnapshot]:
+        with self._lock:
+            entry = self._entries.get(serial_number)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[serial_number]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(serial_number)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, snapshot: LicenseSnapshot) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[snapshot.serial_number] = (time.monotonic() + self.ttl, snapshot)
+            self._entries.move_to_end(snapshot.serial_number)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, serial_number: str) -> None:
+        with self._lock:
+            if self._entries.pop(serial_number, None) is not None:
+                self.invalidations += 1
+
+    def invalidate_customer(self, customer_id: int) -> None:
+        """移除指定客戶所有授權的快照（客戶名稱、email 變更時使用）"""
+        with self._lock:
+            for serial_number in [
+                serial_number for serial_number, (_, snapshot) in self._entries.items()
+                if snapshot.customer_id == customer_id
+            ]:
+                del self._entries[serial_number]
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "invalidations": self.invalidations,
+        }
+
+
+license_snapshot_cache = LicenseSnapshotCache(
+    max_size=settings.LICENSE_SNAPSHOT_CACHE_SIZE,
+    ttl=settings.LICENSE_SNAPSHOT_CACHE_TTL,
+)
+
+
+def invalidate_license(serial_number: str) -> None:
+    """授權被修改後清除該序號的所有快取"""
+    signed_license_cache.invalidate(serial_number)
+    license_snapshot_cache.invalidate(serial_number)
+
+
+# CRUDLicense.create 產生的序號格式：DUCKY-XXXXXXXX-XXXXXXXX（大寫十六進位）
+SERIAL_NUMBER_PATTERN = re.compile(r"^DUCKY-[0-9A-F]{8}-[0-9A-F]{8}$")
+
+# 各 worker 各自快取查無資料的序號，新建立的序號在其他 worker 最多被誤拒這麼久
+MAX_UNKNOWN_SERIAL_TTL = 60
+
+
+class UnknownSerialCache:
+    """
+    最近查無資料的序號（negative cache），以及序號格式檢查。
+    is_rejected() 為 True 的序號可直接回應查無此序號，不必查詢資料庫。
+    新增授權時只有處理該請求的 worker 會 discard()，其他 worker 最多 ttl 秒內仍回應查無此序號，
+    因此 ttl 上限為 MAX_UNKNOWN_SERIAL_TTL 秒。
+    """
+
+    def __init__(self, max_size: int, ttl: float, check_format: bool):
+        self.max_size = max_size
+        self.ttl = min(ttl, MAX_UNKNOWN_SERIAL_TTL)
+        self.check_format = check_format
+        self._entries: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.malformed = 0
+
+    def is_rejected(self, serial_number: str) -> bool:
+        if self.check_format and not SERIAL_NUMBER_PATTERN.match(serial_number or ""):
+            self.malformed += 1
+            return True
+        with self._lock:
+            expires_at = self._entries.get(serial_number)
+            if expires_at is None:
+                return False
+            if expires_at < time.monotonic():
+                del self._entries[serial_number]
+                return False
+            self.hits += 1
+            return True
+
+    def add(self, serial_number: str) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[serial_number] = time.monotonic() + self.ttl
+            self._entries.move_to_end(serial_number)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, serial_number: str) -> None:
+        with self._lock:
+            self._entries.pop(serial_number, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "malformed": self.malformed,
+        }
+
+
+unknown_serial_cache = UnknownSerialCache(
+    max_size=settings.UNKNOWN_SERIAL_CACHE_SIZE,
+    ttl=settings.UNKNOWN_SERIAL_CACHE_TTL,
+    check_format=settings.LICENSE_SERIAL_FORMAT_CHECK,
+)
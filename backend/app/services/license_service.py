@@ -2,17 +2,21 @@ import json
 import hashlib
 import base64
 import datetime
+import random
 import secrets
+from dataclasses import dataclass
+from typing import Optional
 
-from cryptography.hazmat.primitives import hashes, serialization
-from cryptography.hazmat.primitives.asymmetric import padding
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.hazmat.primitives import padding as sym_padding
 
-import os
 from ..core.config import settings
 from ..models.license import License
+from .license_cache import signed_license_cache
+from .signing_executor import signing_executor
+from .signing_keys import SigningKey, license_key_id, sign_digest, signing_keys
 
 import binascii
 
@@ -27,35 +31,39 @@ except (binascii.Error, TypeError):
 if len(AES_KEY) != 32:
     raise ValueError(f"Decoded LICENSE_AES_KEY must be 32 bytes long, but got {len(AES_KEY)} bytes.")
 
-# --- Load Private Key from file ---
-KEYS_DIR = os.path.join(os.path.dirname(__file__), '..', 'keys')
-PRIVATE_KEY_PATH = os.path.join(KEYS_DIR, 'private_key.pem')
+# --- License file formats ---
+# v1: base64(IV(16) + AES-256-CBC(PKCS7(json with "signature")))，簽章的是另外以 sort_keys 序列化的 json
+# v2: base64(V2_HEADER + nonce(12) + AES-256-GCM(len(signature)(2, big endian) + signature + payload))
+#     payload 是唯一一次序列化的 canonical json（sort_keys、無空白、UTF-8），簽章的是 SHA-256(payload)；
+#     V2_HEADER 同時作為 GCM 的 associated data
+LICENSE_FORMAT_V1 = 1
+LICENSE_FORMAT_V2 = 2
+V2_HEADER = b"LIC\x02"
 
-if not os.path.exists(PRIVATE_KEY_PATH):
-    raise FileNotFoundError(f"Private key not found at: {PRIVATE_KEY_PATH}")
+def _version_tuple(version: Optional[str]) -> Optional[tuple]:
+    try:
+        return tuple(int(part) for part in version.strip().lstrip("vV").split("."))
+    except (AttributeError, ValueError):
+        return None
 
-with open(PRIVATE_KEY_PATH, "rb") as key_file:
-    private_key = serialization.load_pem_private_key(
-        key_file.read(),
-        password=None,
-        backend=default_backend()
-    )
+_V2_MIN_APP_VERSION = _version_tuple(settings.LICENSE_V2_MIN_APP_VERSION)
+
+def license_format_for(app_version: Optional[str]) -> int:
+    """app_version 不低於 LICENSE_V2_MIN_APP_VERSION 的用戶端使用 v2，其餘（含無法解析的版本）使用 v1"""
+    version = _version_tuple(app_version)
+    if _V2_MIN_APP_VERSION is None or version is None or version < _V2_MIN_APP_VERSION:
+        return LICENSE_FORMAT_V1
+    return LICENSE_FORMAT_V2
+
+def canonical_json(license_data: dict) -> bytes:
+    """v2 的 canonical encoding：簽章與加密使用同一份 bytes"""
+    return json.dumps(license_data, sort_keys=True, separators=(",", ":"), default=str, ensure_ascii=False).encode('utf-8')
 
-def _sign_license_data(license_data: dict) -> str:
-    """Signs license data using the private key."""
+def _license_hash(license_data: dict) -> bytes:
+    """SHA-256 digest of the canonical license json, which is what gets signed."""
     # Ensure json is encoded to utf-8 before hashing
     license_json = json.dumps(license_data, sort_keys=True, default=str, ensure_ascii=False)
-    license_hash = hashlib.sha256(license_json.encode('utf-8')).digest()
-    
-    signature = private_key.sign(
-        license_hash,
-        padding.PSS(
-            mgf=padding.MGF1(hashes.SHA256()),
-            salt_length=padding.PSS.MAX_LENGTH
-        ),
-        hashes.SHA256()
-    )
-    return base64.b64encode(signature).decode('utf-8')
+    return hashlib.sha256(license_json.encode('utf-8')).digest()
 
 def _encrypt_license_data(license_data: dict) -> bytes:
     """Encrypts the license data using AES-256-CBC."""
@@ -72,11 +80,48 @@ def _encrypt_license_data(license_data: dict) -> bytes:
     
     return base64.b64encode(iv + encrypted_data)
 
-def generate_license_file_content(license_obj: License, machine_code: str, hardware_ids: dict = None, app_version: str = None) -> bytes:
-    """
-    Generates the final encrypted and signed .lic file content.
-    """
-    # 1. Prepare the data payload
+def _encrypt_license_v2(payload: bytes, signature: str) -> bytes:
+    """Encrypts the canonical payload and its signature using AES-256-GCM."""
+    signature_bytes = base64.b64decode(signature)
+    plaintext = len(signature_bytes).to_bytes(2, "big") + signature_bytes + payload
+    nonce = secrets.token_bytes(12)
+    return base64.b64encode(V2_HEADER + nonce + AESGCM(AES_KEY).encrypt(nonce, plaintext, V2_HEADER))
+
+def _serialize_for_signing(license_data: dict, license_format: int):
+    """Returns (v2 payload or None, digest to sign)."""
+    if license_format == LICENSE_FORMAT_V2:
+        payload = canonical_json(license_data)
+        return payload, hashlib.sha256(payload).digest()
+    return None, _license_hash(license_data)
+
+def _lease_hours(license_obj: License) -> int:
+    """The license's lease length wins over the product's, which wins over LICENSE_LEASE_HOURS."""
+    if license_obj.lease_hours:
+        return license_obj.lease_hours
+    if license_obj.product is not None and license_obj.product.lease_hours:
+        return license_obj.product.lease_hours
+    return settings.LICENSE_LEASE_HOURS
+
+def _build_lease(license_obj: License, activation_id: int) -> dict:
+    """Builds a validation lease starting now, never outliving the license itself."""
+    issued_at = datetime.datetime.utcnow().replace(microsecond=0)
+    valid_until = issued_at + datetime.timedelta(hours=_lease_hours(license_obj))
+    if license_obj.expires_at and license_obj.expires_at < valid_until:
+        valid_until = license_obj.expires_at.replace(microsecond=0)
+    return {
+        "issued_at": issued_at.isoformat() + "Z",
+        "valid_until": valid_until.isoformat() + "Z",
+        "activation_id": activation_id,
+    }
+
+def _parse_utc(value: str) -> datetime.datetime:
+    return datetime.datetime.fromisoformat(value.rstrip("Z"))
+
+def _signing_key(license_obj: License) -> SigningKey:
+    return signing_keys.for_product(license_obj.product)
+
+def _build_license_data(license_obj: License, machine_code: str, hardware_ids: dict = None, app_version: str = None, activation_id: int = None, signing_key: SigningKey = None) -> dict:
+    """Builds the unsigned license payload."""
     license_data = {
         "license_id": license_obj.serial_number, # Use serial_number as license_id
         "machine_code": machine_code,
@@ -96,12 +141,129 @@ def generate_license_file_content(license_obj: License, machine_code: str, hardw
     if app_version:
         license_data["app_version"] = app_version
     
-    # 2. Sign the data
-    signature = _sign_license_data(license_data)
+    # 綁定啟用記錄的驗證租約（後台手動下載的授權檔沒有租約）
+    if activation_id is not None:
+        license_data["lease"] = _build_lease(license_obj, activation_id)
+    
+    # 標示金鑰與演算法，輪替期間用戶端可依 key_id 選擇公鑰；
+    # 舊的授權檔沒有 key_id，用戶端缺少時應以預設 RSA 公鑰驗證
+    if signing_key is not None:
+        license_data["key_id"] = license_key_id(signing_key)
+        license_data["signature_alg"] = signing_key.algorithm
+    
+    return license_data
+
+def _cache_key(license_obj: License, machine_code: str, hardware_ids: dict = None, app_version: str = None, activation_id: int = None, license_format: int = LICENSE_FORMAT_V1) -> tuple:
+    # degraded_at 是每次驗證的當下時間，只以「是否降級」列入 key：
+    # 降級中的用戶端沿用第一次降級時簽出的授權檔（digest 不變），租約過半才重簽
+    if hardware_ids and "degraded_at" in hardware_ids:
+        hardware_ids = {name: value for name, value in hardware_ids.items() if name != "degraded_at"}
+        hardware_ids["degraded"] = True
+    return signed_license_cache.make_key(
+        license_obj.serial_number,
+        machine_code,
+        hardware_ids,
+        app_version,
+        license_obj.updated_at,
+        license_obj.customer.name,
+        license_obj.customer.email,
+        activation_id,
+        _lease_hours(license_obj) if activation_id is not None else None,
+        _signing_key(license_obj).key_id,
+        license_format,
+    )
+
+def _make_entry(license_data: dict, license_hash: bytes, signature: str, payload: Optional[bytes] = None) -> dict:
+    """Cache entry: the signed payload (and its v2 encoding), its digest and when its lease should be renewed."""
     license_data_with_signature = license_data.copy()
     license_data_with_signature["signature"] = signature
+    renew_after = None
+    lease = license_data.get("lease")
+    if lease:
+        issued_at = _parse_utc(lease["issued_at"])
+        renew_after = issued_at + (_parse_utc(lease["valid_until"]) - issued_at) / 2
+    return {
+        "data": license_data_with_signature,
+        "payload": payload,
+        "digest": license_hash.hex(),
+        "renew_after": renew_after,
+    }
+
+def _encrypt_entry(entry: dict) -> bytes:
+    if entry["payload"] is not None:
+        return _encrypt_license_v2(entry["payload"], entry["data"]["signature"])
+    return _encrypt_license_data(entry["data"])
+
+def _cached_entry(cache_key: tuple):
+    """Returns the cached entry unless its lease is past the halfway renewal point."""
+    entry = signed_license_cache.get(cache_key)
+    if entry is not None and entry["renew_after"] is not None and datetime.datetime.utcnow() >= entry["renew_after"]:
+        return None
+    return entry
+
+def next_check_after(lease: dict) -> str:
+    """
+    Server-chosen time for the client's next /validate: a random point between a
+    quarter and half of the remaining lease, so check-ins spread out over the day.
+    """
+    now = datetime.datetime.utcnow()
+    remaining = max(_parse_utc(lease["valid_until"]) - now, datetime.timedelta(0))
+    return (now + remaining * random.uniform(0.25, 0.5)).replace(microsecond=0).isoformat() + "Z"
+
+@dataclass
+class IssuedLicense:
+    content: Optional[bytes]  # None when the client's copy is still current
+    digest: str
+    lease: Optional[dict]
+
+def generate_license_file_content(license_obj: License, machine_code: str, hardware_ids: dict = None, app_version: str = None) -> bytes:
+    """
+    Generates the final encrypted and signed .lic file content.
+    The signed payload is cached per license revision and machine binding,
+    only the encryption (with a fresh IV) runs on every call.
+    """
+    license_format = license_format_for(app_version)
+    cache_key = _cache_key(license_obj, machine_code, hardware_ids, app_version, license_format=license_format)
+    entry = _cached_entry(cache_key)
+    if entry is None:
+        signing_key = _signing_key(license_obj)
+        # 1. Prepare the data payload
+        license_data = _build_license_data(license_obj, machine_code, hardware_ids, app_version, signing_key=signing_key)
+        # 2. Sign the data
+        payload, license_hash = _serialize_for_signing(license_data, license_format)
+        entry = _make_entry(license_data, license_hash, sign_digest(signing_key, license_hash), payload)
+        signed_license_cache.set(cache_key, entry)
     
     # 3. Encrypt the data with signature
-    encrypted_content = _encrypt_license_data(license_data_with_signature)
+    return _encrypt_entry(entry)
+
+async def issue_license_file_async(
+    license_obj: License,
+    machine_code: str,
+    hardware_ids: dict = None,
+    app_version: str = None,
+    activation_id: int = None,
+    client_digest: str = None,
+) -> IssuedLicense:
+    """
+    Issues the .lic content for the public endpoints, signing in the signing
+    executor so the event loop is not blocked. The signed payload (including its
+    lease) is reused until the lease is half over; when client_digest matches it,
+    nothing is encrypted and content is None.
+    Raises SigningUnavailableError when the executor is saturated or times out.
+    """
+    license_format = license_format_for(app_version)
+    cache_key = _cache_key(license_obj, machine_code, hardware_ids, app_version, activation_id, license_format)
+    entry = _cached_entry(cache_key)
+    if entry is None:
+        signing_key = _signing_key(license_obj)
+        license_data = _build_license_data(license_obj, machine_code, hardware_ids, app_version, activation_id, signing_key)
+        payload, license_hash = _serialize_for_signing(license_data, license_format)
+        signature = await signing_executor.sign(license_hash, signing_key)
+        entry = _make_entry(license_data, license_hash, signature, payload)
+        signed_license_cache.set(cache_key, entry)
     
-    return encrypted_content
\ No newline at end of file
+    lease = entry["data"].get("lease")
+    if client_digest is not None and client_digest == entry["digest"]:
+        return IssuedLicense(content=None, digest=entry["digest"], lease=lease)
+    return IssuedLicense(content=_encrypt_entry(entry), digest=entry["digest"], lease=lease)
@@ -0,0 +1,101 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+from ..core.config import settings
+from .signing_keys import KEYS_DIR, SigningKey, load_signing_keys, sign_digest
+
+logger = logging.getLogger(__name__)
+
+# 每個 worker 行程各自載入一次的簽章金鑰
+_worker_keys: Dict[str, SigningKey] = {}
+
+
+class SigningUnavailableError(Exception):
+    """簽章佇列已滿或簽章逾時"""
+
+
+def _init_worker(keys_dir: str) -> None:
+    global _worker_keys
+    _worker_keys = load_signing_keys(keys_dir)
+
+
+def _sign_in_worker(key_id: str, license_hash: bytes) -> str:
+    return sign_digest(_worker_keys[key_id], license_hash)
+
+
+class SigningExecutor:
+    """
+    將授權檔簽章移出 event loop 的行程池。
+    - max_pending: 同時排隊 + 執行中的簽章上限，超過時等待直到逾時
+    - timeout: 取得名額與完成簽章的總等待秒數
+    """
+
+    def __init__(self, keys_dir: str, workers: int, max_pending: int, timeout: float):
+        self.keys_dir = keys_dir
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    @property
+    def started(self) -> bool:
+        return self._pool is not None
+
+    def start(self) -> None:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+        if self._pool is not None or self.workers <= 0:
+            return
+        # 以 spawn 建立 worker：fork 時其他執行緒（排程器、緩衝區、aiosqlite 等）持有的鎖會被複製進子行程而死結；
+        # worker 由 _init_worker 自行從 keys_dir 載入金鑰，不需要父行程的記憶體
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.keys_dir,),
+        )
+        logger.info(f"Signing executor started with {self.workers} workers (max pending {self.max_pending}).")
+
+    def shutdown(self) -> None:
+        self._slots = None
+        if self._pool is None:
+            return
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        self._pool = None
+
+    async def _run(self, license_hash: bytes, signing_key: SigningKey) -> str:
+        async with self._slots:
+            if self._pool is None:
+                return await asyncio.to_thread(sign_digest, signing_key, license_hash)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool, _sign_in_worker, signing_key.key_id, license_hash)
+
+    async def sign(self, license_hash: bytes, signing_key: SigningKey) -> str:
+        """
+        以 signing_key 在行程池中簽章（worker 依 key_id 使用各自預先載入的金鑰）；
+        沒有行程池時（例如腳本或 workers=0）改用執行緒並直接以 signing_key 簽章，
+        同樣受 max_pending 與 timeout 限制。
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+        try:
+            return await asyncio.wait_for(self._run(license_hash, signing_key), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            raise SigningUnavailableError(
+                f"License signing did not complete within {self.timeout} seconds."
+            )
+
+
+_workers = settings.LICENSE_SIGNING_WORKERS if settings.LICENSE_SIGNING_WORKERS >= 0 else (os.cpu_count() or 1)
+
+signing_executor = SigningExecutor(
+    keys_dir=KEYS_DIR,
+    workers=_workers,
+    max_pending=settings.LICENSE_SIGNING_MAX_PENDING or max(_workers, 1) * 4,
+    timeout=settings.LICENSE_SIGNING_TIMEOUT,
+)
@@ -0,0 +1,136 @@
+import base64
+import functools
+import hashlib
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, padding, rsa
+
+logger = logging.getLogger(__name__)
+
+KEYS_DIR = os.path.join(os.path.dirname(__file__), '..', 'keys')
+
+# 原本的 RSA 私鑰 keys/private_key.pem，未指定簽章金鑰的產品都使用它
+DEFAULT_KEY_ID = "default"
+DEFAULT_KEY_FILE = "private_key.pem"
+
+# 公鑰檔（scripts/generate_signing_key.py 產生）與私鑰放在同一目錄，載入時略過
+PUBLIC_KEY_SUFFIX = ".public.pem"
+
+ALG_RSA_PSS = "rsa-pss-sha256"
+ALG_ED25519 = "ed25519"
+ALG_ECDSA_P256 = "ecdsa-p256-sha256"
+
+
+@dataclass(frozen=True)
+class SigningKey:
+    key_id: str
+    algorithm: str
+    private_key: Any
+
+
+def key_algorithm(private_key) -> str:
+    if isinstance(private_key, rsa.RSAPrivateKey):
+        return ALG_RSA_PSS
+    if isinstance(private_key, ed25519.Ed25519PrivateKey):
+        return ALG_ED25519
+    if isinstance(private_key, ec.EllipticCurvePrivateKey) and isinstance(private_key.curve, ec.SECP256R1):
+        return ALG_ECDSA_P256
+    raise ValueError(f"Unsupported signing key type: {type(private_key).__name__}")
+
+
+def load_private_key(key_path: str):
+    with open(key_path, "rb") as key_file:
+        return serialization.load_pem_private_key(
+            key_file.read(),
+            password=None,
+            backend=default_backend()
+        )
+
+
+def load_signing_keys(keys_dir: str = KEYS_DIR) -> Dict[str, SigningKey]:
+    """
+    載入 keys 目錄下所有私鑰：<key_id>.pem，private_key.pem 的 key_id 為 "default"。
+    輪替金鑰時新舊金鑰可同時存在，由產品的 signing_key_id 決定使用哪一把。
+    """
+    keys = {}
+    for file_name in sorted(os.listdir(keys_dir)):
+        if not file_name.endswith(".pem") or file_name.endswith(PUBLIC_KEY_SUFFIX):
+            continue
+        key_id = DEFAULT_KEY_ID if file_name == DEFAULT_KEY_FILE else file_name[:-len(".pem")]
+        private_key = load_private_key(os.path.join(keys_dir, file_name))
+        keys[key_id] = SigningKey(key_id=key_id, algorithm=key_algorithm(private_key), private_key=private_key)
+    if DEFAULT_KEY_ID not in keys:
+        raise FileNotFoundError(f"Private key not found at: {os.path.join(keys_dir, DEFAULT_KEY_FILE)}")
+    return keys
+
+
+@functools.lru_cache(maxsize=None)
+def license_key_id(signing_key: SigningKey) -> str:
+    """
+    寫入授權檔的 key_id：具名金鑰使用檔名；預設金鑰輪替後檔名仍是 private_key.pem，
+    因此以公鑰指紋區分為 default-<SHA-256(公鑰 DER) 前 16 碼>。
+    """
+    if signing_key.key_id != DEFAULT_KEY_ID:
+        return signing_key.key_id
+    public_der = signing_key.private_key.public_key().public_bytes(
+        serialization.Encoding.DER, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    return f"{DEFAULT_KEY_ID}-{hashlib.sha256(public_der).hexdigest()[:16]}"
+
+
+def sign_digest(signing_key: SigningKey, license_hash: bytes) -> str:
+    """
+    Signs the SHA-256 digest of the license json, base64 encoded.
+    RSA-PSS and ECDSA hash the digest again with SHA-256 (as RSA always has); Ed25519 signs the digest itself.
+    """
+    private_key = signing_key.private_key
+    if signing_key.algorithm == ALG_RSA_PSS:
+        signature = private_key.sign(
+            license_hash,
+            padding.PSS(
+                mgf=padding.MGF1(hashes.SHA256()),
+                salt_length=padding.PSS.MAX_LENGTH
+            ),
+            hashes.SHA256()
+        )
+    elif signing_key.algorithm == ALG_ED25519:
+        signature = private_key.sign(license_hash)
+    else:
+        signature = private_key.sign(license_hash, ec.ECDSA(hashes.SHA256()))
+    return base64.b64encode(signature).decode('utf-8')
+
+
+class SigningKeyRing:
+    """啟動時預先載入的簽章金鑰"""
+
+    def __init__(self, keys: Dict[str, SigningKey]):
+        self._keys = keys
+
+    @property
+    def default(self) -> SigningKey:
+        return self._keys[DEFAULT_KEY_ID]
+
+    def key_ids(self):
+        return sorted(self._keys)
+
+    def get(self, key_id: Optional[str]) -> Optional[SigningKey]:
+        return self._keys.get(key_id or DEFAULT_KEY_ID)
+
+    def for_product(self, product) -> SigningKey:
+        """產品指定的簽章金鑰；未指定或金鑰檔不存在時使用預設的 RSA 金鑰"""
+        key_id = getattr(product, "signing_key_id", None) if product is not None else None
+        if not key_id:
+            return self.default
+        signing_key = self._keys.get(key_id)
+        if signing_key is None:
+            logger.error(f"Signing key '{key_id}' of product {product.id} is not loaded, using '{DEFAULT_KEY_ID}'.")
+            return self.default
+        return signing_key
+
+
+signing_keys = SigningKeyRing(load_signing_keys())
@@ -0,0 +1,56 @@
+"""
+比較各簽章演算法每次簽章的耗時（單一執行緒）。
+
+用法（於 backend 目錄）：
+    python scripts/benchmark_signing.py            # 每種演算法簽 500 次
+    python scripts/benchmark_signing.py -n 2000
+
+除了暫時產生的 RSA-2048 / Ed25519 / ECDSA P-256 金鑰外，也會測試 app/keys 中已載入的金鑰。
+"""
+import argparse
+import base64
+import hashlib
+import os
+import sys
+import time
+
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.signing_keys import SigningKey, key_algorithm, load_signing_keys, sign_digest
+
+
+def _ephemeral_keys():
+    for key_id, private_key in [
+        ("rsa-2048", rsa.generate_private_key(public_exponent=65537, key_size=2048)),
+        ("ed25519", ed25519.Ed25519PrivateKey.generate()),
+        ("ecdsa-p256", ec.generate_private_key(ec.SECP256R1())),
+    ]:
+        yield SigningKey(key_id=f"(temp) {key_id}", algorithm=key_algorithm(private_key), private_key=private_key)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark license signing algorithms")
+    parser.add_argument("-n", "--iterations", type=int, default=500)
+    args = parser.parse_args()
+
+    keys = list(_ephemeral_keys()) + list(load_signing_keys().values())
+    license_hash = hashlib.sha256(b'{"license_id": "DUCKY-00000000-00000000"}').digest()
+
+    print(f"{'key':<28} {'algorithm':<20} {'us/sign':>10} {'signs/s':>10} {'sig bytes':>10}")
+    for signing_key in keys:
+        sign_digest(signing_key, license_hash)  # warm up
+        started = time.perf_counter()
+        for _ in range(args.iterations):
+            signature = sign_digest(signing_key, license_hash)
+        elapsed = (time.perf_counter() - started) / args.iterations
+        print(
+            f"{signing_key.key_id:<28} {signing_key.algorithm:<20} "
+            f"{elapsed * 1e6:>10.1f} {1 / elapsed:>10.0f} {len(base64.b64decode(signature)):>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+產生授權檔簽章金鑰。
+
+用法（於 backend 目錄）：
+    python scripts/generate_signing_key.py ed25519 ed25519-2026
+    python scripts/generate_signing_key.py ecdsa-p256 ecdsa-2026
+
+私鑰寫入 app/keys/<key_id>.pem，公鑰寫入 app/keys/<key_id>.public.pem（提供給用戶端）。
+重新啟動服務後，在產品的 signing_key_id 填入 <key_id> 即改用新金鑰簽章。
+"""
+import argparse
+import os
+import sys
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+KEYS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app', 'keys')
+
+GENERATORS = {
+    "ed25519": ed25519.Ed25519PrivateKey.generate,
+    "ecdsa-p256": lambda: ec.generate_private_key(ec.SECP256R1()),
+    "rsa": lambda: rsa.generate_private_key(public_exponent=65537, key_size=2048),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a license signing key")
+    parser.add_argument("algorithm", choices=sorted(GENERATORS))
+    parser.add_argument("key_id", help="file name of the key, also embedded in license files as key_id")
+    args = parser.parse_args()
+
+    private_path = os.path.join(KEYS_DIR, f"{args.key_id}.pem")
+    public_path = os.path.join(KEYS_DIR, f"{args.key_id}.public.pem")
+    if args.key_id in ("default", "private_key") or os.path.exists(private_path):
+        print(f"Error: key id '{args.key_id}' is reserved or already exists.")
+        sys.exit(1)
+
+    private_key = GENERATORS[args.algorithm]()
+    with open(private_path, "wb") as key_file:
+        key_file.write(private_key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption(),
+        ))
+    with open(public_path, "wb") as key_file:
+        key_file.write(private_key.public_key().public_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PublicFormat.SubjectPublicKeyInfo,
+        ))
+    print(f"Private key: {private_path}")
+    print(f"Public key:  {public_path}")
+
+
+if __name__ == "__main__":
+    main()
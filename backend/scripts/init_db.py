@@ -15,7 +15,13 @@ from app.models.customer import Customer
 from app.models.product import Product
 from app.models.license import License
 from app.models.activation import Activation
+from app.models.activation_hardware_id import ActivationHardwareId
 from app.models.feature import Feature
+from app.models.event_log import EventLog
+from app.models.idempotency_key import IdempotencyKey
+from app.models.activation_heartbeat import ActivationHeartbeat
+from app.models.event_log_archive import EventLogArchive
+from app.db.migrations import upgrade
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -32,6 +38,8 @@ def init_db():
 
         logger.info("Creating all new tables based on models...")
         Base.metadata.create_all(bind=engine)
+        # 記錄遷移版本，之後只需執行 python -m app.db.migrations upgrade
+        upgrade(engine)
         logger.info("All tables created successfully.")
     except Exception as e:
         logger.error(f"An error occurred during database initialization: {e}")
@@ -0,0 +1,113 @@
+import os
+import tempfile
+
+# 測試使用獨立的 SQLite 資料庫，必須在 import app 之前設定
+_TEST_DIR = tempfile.mkdtemp(prefix="license-server-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TEST_DIR, 'test.db')}"
+os.environ["RATE_LIMIT_STORAGE_URI"] = "memory://"
+os.environ["LICENSE_AES_KEY"] = "0123456789abcdef" * 4  # 32 bytes (hex)
+os.environ["LOGS_DIR"] = os.path.join(_TEST_DIR, "logs")
+os.environ.setdefault("LICENSE_SIGNING_WORKERS", "0")
+
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app import models
+from app.api.v1.internal_app import internal_app
+from app.core import security
+from app.core.rate_limiter import limiter
+from app.db.base import Base
+from app.db.session import SessionLocal, async_engine, engine
+from app.main import app
+from app.services.blacklist_filter import blacklist_filter
+from app.services.event_log_counts import event_log_count_cache
+from app.services.license_cache import license_snapshot_cache, unknown_serial_cache
+
+SERIAL_NUMBER = "DUCKY-AAAAAAAA-BBBBBBBB"
+
+
+@pytest.fixture
+def db_setup():
+    """每個測試重新建立資料表並清除各行程內的快取"""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    limiter.reset()
+    license_snapshot_cache.clear()
+    unknown_serial_cache.clear()
+    event_log_count_cache.clear()
+    with SessionLocal() as session:
+        blacklist_filter.rebuild(session)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def db(db_setup):
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def license_obj(db):
+    customer = models.Customer(tax_id="12345678", name="Acme", email="acme@example.com")
+    product = models.Product(name="Ducky")
+    db.add_all([customer, product])
+    db.commit()
+    license_obj = models.License(
+        customer_id=customer.id,
+        product_id=product.id,
+        serial_number=SERIAL_NUMBER,
+        features=["basic"],
+        max_activations=3,
+        status="pending",
+        expires_at=datetime.utcnow() + timedelta(days=30),
+    )
+    db.add(license_obj)
+    db.commit()
+    return license_obj
+
+
+@pytest.fixture
+def client(db_setup):
+    internal_app.dependency_overrides[security.get_current_active_admin] = lambda: None
+    with TestClient(app) as test_client:
+        yield test_client
+    internal_app.dependency_overrides.clear()
+
+
+class QueryCounter:
+    """記錄同步與 async engine 實際送出的 SQL"""
+
+    def __init__(self):
+        self.statements = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def clear(self):
+        self.statements.clear()
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    @property
+    def selects(self):
+        return [statement for statement in self.statements if statement.lstrip().upper().startswith("SELECT")]
+
+
+@pytest.fixture
+def query_counter():
+    counter = QueryCounter()
+    targets = [engine, async_engine.sync_engine]
+    for target in targets:
+        event.listen(target, "before_cursor_execute", counter._record)
+    yield counter
+    for target in targets:
+        event.remove(target, "before_cursor_execute", counter._record)
@@ -0,0 +1,27 @@
+"""用戶端的授權檔解密，供測試驗證伺服器簽發的內容"""
+import base64
+import json
+
+from cryptography.hazmat.primitives import padding as sym_padding
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from app.services.license_service import AES_KEY, V2_HEADER
+
+
+def decode_v1(content: bytes) -> dict:
+    raw = base64.b64decode(content)
+    decryptor = Cipher(algorithms.AES(AES_KEY), modes.CBC(raw[:16])).decryptor()
+    padded = decryptor.update(raw[16:]) + decryptor.finalize()
+    unpadder = sym_padding.PKCS7(algorithms.AES.block_size).unpadder()
+    return json.loads(unpadder.update(padded) + unpadder.finalize())
+
+
+def decode_v2(content: bytes):
+    """回傳 (payload bytes, signature bytes)"""
+    raw = base64.b64decode(content)
+    assert raw[:len(V2_HEADER)] == V2_HEADER
+    nonce = raw[len(V2_HEADER):len(V2_HEADER) + 12]
+    plaintext = AESGCM(AES_KEY).decrypt(nonce, raw[len(V2_HEADER) + 12:], V2_HEADER)
+    signature_length = int.from_bytes(plaintext[:2], "big")
+    return plaintext[2 + signature_length:], plaintext[2:2 + signature_length]
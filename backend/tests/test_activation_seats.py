@@ -0,0 +1,53 @@
+import asyncio
+
+import httpx
+from sqlalchemy import select, update
+
+from app import crud, models
+from app.main import app
+from tests.conftest import SERIAL_NUMBER
+
+ACTIVATE_URL = "/api/v1/public/activate"
+
+
+def test_concurrent_activations_never_exceed_max(db, license_obj):
+    license_id = license_obj.id
+
+    async def activate(client: httpx.AsyncClient, i: int) -> int:
+        response = await client.post(ACTIVATE_URL, json={
+            "serial_number": SERIAL_NUMBER, "machine_code": f"{i:02d}" + "M" * 18
+        }, headers={"X-Forwarded-For": f"198.51.100.{i}"})
+        return response.status_code
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            # 前兩個名額先佔用，剩下最後一個名額由多個請求同時搶
+            assert await activate(client, 0) == 200
+            assert await activate(client, 1) == 200
+            return await asyncio.gather(*(activate(client, i) for i in range(2, 8)))
+
+    statuses = asyncio.run(run())
+    assert statuses.count(200) == 1, statuses
+
+    db.expire_all()
+    license_obj = db.get(models.License, license_id)
+    active = db.scalars(select(models.Activation).where(
+        models.Activation.license_id == license_id, models.Activation.status == "active"
+    )).all()
+    assert license_obj.active_activation_count == license_obj.max_activations == 3
+    assert len(active) == 3
+
+
+def test_reconcile_repairs_skewed_counts(db, license_obj):
+    db.add(models.Activation(license_id=license_obj.id, machine_code="M" * 20, status="active"))
+    db.add(models.Activation(license_id=license_obj.id, machine_code="N" * 20, status="deactivated"))
+    db.commit()
+    db.execute(update(models.License).where(models.License.id == license_obj.id).values(active_activation_count=3))
+    db.commit()
+
+    assert crud.license.reconcile_active_activation_counts(db) == 1
+    db.refresh(license_obj)
+    assert license_obj.active_activation_count == 1
+    # 已一致時不再更新
+    assert crud.license.reconcile_active_activation_counts(db) == 0
@@ -0,0 +1,26 @@
+from datetime import datetime, timedelta
+
+from app import models
+
+
+def test_create_active_license_reserves_seat(client, db, license_obj):
+    response = client.post("/api/v1/admin/licenses/", json={
+        "customer_id": license_obj.customer_id,
+        "product_id": license_obj.product_id,
+        "max_activations": 1,
+        "status": "active",
+        "machine_code": "M" * 20,
+        "expires_at": (datetime.utcnow() + timedelta(days=30)).isoformat(),
+    })
+    assert response.status_code == 200, response.text
+    serial_number = response.json()["serial_number"]
+
+    created = db.query(models.License).filter(models.License.serial_number == serial_number).one()
+    assert created.active_activation_count == 1
+    assert len(created.activations) == 1
+
+    # 唯一的名額已被管理端建立的啟用記錄佔用
+    response = client.post("/api/v1/public/activate", json={
+        "serial_number": serial_number, "machine_code": "N" * 20
+    })
+    assert response.status_code == 403, response.text
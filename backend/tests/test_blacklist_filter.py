@@ -0,0 +1,76 @@
+from types import SimpleNamespace
+
+from sqlalchemy import update
+
+from app import models
+from app.services.blacklist_filter import BlacklistFilter
+from tests.conftest import SERIAL_NUMBER
+
+BLOCKED = "B" * 20
+OTHER = "C" * 20
+
+
+def _machine(machine_code: str, **hardware_ids) -> SimpleNamespace:
+    return SimpleNamespace(
+        license_id=1,
+        machine_code=machine_code,
+        keypro_id=hardware_ids.get("keypro_id"),
+        motherboard_id=hardware_ids.get("motherboard_id"),
+        disk_id=hardware_ids.get("disk_id"),
+    )
+
+
+def test_add_remove_and_rebuild(db, license_obj):
+    blacklist = BlacklistFilter()
+    # 尚未 rebuild 前一律需要查詢
+    assert blacklist.might_be_blacklisted(1, _machine(OTHER))
+
+    blacklist.rebuild(db)
+    blocked = _machine(BLOCKED, motherboard_id="mb-1")
+    assert not blacklist.might_be_blacklisted(1, blocked)
+
+    blacklist.add(blocked)
+    assert blacklist.might_be_blacklisted(1, _machine(BLOCKED))
+    # 硬體ID以正規化後的值比對
+    assert blacklist.might_be_blacklisted(1, _machine(OTHER, motherboard_id=" MB-1"))
+    # 其他授權不受影響
+    assert not blacklist.might_be_blacklisted(2, _machine(BLOCKED))
+
+    blacklist.remove(blocked)
+    assert not blacklist.might_be_blacklisted(1, _machine(BLOCKED))
+    assert blacklist.stats()["keys"] == 0
+
+    db.add(models.Activation(license_id=license_obj.id, machine_code=BLOCKED, status="blacklisted"))
+    db.commit()
+    assert blacklist.rebuild(db) == 1
+    assert blacklist.might_be_blacklisted(license_obj.id, _machine(BLOCKED))
+
+
+def test_admin_blacklist_is_visible_to_public_endpoints(client, db, license_obj):
+    for machine_code in (BLOCKED, OTHER):
+        response = client.post("/api/v1/public/activate", json={
+            "serial_number": SERIAL_NUMBER, "machine_code": machine_code
+        })
+        assert response.status_code == 200, response.text
+    activations = {activation.machine_code: activation.id for activation in license_obj.activations}
+    # 加入黑名單前需先把授權數量降到已啟用數量以下
+    db.execute(update(models.License).where(models.License.id == license_obj.id).values(max_activations=1))
+    db.commit()
+
+    response = client.post(f"/api/v1/admin/activations/{activations[BLOCKED]}/blacklist")
+    assert response.status_code == 200, response.text
+
+    # 授權數量調回後仍有空位，黑名單上的電腦也不能重新啟用
+    db.execute(update(models.License).where(models.License.id == license_obj.id).values(max_activations=3))
+    db.commit()
+    blocked = {"serial_number": SERIAL_NUMBER, "machine_code": BLOCKED}
+    assert client.post("/api/v1/public/validate", json=blocked).status_code == 403
+    assert client.post("/api/v1/public/activate", json=blocked).status_code == 403
+    assert client.post("/api/v1/public/validate", json={
+        "serial_number": SERIAL_NUMBER, "machine_code": OTHER
+    }).status_code == 200
+
+    # 刪除黑名單記錄後立即解除
+    response = client.delete(f"/api/v1/admin/activations/{activations[BLOCKED]}")
+    assert response.status_code == 200, response.text
+    assert client.post("/api/v1/public/activate", json=blocked).status_code == 200
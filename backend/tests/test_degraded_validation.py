@@ -0,0 +1,35 @@
+from app.services.license_cache import signed_license_cache
+from tests.conftest import SERIAL_NUMBER
+
+MACHINE_CODE = "M" * 20
+VALIDATE_URL = "/api/v1/public/validate"
+
+
+def test_degraded_validations_reuse_signed_license(client, license_obj, monkeypatch):
+    response = client.post("/api/v1/public/activate", json={
+        "serial_number": SERIAL_NUMBER, "machine_code": MACHINE_CODE, "keypro_id": "KP-1", "motherboard_id": "MB-1"
+    })
+    assert response.status_code == 200, response.text
+
+    signed = []
+    original_set = signed_license_cache.set
+
+    def counting_set(key, value):
+        signed.append(value)
+        original_set(key, value)
+
+    monkeypatch.setattr(signed_license_cache, "set", counting_set)
+
+    # Keypro 遺失但主機板相符：降級驗證
+    degraded = {"serial_number": SERIAL_NUMBER, "machine_code": MACHINE_CODE, "motherboard_id": "MB-1"}
+    first = client.post(VALIDATE_URL, json=degraded)
+    assert first.status_code == 200, first.text
+    assert "license_file_content" in first.json()
+
+    second = client.post(VALIDATE_URL, json={**degraded, "license_digest": first.json()["license_digest"]})
+    assert second.status_code == 200, second.text
+    assert second.json()["license_unchanged"] is True
+    assert second.json()["license_digest"] == first.json()["license_digest"]
+
+    assert len(signed) == 1
+    assert "degraded_at" in signed[0]["data"]["hardware_ids"]
@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from app import models
+from app.services import event_archive
+from app.services.event_archive import archive_events_before, load_archived_events
+
+ARCHIVE_URL = "/api/v1/admin/event-logs/archive"
+
+
+def _add_event(db, license_obj, machine_code: str, created_at: datetime, severity: str = "info", is_confirmed: bool = False):
+    db.add(models.EventLog(
+        license_id=license_obj.id,
+        event_type="activation",
+        serial_number=license_obj.serial_number,
+        machine_code=machine_code,
+        severity=severity,
+        is_confirmed=is_confirmed,
+        created_at=created_at,
+    ))
+
+
+def test_archive_by_age_keeps_unconfirmed_suspicious_events(db, license_obj):
+    old = datetime.utcnow() - timedelta(days=200)
+    cases = [
+        ("info", False, old),
+        ("warning", False, old),
+        ("suspicious", True, old),
+        ("suspicious", False, old),
+        ("critical", False, old),
+        ("info", False, datetime.utcnow()),
+    ]
+    for i, (severity, is_confirmed, created_at) in enumerate(cases):
+        _add_event(db, license_obj, f"MACHINE-{i}", created_at, severity, is_confirmed)
+    db.commit()
+
+    cutoff = datetime.utcnow() - timedelta(days=180)
+    assert archive_events_before(db, cutoff=cutoff, batch_size=2) == 3
+
+    remaining = db.execute(select(models.EventLog.machine_code).order_by(models.EventLog.id)).scalars().all()
+    assert remaining == ["MACHINE-3", "MACHINE-4", "MACHINE-5"]
+    archived = load_archived_events(db.scalars(select(models.EventLogArchive.payload)).all())
+    assert sorted(event["machine_code"] for event in archived) == ["MACHINE-0", "MACHINE-1", "MACHINE-2"]
+
+
+def test_archive_pages_decompress_only_covering_archives(client, db, license_obj, monkeypatch):
+    monkeypatch.setattr(event_archive, "MAX_EVENTS_PER_ARCHIVE", 2)
+    old = datetime(2025, 1, 1)
+    for i in range(5):
+        _add_event(db, license_obj, f"MACHINE-{i}", old + timedelta(days=i))
+    db.commit()
+    license_id, serial_number = license_obj.id, license_obj.serial_number
+    archive_events_before(db, cutoff=datetime(2025, 2, 1), batch_size=100)
+
+    assert client.get(ARCHIVE_URL, params={"month": "2025-01"}).status_code == 400
+
+    # 批次（新到舊）：[4]、[3, 2]、[1, 0]
+    response = client.get(ARCHIVE_URL, params={"license_id": license_id, "page": 2, "limit": 2})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total"] == 5
+    assert body["archives"] == 2
+    assert [event["machine_code"] for event in body["items"]] == ["MACHINE-2", "MACHINE-1"]
+
+    response = client.get(ARCHIVE_URL, params={"serial_number": serial_number, "month": "2025-01", "limit": 1})
+    assert [event["machine_code"] for event in response.json()["items"]] == ["MACHINE-4"]
+    assert response.json()["archives"] == 1
@@ -0,0 +1,58 @@
+import asyncio
+
+from app import crud, schemas
+from app.services.event_buffer import EventLogBuffer
+
+
+def _event(i: int) -> schemas.EventLogCreate:
+    return schemas.EventLogCreate(event_type="activation", serial_number=f"SN-{i}", severity="info")
+
+
+def test_failed_flush_requeues_batch(monkeypatch):
+    written = []
+    failures = [RuntimeError("database is locked")]
+
+    async def create_multi_async(db, *, objs_in):
+        if failures:
+            raise failures.pop()
+        written.extend(objs_in)
+
+    monkeypatch.setattr(crud.event_log, "create_multi_async", create_multi_async)
+
+    async def run():
+        buffer = EventLogBuffer(flush_interval_ms=1000, flush_max_rows=10, max_queue=100)
+        buffer._flush_lock = asyncio.Lock()
+        for i in range(3):
+            buffer.enqueue(_event(i))
+
+        assert await buffer.flush() == 0
+        assert buffer.stats()["queue_depth"] == 3
+        assert await buffer.flush() == 3
+        return buffer
+
+    buffer = asyncio.run(run())
+    assert [event["serial_number"] for event in written] == ["SN-0", "SN-1", "SN-2"]
+    assert buffer.stats() == {"queue_depth": 0, "dropped": 0, "flushed": 3, "failed": 3}
+
+
+def test_requeue_is_bounded_by_max_queue(monkeypatch):
+    buffer = EventLogBuffer(flush_interval_ms=1000, flush_max_rows=4, max_queue=5)
+
+    async def create_multi_async(db, *, objs_in):
+        # 寫入期間又有新事件進入佇列
+        for i in range(10, 13):
+            buffer.enqueue(_event(i))
+        raise RuntimeError("database is down")
+
+    monkeypatch.setattr(crud.event_log, "create_multi_async", create_multi_async)
+
+    async def run():
+        buffer._flush_lock = asyncio.Lock()
+        for i in range(5):
+            buffer.enqueue(_event(i))
+        await buffer.flush()
+
+    asyncio.run(run())
+    # 批次 SN-0..3 只放得回最舊的一筆，其餘記入 dropped
+    assert [event["serial_number"] for event in buffer._queue] == ["SN-0", "SN-4", "SN-10", "SN-11", "SN-12"]
+    assert buffer.dropped == 3
@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import models
+
+EVENT_LOGS_URL = "/api/v1/admin/event-logs"
+
+
+@pytest.fixture
+def events(db, license_obj):
+    start = datetime(2026, 1, 1)
+    for i in range(60):
+        db.add(models.EventLog(
+            license_id=license_obj.id if i % 3 else None,
+            event_type="activation",
+            serial_number=license_obj.serial_number,
+            severity="info",
+            created_at=start + timedelta(seconds=i // 2),
+        ))
+    db.commit()
+
+
+@pytest.mark.parametrize("params", [{}, {"order_by": "severity_desc"}, {"customer_name": "Acm"}])
+def test_event_log_page_query_count_is_constant(client, events, query_counter, params):
+    counts = []
+    for limit in (5, 20, 60):
+        query_counter.clear()
+        response = client.get(EVENT_LOGS_URL, params={"limit": limit, "exact_total": True, **params})
+        assert response.status_code == 200, response.text
+        items = response.json()["items"]
+        assert items
+        assert {item["customer_name"] for item in items if item["license_id"]} == {"Acme"}
+        assert all(item["customer_name"] is None for item in items if not item["license_id"])
+        counts.append(query_counter.count)
+    # 一次分頁查詢（含客戶名稱）+ 一次 COUNT，與頁面大小無關
+    assert counts == [2, 2, 2]
+
+
+def test_event_log_cursor_pages_match_offset_pages(client, events):
+    offset_ids = []
+    for page in range(1, 5):
+        response = client.get(EVENT_LOGS_URL, params={"page": page, "limit": 20})
+        offset_ids += [item["id"] for item in response.json()["items"]]
+
+    cursor_ids, cursor = [], None
+    while True:
+        params = {"limit": 20, **({"cursor": cursor} if cursor else {})}
+        body = client.get(EVENT_LOGS_URL, params=params).json()
+        cursor_ids += [item["id"] for item in body["items"]]
+        cursor = body["next_cursor"]
+        if not cursor:
+            break
+
+    assert cursor_ids == offset_ids
+    assert len(set(cursor_ids)) == 60
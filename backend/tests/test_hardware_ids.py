@@ -0,0 +1,69 @@
+from sqlalchemy import select
+
+from app import models
+from tests.conftest import SERIAL_NUMBER
+
+
+def _rows(db, activation_id: int) -> dict:
+    rows = db.scalars(select(models.ActivationHardwareId).where(
+        models.ActivationHardwareId.activation_id == activation_id
+    )).all()
+    return {row.kind: (row.normalized_value, row.status, row.license_id) for row in rows}
+
+
+def test_hardware_ids_follow_activation_writes(db, license_obj):
+    license_id = license_obj.id
+    activation = models.Activation(
+        license_id=license_id,
+        machine_code="M" * 20,
+        keypro_id=" kp-1 ",
+        motherboard_id="mb-1",
+        disk_id="Volume1234",  # 排除規則 disk:Volume*
+    )
+    db.add(activation)
+    db.commit()
+    activation_id = activation.id
+
+    # 新增：正規化（去空白、大寫），排除的ID不寫入
+    assert _rows(db, activation_id) == {
+        "keypro": ("KP-1", "active", license_id),
+        "motherboard": ("MB-1", "active", license_id),
+    }
+
+    # 更新：硬體ID變更、清除與狀態同步
+    activation.motherboard_id = "MB-2"
+    activation.keypro_id = None
+    activation.disk_id = "disk-9"
+    activation.status = "deactivated"
+    db.commit()
+    assert _rows(db, activation_id) == {
+        "motherboard": ("MB-2", "deactivated", license_id),
+        "disk": ("DISK-9", "deactivated", license_id),
+    }
+
+    # 與硬體無關的欄位不觸發同步
+    activation.app_version = "2.0"
+    db.commit()
+    assert len(_rows(db, activation_id)) == 2
+
+    # 刪除：一併刪除
+    db.delete(activation)
+    db.commit()
+    assert _rows(db, activation_id) == {}
+
+
+def test_activate_matches_by_synced_hardware_ids(client, db, license_obj):
+    first = client.post("/api/v1/public/activate", json={
+        "serial_number": SERIAL_NUMBER, "machine_code": "A" * 20, "motherboard_id": "MB-1"
+    })
+    assert first.status_code == 200, first.text
+
+    # 機器碼不同但主機板相同（不分大小寫）：沿用同一筆啟用記錄
+    second = client.post("/api/v1/public/activate", json={
+        "serial_number": SERIAL_NUMBER, "machine_code": "B" * 20, "motherboard_id": "mb-1"
+    })
+    assert second.status_code == 200, second.text
+
+    activations = db.scalars(select(models.Activation).where(models.Activation.license_id == license_obj.id)).all()
+    assert [activation.machine_code for activation in activations] == ["B" * 20]
+    assert _rows(db, activations[0].id)["motherboard"][0] == "MB-1"
@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+from sqlalchemy import event, select
+
+from app import crud, models
+from app.db.session import async_engine
+from app.services.heartbeats import HeartbeatBuffer, make_heartbeat
+
+
+def _enable_foreign_keys(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+@pytest.fixture
+def foreign_keys(db_setup):
+    # SQLite 預設不檢查外鍵；MariaDB 一律檢查
+    async_engine.sync_engine.dispose()
+    event.listen(async_engine.sync_engine, "connect", _enable_foreign_keys)
+    yield
+    event.remove(async_engine.sync_engine, "connect", _enable_foreign_keys)
+    async_engine.sync_engine.dispose()
+
+
+def _activation(db, license_obj, machine_code: str) -> models.Activation:
+    activation = models.Activation(license_id=license_obj.id, machine_code=machine_code)
+    db.add(activation)
+    db.commit()
+    return activation
+
+
+def test_flush_skips_deleted_activations(db, license_obj, foreign_keys):
+    kept = _activation(db, license_obj, "MACHINE-A")
+    deleted = _activation(db, license_obj, "MACHINE-B")
+    kept_id, deleted_id = kept.id, deleted.id
+
+    async def run():
+        buffer = HeartbeatBuffer(flush_interval_seconds=60, max_keys=100, max_pending=100)
+        buffer._flush_lock = asyncio.Lock()
+        buffer.add(make_heartbeat(kept_id, license_obj.id, "10.0.0.1", "1.0"))
+        buffer.add(make_heartbeat(deleted_id, license_obj.id, "10.0.0.2", "1.0"))
+        db.delete(deleted)
+        db.commit()
+        return buffer, await buffer.flush()
+
+    buffer, written = asyncio.run(run())
+    assert written == 1
+    assert buffer.stats() == {
+        "pending_keys": 0,
+        "recorded": 2,
+        "flushed_rows": 1,
+        "failed": 0,
+        "orphaned": 1,
+        "dropped": 0,
+    }
+    heartbeats = db.execute(select(models.ActivationHeartbeat.activation_id)).scalars().all()
+    assert heartbeats == [kept_id]
+    db.refresh(kept)
+    assert kept.last_validated_at is not None
+
+
+def test_failed_upsert_keeps_touches_and_bounds_pending(db, license_obj, monkeypatch):
+    activations = [_activation(db, license_obj, f"MACHINE-{i}") for i in range(3)]
+
+    async def upsert_many_async(db, *, rows):
+        raise RuntimeError("database is down")
+
+    monkeypatch.setattr(crud.activation_heartbeat, "upsert_many_async", upsert_many_async)
+
+    async def run():
+        buffer = HeartbeatBuffer(flush_interval_seconds=60, max_keys=2, max_pending=2)
+        buffer._flush_lock = asyncio.Lock()
+        for activation in activations:
+            buffer.add(make_heartbeat(activation.id, license_obj.id, "10.0.0.1", "1.0"))
+        assert await buffer.flush() == 0
+        # 寫入失敗期間又有新的驗證
+        buffer.add(make_heartbeat(activations[2].id, license_obj.id, "10.0.0.1", "1.0"))
+        return buffer
+
+    buffer = asyncio.run(run())
+    stats = buffer.stats()
+    assert stats["pending_keys"] == 2
+    assert stats["failed"] == 2
+    assert stats["dropped"] == 2
+    for activation in activations[:2]:
+        db.refresh(activation)
+        assert activation.last_validated_at is not None
@@ -0,0 +1,50 @@
+from sqlalchemy import select, update
+
+from app import models
+from app.services.idempotency import IDEMPOTENCY_HEADER, REPLAYED_HEADER
+from tests.conftest import SERIAL_NUMBER
+
+ACTIVATE_URL = "/api/v1/public/activate"
+MACHINE_CODE = "M" * 20
+
+
+def _activations(db, license_id: int):
+    return db.scalars(select(models.Activation).where(models.Activation.license_id == license_id)).all()
+
+
+def test_activate_replays_with_same_key(client, db, license_obj):
+    body = {"serial_number": SERIAL_NUMBER, "machine_code": MACHINE_CODE}
+    headers = {IDEMPOTENCY_HEADER: "key-1"}
+
+    first = client.post(ACTIVATE_URL, json=body, headers=headers)
+    assert first.status_code == 200, first.text
+    assert REPLAYED_HEADER not in first.headers
+
+    second = client.post(ACTIVATE_URL, json=body, headers=headers)
+    assert second.status_code == 200, second.text
+    assert second.headers[REPLAYED_HEADER] == "true"
+    assert second.json() == first.json()
+    assert len(_activations(db, license_obj.id)) == 1
+
+    # 相同 key、不同內容
+    conflict = client.post(ACTIVATE_URL, json={**body, "machine_code": "N" * 20}, headers=headers)
+    assert conflict.status_code == 422
+
+
+def test_failed_request_releases_key(client, db, license_obj):
+    license_id = license_obj.id
+    db.execute(update(models.License).where(models.License.id == license_id).values(max_activations=0))
+    db.commit()
+    body = {"serial_number": SERIAL_NUMBER, "machine_code": MACHINE_CODE}
+    headers = {IDEMPOTENCY_HEADER: "key-2"}
+
+    failed = client.post(ACTIVATE_URL, json=body, headers=headers)
+    assert failed.status_code == 403, failed.text
+
+    # 失敗的回應不保存：調整授權數量後以相同 key 重試會真的執行
+    db.execute(update(models.License).where(models.License.id == license_id).values(max_activations=1))
+    db.commit()
+    retried = client.post(ACTIVATE_URL, json=body, headers=headers)
+    assert retried.status_code == 200, retried.text
+    assert REPLAYED_HEADER not in retried.headers
+    assert len(_activations(db, license_id)) == 1
@@ -0,0 +1,28 @@
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from app.services import license_service
+from app.services.signing_keys import DEFAULT_KEY_ID, SigningKey, key_algorithm, license_key_id, signing_keys
+from tests.license_files import decode_v1
+
+MACHINE_CODE = "M" * 20
+
+
+def _default_key() -> SigningKey:
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return SigningKey(key_id=DEFAULT_KEY_ID, algorithm=key_algorithm(private_key), private_key=private_key)
+
+
+def test_default_key_files_carry_key_id(db, license_obj):
+    content = license_service.generate_license_file_content(license_obj, MACHINE_CODE)
+
+    data = decode_v1(content)
+    assert data["key_id"] == license_key_id(signing_keys.default)
+    assert data["key_id"].startswith(f"{DEFAULT_KEY_ID}-")
+    assert data["signature_alg"] == signing_keys.default.algorithm
+
+
+def test_rotated_default_key_has_new_key_id():
+    # 輪替後的 private_key.pem 同樣是 "default"，寫入授權檔的 key_id 依公鑰區分
+    old_key, new_key = _default_key(), _default_key()
+    assert license_key_id(old_key) != license_key_id(new_key)
+    assert license_key_id(old_key) == license_key_id(old_key)
@@ -0,0 +1,69 @@
+import base64
+import hashlib
+import json
+
+import pytest
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import padding
+
+from app.services import license_service
+from app.services.signing_keys import signing_keys
+from tests.conftest import SERIAL_NUMBER
+from tests.license_files import decode_v1, decode_v2
+
+ACTIVATE_URL = "/api/v1/public/activate"
+
+
+@pytest.fixture
+def v2_from_2_0(monkeypatch):
+    monkeypatch.setattr(license_service, "_V2_MIN_APP_VERSION", (2, 0))
+
+
+def _activate(client, machine_code: str, app_version: str) -> dict:
+    response = client.post(ACTIVATE_URL, json={
+        "serial_number": SERIAL_NUMBER, "machine_code": machine_code, "app_version": app_version
+    })
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_v2_round_trip(client, license_obj, v2_from_2_0):
+    body = _activate(client, "A" * 20, "2.1")
+
+    content = body["license_file_content"].encode()
+    payload, signature = decode_v2(content)
+    data = json.loads(payload)
+    assert data["license_id"] == SERIAL_NUMBER
+    assert data["machine_code"] == "A" * 20
+    assert data["app_version"] == "2.1"
+
+    digest = hashlib.sha256(payload).digest()
+    assert body["license_digest"] == digest.hex()
+    signing_keys.default.private_key.public_key().verify(
+        signature, digest,
+        padding.PSS(mgf=padding.MGF1(hashes.SHA256()), salt_length=padding.PSS.MAX_LENGTH),
+        hashes.SHA256(),
+    )
+
+    # 密文被竄改時 GCM 驗證失敗
+    raw = bytearray(base64.b64decode(content))
+    raw[-1] ^= 1
+    with pytest.raises(InvalidTag):
+        decode_v2(base64.b64encode(bytes(raw)))
+
+
+@pytest.mark.parametrize("app_version", ["1.9", "v1.10.3", "not-a-version", None])
+def test_older_clients_get_v1(client, license_obj, v2_from_2_0, app_version):
+    response = client.post(ACTIVATE_URL, json={
+        "serial_number": SERIAL_NUMBER, "machine_code": "B" * 20, "app_version": app_version
+    })
+    assert response.status_code == 200, response.text
+    data = decode_v1(response.json()["license_file_content"].encode())
+    assert data["machine_code"] == "B" * 20
+    assert "signature" in data
+
+
+def test_v2_disabled_by_default(client, license_obj):
+    body = _activate(client, "C" * 20, "9.9")
+    assert decode_v1(body["license_file_content"].encode())["app_version"] == "9.9"
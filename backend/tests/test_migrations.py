@@ -0,0 +1,24 @@
+from datetime import datetime
+
+from sqlalchemy import create_engine, text
+
+from app.db import migrations
+
+
+def test_event_log_created_at_backfill(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE event_logs (id INTEGER PRIMARY KEY, created_at DATETIME, confirmed_at DATETIME)"))
+        conn.execute(text(
+            "INSERT INTO event_logs (id, created_at, confirmed_at) VALUES "
+            "(1, NULL, NULL), (2, '2024-03-01 00:00:00.000000', NULL), (3, NULL, '2024-05-01 00:00:00.000000')"
+        ))
+        migrations._event_log_created_at_not_null(conn)
+        rows = conn.execute(text("SELECT id, created_at FROM event_logs ORDER BY id")).all()
+    engine.dispose()
+
+    assert [(row.id, datetime.fromisoformat(row.created_at)) for row in rows] == [
+        (1, datetime(2024, 3, 1)),
+        (2, datetime(2024, 3, 1)),
+        (3, datetime(2024, 5, 1)),
+    ]
@@ -0,0 +1,20 @@
+from app.db.migrations import check_query_plans, upgrade
+from app.db.session import engine
+
+
+def _plans():
+    upgrade(engine)
+    return {name: (uses_index, plan) for name, uses_index, plan in check_query_plans(engine)}
+
+
+def test_machine_code_prefix_lookups_use_composite_index(db_setup):
+    plans = _plans()
+    for name in ("activation by machine_code_prefix", "active activation by machine_code_prefix"):
+        uses_index, plan = plans[name]
+        assert uses_index, plan
+        assert "ix_activations_license_prefix_status" in plan, plan
+
+
+def test_hot_queries_use_indexes(db_setup):
+    failed = {name: plan for name, (uses_index, plan) in _plans().items() if not uses_index}
+    assert not failed
@@ -0,0 +1,43 @@
+import pytest
+from starlette.requests import Request
+
+from app.core.config import settings
+from app.core.utils import get_real_ip
+
+
+def _request(client_host: str, **headers) -> Request:
+    return Request({
+        "type": "http",
+        "method": "POST",
+        "path": "/",
+        "headers": [(name.replace("_", "-").lower().encode(), value.encode()) for name, value in headers.items()],
+        "client": (client_host, 12345),
+    })
+
+
+@pytest.mark.parametrize("client_host, headers, expected", [
+    # 直接連線的用戶端不能以標頭偽造來源 IP
+    ("203.0.113.5", {"X_Forwarded_For": "1.2.3.4"}, "203.0.113.5"),
+    ("203.0.113.5", {"X_Real_IP": "1.2.3.4"}, "203.0.113.5"),
+    # 經由受信任的代理：取最右邊第一個不受信任的位址
+    ("172.18.0.2", {"X_Forwarded_For": "1.2.3.4, 198.51.100.7"}, "198.51.100.7"),
+    ("172.18.0.2", {"X_Forwarded_For": "198.51.100.7, 10.0.0.5"}, "198.51.100.7"),
+    ("127.0.0.1", {"X_Real_IP": "198.51.100.7"}, "198.51.100.7"),
+    ("127.0.0.1", {}, "127.0.0.1"),
+])
+def test_get_real_ip_only_trusts_proxies(client_host, headers, expected):
+    assert get_real_ip(_request(client_host, **headers)) == expected
+
+
+def test_validate_has_per_ip_ceiling_across_serials(client, license_obj):
+    ceiling = int(settings.PUBLIC_IP_RATE_LIMIT.split("/")[0])
+    statuses = []
+    for i in range(ceiling + 1):
+        response = client.post("/api/v1/public/validate", json={
+            "serial_number": f"DUCKY-{i:08X}-00000000", "machine_code": "M" * 20
+        }, headers={"X-Forwarded-For": f"198.51.100.{i % 250}"})
+        statuses.append(response.status_code)
+
+    # 每個序號各自的額度都沒用完，但同一來源的合計超過上限；偽造的 X-Forwarded-For 不影響
+    assert set(statuses[:ceiling]) == {404}
+    assert statuses[ceiling] == 429
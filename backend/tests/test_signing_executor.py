@@ -0,0 +1,63 @@
+import asyncio
+import hashlib
+import time
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519
+
+from app.services import signing_executor as signing_executor_module
+from app.services.signing_executor import SigningExecutor, SigningUnavailableError
+from app.services.signing_keys import load_signing_keys, sign_digest
+
+
+@pytest.fixture
+def keys_dir(tmp_path):
+    private_key = ed25519.Ed25519PrivateKey.generate()
+    (tmp_path / "private_key.pem").write_bytes(private_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ))
+    return str(tmp_path)
+
+
+def test_pool_workers_are_spawned(keys_dir):
+    signing_key = load_signing_keys(keys_dir)["default"]
+    license_hash = hashlib.sha256(b"license").digest()
+    executor = SigningExecutor(keys_dir=keys_dir, workers=1, max_pending=2, timeout=60)
+
+    async def run():
+        executor.start()
+        try:
+            # fork 會複製其他執行緒持有的鎖
+            assert executor._pool._mp_context.get_start_method() == "spawn"
+            return await executor.sign(license_hash, signing_key)
+        finally:
+            executor.shutdown()
+
+    signature = asyncio.run(run())
+    assert signature == sign_digest(signing_key, license_hash)
+
+
+def test_thread_fallback_respects_max_pending_and_timeout(keys_dir, monkeypatch):
+    signing_key = load_signing_keys(keys_dir)["default"]
+
+    def slow_sign(signing_key, license_hash):
+        time.sleep(0.2)
+        return "signature"
+
+    monkeypatch.setattr(signing_executor_module, "sign_digest", slow_sign)
+    executor = SigningExecutor(keys_dir=keys_dir, workers=0, max_pending=1, timeout=0.3)
+
+    async def run():
+        executor.start()
+        return await asyncio.gather(
+            executor.sign(b"first", signing_key),
+            executor.sign(b"second", signing_key),
+            return_exceptions=True,
+        )
+
+    first, second = asyncio.run(run())
+    assert executor.started is False
+    assert first == "signature"
+    # 第二個要等第一個釋放名額，總等待超過 timeout
+    assert isinstance(second, SigningUnavailableError)
@@ -0,0 +1,35 @@
+from datetime import datetime, timedelta
+
+from app import models
+from app.services.license_cache import MAX_UNKNOWN_SERIAL_TTL, UnknownSerialCache
+
+LEGACY_SERIAL_NUMBER = "LEGACY-0001"
+
+
+def test_legacy_serial_is_not_rejected_by_default(client, db, license_obj):
+    db.add(models.License(
+        customer_id=license_obj.customer_id,
+        product_id=license_obj.product_id,
+        serial_number=LEGACY_SERIAL_NUMBER,
+        max_activations=1,
+        status="pending",
+        expires_at=datetime.utcnow() + timedelta(days=30),
+    ))
+    db.commit()
+
+    response = client.post("/api/v1/public/activate", json={
+        "serial_number": LEGACY_SERIAL_NUMBER, "machine_code": "M" * 20
+    })
+    assert response.status_code == 200, response.text
+
+
+def test_format_check_rejects_malformed_serials_when_enabled():
+    cache = UnknownSerialCache(max_size=10, ttl=60, check_format=True)
+    assert cache.is_rejected(LEGACY_SERIAL_NUMBER)
+    assert not cache.is_rejected("DUCKY-0123ABCD-89ABCDEF")
+
+
+def test_negative_cache_ttl_is_clamped():
+    # 其他 worker 看不到 discard()，新序號最多被誤拒 MAX_UNKNOWN_SERIAL_TTL 秒
+    cache = UnknownSerialCache(max_size=10, ttl=3600, check_format=False)
+    assert cache.ttl == MAX_UNKNOWN_SERIAL_TTL
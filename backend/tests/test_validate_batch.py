@@ -0,0 +1,65 @@
+from app.core.config import settings
+from tests.conftest import SERIAL_NUMBER
+
+BATCH_URL = "/api/v1/public/validate/batch"
+MACHINE_CODES = ["A" * 20, "B" * 20]
+
+
+def _activate(client, machine_code: str):
+    response = client.post("/api/v1/public/activate", json={
+        "serial_number": SERIAL_NUMBER, "machine_code": machine_code
+    })
+    assert response.status_code == 200, response.text
+
+
+def _item(machine_code: str, serial_number: str = SERIAL_NUMBER) -> dict:
+    return {"serial_number": serial_number, "machine_code": machine_code}
+
+
+def test_batch_rejects_more_than_max_size(client, license_obj, monkeypatch):
+    monkeypatch.setattr(settings, "VALIDATE_BATCH_MAX_SIZE", 2)
+    response = client.post(BATCH_URL, json={
+        "serial_number": SERIAL_NUMBER, "activations": [_item(f"{i}" * 20) for i in range(3)]
+    })
+    assert response.status_code == 400
+    assert "At most 2" in response.json()["detail"]
+
+
+def test_batch_reports_each_machine(client, license_obj):
+    for machine_code in MACHINE_CODES:
+        _activate(client, machine_code)
+
+    response = client.post(BATCH_URL, json={"serial_number": SERIAL_NUMBER, "activations": [
+        _item(MACHINE_CODES[0]),
+        _item("UNKNOWN-MACHINE-0000"),
+        _item(MACHINE_CODES[1], serial_number="DUCKY-00000000-00000000"),
+        _item(MACHINE_CODES[1]),
+    ]})
+
+    assert response.status_code == 200, response.text
+    results = response.json()["results"]
+    assert [result["status_code"] for result in results] == [200, 403, 400, 200]
+    assert [result["machine_code"] for result in results] == [
+        MACHINE_CODES[0], "UNKNOWN-MACHINE-0000", MACHINE_CODES[1], MACHINE_CODES[1]
+    ]
+    assert "license_file_content" in results[0]
+
+
+def test_batch_with_unknown_serial_is_not_found(client, license_obj):
+    response = client.post(BATCH_URL, json={
+        "serial_number": "DUCKY-00000000-00000000", "activations": [_item(MACHINE_CODES[0], "DUCKY-00000000-00000000")]
+    })
+    assert response.status_code == 404
+
+
+def test_batch_is_rate_limited_per_serial(client, license_obj):
+    _activate(client, MACHINE_CODES[0])
+    batch = {"serial_number": SERIAL_NUMBER, "activations": [_item(MACHINE_CODES[0])]}
+
+    statuses = [client.post(BATCH_URL, json=batch).status_code for _ in range(31)]
+    assert statuses[:30] == [200] * 30
+    assert statuses[30] == 429
+
+    # 其他序號有各自的額度
+    other = {"serial_number": "DUCKY-00000000-00000000", "activations": [_item(MACHINE_CODES[0], "DUCKY-00000000-00000000")]}
+    assert client.post(BATCH_URL, json=other).status_code == 404
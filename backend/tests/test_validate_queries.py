@@ -0,0 +1,51 @@
+from tests.conftest import SERIAL_NUMBER
+
+MACHINE_CODE = "M" * 20
+
+
+def _activate(client, **hardware_ids):
+    response = client.post("/api/v1/public/activate", json={
+        "serial_number": SERIAL_NUMBER, "machine_code": MACHINE_CODE, **hardware_ids
+    })
+    assert response.status_code == 200, response.text
+
+
+def test_validate_issues_single_select(client, license_obj, query_counter):
+    _activate(client, motherboard_id="MB-1", disk_id="DISK-1")
+
+    query_counter.clear()
+    response = client.post("/api/v1/public/validate", json={
+        "serial_number": SERIAL_NUMBER, "machine_code": MACHINE_CODE, "motherboard_id": "MB-1", "disk_id": "DISK-1"
+    })
+
+    assert response.status_code == 200, response.text
+    # 授權、客戶、產品與啟用記錄一次載入；驗證時間與 heartbeat 由緩衝區稍後寫入
+    assert query_counter.count == 1, query_counter.statements
+
+
+def test_validate_rejections_issue_single_select(client, license_obj, query_counter):
+    _activate(client, keypro_id="KP-1", motherboard_id="MB-1")
+
+    cases = [
+        # 機器碼與硬體ID都不相符
+        ({"machine_code": "X" * 20, "motherboard_id": "MB-2"}, 403),
+        # 已綁定其他 KeyPro
+        ({"machine_code": "Y" * 20, "keypro_id": "KP-2"}, 403),
+    ]
+    for body, status_code in cases:
+        query_counter.clear()
+        response = client.post("/api/v1/public/validate", json={"serial_number": SERIAL_NUMBER, **body})
+        assert response.status_code == status_code, response.text
+        assert query_counter.count == 1, query_counter.statements
+
+
+def test_unknown_serial_is_cached(client, license_obj, query_counter):
+    body = {"serial_number": "DUCKY-00000000-00000000", "machine_code": MACHINE_CODE}
+
+    query_counter.clear()
+    assert client.post("/api/v1/public/validate", json=body).status_code == 404
+    assert query_counter.count == 1
+
+    query_counter.clear()
+    assert client.post("/api/v1/public/validate", json=body).status_code == 404
+    assert query_counter.count == 0